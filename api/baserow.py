@@ -0,0 +1,573 @@
+"""Client of Baserow rows API.
+
+Actions parsed from user commands are applied as row writes. One request per row turns a burst
+of cancellations into hundreds of HTTP calls. `BaserowWriteBuffer` coalesces writes into the
+batch endpoints of Baserow, up to {BATCH_SIZE} rows per request:
+
+    with BaserowWriteBuffer() as writes:
+        results = [writes.update(slots_table, row_id, {'Статус': 'Свободен'}, idempotency_key=f'cancel:{ticket}')
+                   for row_id, ticket in cancellations]
+    rows = [result.result() for result in results]
+
+Every write returns a Future of its row as Baserow returned it. Writes are sent when a batch of
+a table is full or {max_delay} seconds after the first pending write. Async code awaits
+`asyncio.wrap_future(future)`.
+
+`BaserowReader` reads all pages of a table as a generator of slotted `Row` objects. The next
+page is requested while the rows of the current one are processed, and only these two pages
+are in memory, so large tables are read in constant memory:
+
+    for row in BaserowReader().rows(slots_table, include=['Психолог', 'Статус']):
+        row['Психолог'][0].value, row.Статус
+"""
+import asyncio
+import json
+import keyword
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+from urllib.parse import urlencode
+
+import requests
+from tenacity import (AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, wait_exponential)
+
+from api.settings import BaserowSettings, get_baserow_settings
+from sdk import http
+from sdk.callbacks.manager import trace_call
+from sdk.deadline import raise_if_exceeded, request_timeout, stop_before_deadline
+from sdk.retry import log_and_report_retry
+from sdk.runnable.config import ContextThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+"""Most rows of a batch request of Baserow"""
+
+RETRIED_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class BaserowError(requests.HTTPError):
+    """Raised when Baserow rejects a request"""
+
+    def __init__(self, message: str, status_code: int, error: str = '', response: Optional[requests.Response] = None):
+        super().__init__(message, response=response)
+        self.status_code = status_code
+        self.error = error
+        """Error code of Baserow, e.g. ERROR_ROW_DOES_NOT_EXIST"""
+
+
+def _check(response: Any) -> Dict[str, Any]:
+    """Json of a successful response of requests or httpx
+    :raises BaserowError: If Baserow answered with an error
+    """
+    if response.status_code == 200:
+        return response.json()
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    error = body.get('error', '') if isinstance(body, dict) else ''
+    raise BaserowError(f'Baserow answered {response.status_code}: {error or response.text[:200]}',
+                       status_code=response.status_code, error=error, response=response)
+
+
+class _Write:
+    __slots__ = ('row_id', 'fields', 'futures', 'keys')
+
+    def __init__(self, row_id: Optional[int], fields: Dict[str, Any]):
+        self.row_id = row_id
+        self.fields = fields
+        self.futures: List[Future] = []
+        """Futures of all writes merged into this one"""
+        self.keys: List[str] = []
+        """Idempotency keys of the merged writes"""
+
+
+class BaserowWriteBuffer:
+    """Buffer of row creates and updates sent in batches by a background thread"""
+
+    def __init__(self,
+                 settings: Optional[BaserowSettings] = None,
+                 max_batch: int = BATCH_SIZE,
+                 max_delay: float = 0.05,
+                 idempotency_ttl: float = 600.0,
+                 max_attempts: int = 5,
+                 timeout: float = 30.0):
+        """
+        :param settings: Baserow settings. Default are settings from .env file, read on first use
+        :param max_batch: Most rows of a request, at most {BATCH_SIZE}
+        :param max_delay: Seconds a write waits for other writes before its batch is sent
+        :param idempotency_ttl: Seconds a write with an idempotency key is remembered after it succeeded.
+        Writes with the key get its result meanwhile instead of writing again
+        :param max_attempts: Attempts of a batch on 429 and 5xx of Baserow
+        :param timeout: Seconds of a batch request. Batches hold writes of many callers, so deadlines
+        of the callers don't apply: wait for futures with a timeout instead
+        """
+        if not 0 < max_batch <= BATCH_SIZE:
+            raise ValueError(f'max_batch must be from 1 to {BATCH_SIZE}')
+        self._settings = settings
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.idempotency_ttl = idempotency_ttl
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+        self._creates: Dict[int, List[_Write]] = {}
+        self._updates: Dict[int, Dict[int, _Write]] = {}
+        """Pending updates by table and row. Updates of a row are merged"""
+        self._keys: OrderedDict[str, Tuple[Future, float]] = OrderedDict()
+        """Futures of writes by idempotency key and the monotonic time they are forgotten"""
+        self._pending = 0
+        self._in_flight = 0
+        self._first_pending_at = 0.0
+        self._flushing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Writes are sent through the cassette of the context which creates the buffer, see sdk.cassette
+        self._session = http.mount(requests.Session())
+
+    @property
+    def settings(self) -> BaserowSettings:
+        return self._settings or get_baserow_settings()
+
+    def __len__(self):
+        """Amount of writes which aren't sent yet"""
+        return self._pending
+
+    def create(self, table_id: int, fields: Dict[str, Any], idempotency_key: Optional[str] = None) -> Future:
+        """Create a row
+        :param fields: Values by field names
+        :param idempotency_key: Writes with equal keys are made once, see {idempotency_ttl}
+        :returns Future of the created row
+        """
+        return self._add(table_id, None, fields, idempotency_key)
+
+    def update(self, table_id: int, row_id: int, fields: Dict[str, Any],
+               idempotency_key: Optional[str] = None) -> Future:
+        """Update fields of a row. Pending updates of the row are merged into one, later values win
+        :returns Future of the updated row
+        """
+        return self._add(table_id, row_id, fields, idempotency_key)
+
+    def _add(self, table_id: int, row_id: Optional[int], fields: Dict[str, Any], key: Optional[str]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Write buffer is closed')
+            if key is not None:
+                known = self._known(key)
+                if known is not None:
+                    return known
+                self._keys[key] = (future, float('inf'))
+
+            if row_id is None:
+                write = _Write(None, dict(fields))
+                batch = self._creates.setdefault(table_id, [])
+                batch.append(write)
+                full = len(batch) >= self.max_batch
+            else:
+                updates = self._updates.setdefault(table_id, {})
+                write = updates.get(row_id)
+                if write is None:
+                    write = updates[row_id] = _Write(row_id, dict(fields))
+                else:
+                    write.fields.update(fields)
+                full = len(updates) >= self.max_batch
+            write.futures.append(future)
+            if key is not None:
+                write.keys.append(key)
+
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending += 1
+            self._start()
+            if full or self._pending == 1:
+                self._cond.notify_all()
+        return future
+
+    def _known(self, key: str) -> Optional[Future]:
+        """Future of a pending or remembered write with the key. Must be called with the lock"""
+        now = time.monotonic()
+        while self._keys:
+            oldest, (_, forget_at) = next(iter(self._keys.items()))
+            if forget_at > now:
+                break
+            del self._keys[oldest]
+        entry = self._keys.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='baserow-writes')
+            self._thread.start()
+
+    def flush(self) -> None:
+        """Send pending writes now and wait until all sent writes are done"""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._pending and not self._in_flight)
+            self._flushing = False
+
+    def close(self) -> None:
+        """Send pending writes and stop the thread. Writes can't be added afterwards"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._session.close()
+
+    def __enter__(self) -> 'BaserowWriteBuffer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _full(self) -> bool:
+        return (any(len(batch) >= self.max_batch for batch in self._creates.values())
+                or any(len(batch) >= self.max_batch for batch in self._updates.values()))
+
+    def _due(self) -> bool:
+        return self._flushing or self._closed or time.monotonic() - self._first_pending_at >= self.max_delay
+
+    def _take(self) -> List[Tuple[int, bool, List[_Write]]]:
+        """Batches to send: all pending writes if they are due, otherwise only full batches.
+        Must be called with the lock"""
+        due = self._due()
+        batches = []
+        for table_id, writes in list(self._creates.items()):
+            while len(writes) >= self.max_batch or (due and writes):
+                batches.append((table_id, True, writes[:self.max_batch]))
+                del writes[:self.max_batch]
+            if not writes:
+                del self._creates[table_id]
+        for table_id, updates in list(self._updates.items()):
+            while len(updates) >= self.max_batch or (due and updates):
+                row_ids = list(updates)[:self.max_batch]
+                batches.append((table_id, False, [updates.pop(row_id) for row_id in row_ids]))
+            if not updates:
+                del self._updates[table_id]
+
+        # Writes left behind by full batches keep the time of the first pending write
+        taken = sum(len(write.futures) for _, _, writes in batches for write in writes)
+        self._pending -= taken
+        self._in_flight += taken
+        return batches
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending or not (self._due() or self._full()):
+                    if self._closed and not self._pending:
+                        return
+                    timeout = None
+                    if self._pending:
+                        timeout = max(0.0, self._first_pending_at + self.max_delay - time.monotonic())
+                    self._cond.wait(timeout)
+                batches = self._take()
+
+            for table_id, create, writes in batches:
+                self._send(table_id, create, writes)
+                with self._cond:
+                    self._in_flight -= sum(len(write.futures) for write in writes)
+                    self._cond.notify_all()
+
+    def _send(self, table_id: int, create: bool, writes: List[_Write]) -> None:
+        items = [write.fields if create else {'id': write.row_id, **write.fields} for write in writes]
+        try:
+            rows = self._request(table_id, create, items)
+            if len(rows) != len(writes):
+                raise BaserowError(f'Baserow returned {len(rows)} rows for {len(writes)} items', status_code=200)
+        except Exception as e:
+            logger.warning('Batch of %d rows of table %s failed: %r', len(writes), table_id, e)
+            with self._cond:
+                # Failed writes may be made again with the same keys
+                for write in writes:
+                    for key in write.keys:
+                        self._keys.pop(key, None)
+            for write in writes:
+                for future in write.futures:
+                    future.set_exception(e)
+            return
+
+        forget_at = time.monotonic() + self.idempotency_ttl
+        with self._cond:
+            for write in writes:
+                for key in write.keys:
+                    if key in self._keys:
+                        self._keys[key] = (self._keys[key][0], forget_at)
+                        self._keys.move_to_end(key)
+        for write, row in zip(writes, rows):
+            for future in write.futures:
+                future.set_result(row)
+
+    def _request(self, table_id: int, create: bool, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        url = f'{self.settings.baserow_url}/api/database/rows/table/{table_id}/batch/?user_field_names=true'
+        method = 'POST' if create else 'PATCH'
+
+        def retried(error: BaseException) -> bool:
+            # Baserow applies a batch as a whole in a transaction: 429 and 5xx answers wrote nothing.
+            # A connection failure may happen after rows were created, so only updates are retried on it
+            if isinstance(error, BaserowError):
+                return error.status_code in RETRIED_STATUS_CODES
+            return not create and isinstance(error, requests.ConnectionError)
+
+        with trace_call('baserow', f'rows/table/{table_id}/batch', rows=len(items)):
+            for attempt in Retrying(stop=stop_after_attempt(self.max_attempts), reraise=True,
+                                    retry=retry_if_exception(retried),
+                                    wait=wait_exponential(multiplier=2, min=2, max=10),
+                                    before_sleep=log_and_report_retry):
+                with attempt:
+                    response = self._session.request(method, url, json={'items': items}, headers=self.settings.headers,
+                                                     timeout=self.timeout)
+                    return _check(response)['items']
+
+
+class Link:
+    """Linked row or select option in a field of a row: its id and its primary value"""
+    __slots__ = ('id', 'value')
+
+    def __init__(self, id: int, value: Any):
+        self.id = id
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Link) and (self.id, self.value) == (other.id, other.value)
+
+    def __repr__(self):
+        return f'Link({self.id}, {self.value!r})'
+
+
+def _field_value(value: Any) -> Any:
+    if isinstance(value, list) and value and all(isinstance(v, dict) and 'id' in v and 'value' in v for v in value):
+        return tuple(Link(v['id'], v['value']) for v in value)
+    if isinstance(value, dict) and 'id' in value and 'value' in value:
+        return Link(value['id'], value['value'])
+    return value
+
+
+class Row:
+    """Row of a Baserow table. Fields are attributes, which are also read by field names: row['Дата'].
+    Link row and select fields hold `Link` objects. Subclasses for sets of fields are made by `row_type`"""
+    __slots__ = ('id',)
+
+    field_names: Tuple[str, ...] = ()
+    _attributes: Dict[str, str] = {}
+    """Attributes by field names"""
+
+    def __init__(self, id: int, *values: Any):
+        self.id = id
+        for attribute, value in zip(self._attributes.values(), values):
+            setattr(self, attribute, value)
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'Row':
+        return cls(data['id'], *(_field_value(data.get(field)) for field in cls.field_names))
+
+    def __getitem__(self, field: str) -> Any:
+        if field == 'id':
+            return self.id
+        return getattr(self, self._attributes[field])
+
+    def get(self, field: str, default: Any = None) -> Any:
+        attribute = self._attributes.get(field)
+        return getattr(self, attribute) if attribute is not None else default
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, **{field: getattr(self, attribute) for field, attribute in self._attributes.items()}}
+
+    def __eq__(self, other):
+        return isinstance(other, Row) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.as_dict()!r})'
+
+
+_NOT_IDENTIFIER = re.compile(r'\W')
+
+
+def row_type(field_names: Sequence[str], name: str = 'Row') -> Type[Row]:
+    """Slotted subclass of Row with an attribute for every field.
+    Field names which aren't identifiers get attributes with underscores, e.g. "Дата сессии" is row.Дата_сессии
+    """
+    attributes: Dict[str, str] = {}
+    for field in field_names:
+        if field == 'id' or field in attributes:
+            continue
+        attribute = _NOT_IDENTIFIER.sub('_', field) or '_'
+        if (attribute[0].isdigit() or keyword.iskeyword(attribute) or attribute.startswith('_')
+                or hasattr(Row, attribute) or attribute in attributes.values()):
+            attribute = f'f{len(attributes)}_{attribute}'
+        attributes[field] = attribute
+    return type(name, (Row,), {
+        '__slots__': tuple(attributes.values()),
+        'field_names': tuple(attributes),
+        '_attributes': attributes,
+    })
+
+
+def _retried_read(error: BaseException) -> bool:
+    if isinstance(error, BaserowError):
+        return error.status_code in RETRIED_STATUS_CODES
+    if isinstance(error, requests.RequestException):
+        return True
+    import httpx
+
+    return isinstance(error, httpx.TransportError)
+
+
+class BaserowReader:
+    """Rows of Baserow tables read page by page"""
+
+    def __init__(self,
+                 settings: Optional[BaserowSettings] = None,
+                 page_size: int = 200,
+                 prefetch: bool = True,
+                 max_attempts: int = 5,
+                 timeout: float = 30.0):
+        """
+        :param settings: Baserow settings. Default are settings from .env file, read on first use
+        :param page_size: Rows of a page, at most 200
+        :param prefetch: Request the next page while rows of the current one are processed
+        :param max_attempts: Attempts of a page on network errors, 429 and 5xx
+        :param timeout: Seconds of a page request. Requests in a deadline wait at most until it, see sdk.deadline
+        """
+        self._settings = settings
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._executor: Optional[ContextThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def settings(self) -> BaserowSettings:
+        return self._settings or get_baserow_settings()
+
+    def _prefetcher(self) -> ContextThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ContextThreadPoolExecutor(max_workers=4, thread_name_prefix='baserow-prefetch')
+            return self._executor
+
+    def url(self, table_id: int, include: Optional[Sequence[str]] = None,
+            filters: Optional[Dict[str, Any]] = None) -> str:
+        """Url of the first page
+        :param include: Fields of rows. Baserow returns only them and the id, all fields if it is None
+        :param filters: Filters of rows in the json format of Baserow, e.g.
+        {"filter_type": "AND", "filters": [{"type": "contains", "field": "Статус", "value": "Свободен"}]}
+        """
+        params: Dict[str, Any] = {'user_field_names': 'true', 'size': self.page_size}
+        if include:
+            params['include'] = ','.join(include)
+        if filters:
+            params['filters'] = json.dumps(filters, ensure_ascii=False)
+        return f'{self.settings.baserow_url}/api/database/rows/table/{table_id}/?{urlencode(params)}'
+
+    def _retrying(self, retrying_class=Retrying):
+        return retrying_class(stop=stop_after_attempt(self.max_attempts) | stop_before_deadline,
+                              retry=retry_if_exception(_retried_read),
+                              wait=wait_exponential(multiplier=2, min=2, max=10), before_sleep=log_and_report_retry)
+
+    def _fetch(self, table_id: int, url: str) -> Dict[str, Any]:
+        with trace_call('baserow', f'rows/table/{table_id}'):
+            for attempt in self._retrying():
+                with attempt:
+                    try:
+                        response = http.session().get(url, headers=self.settings.headers,
+                                                      timeout=request_timeout(self.timeout))
+                    except requests.Timeout as e:
+                        raise_if_exceeded(e)
+                        raise
+                    return _check(response)
+
+    async def _afetch(self, client, table_id: int, url: str) -> Dict[str, Any]:
+        import httpx
+
+        with trace_call('baserow', f'rows/table/{table_id}'):
+            async for attempt in self._retrying(AsyncRetrying):
+                with attempt:
+                    connect, read = request_timeout(self.timeout)
+                    try:
+                        response = await client.get(url, timeout=httpx.Timeout(read, connect=connect))
+                    except httpx.TimeoutException as e:
+                        raise_if_exceeded(e)
+                        raise
+                    return _check(response)
+
+    def pages(self, table_id: int, include: Optional[Sequence[str]] = None,
+              filters: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Rows of every page as Baserow returns them, see `url` for the parameters
+        :raises tenacity.RetryError: If a page fails {max_attempts} times
+        :raises BaserowError: If Baserow rejects the request, e.g. the table doesn't exist
+        """
+        page = self._fetch(table_id, self.url(table_id, include, filters))
+        next_page: Optional[Future] = None
+        try:
+            while True:
+                url = page.get('next')
+                if url and self.prefetch:
+                    next_page = self._prefetcher().submit(self._fetch, table_id, url)
+                yield page['results']
+                if not url:
+                    return
+                page = next_page.result() if next_page is not None else self._fetch(table_id, url)
+                next_page = None
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    def rows(self, table_id: int, include: Optional[Sequence[str]] = None, filters: Optional[Dict[str, Any]] = None,
+             row_class: Optional[Type[Row]] = None) -> Iterator[Row]:
+        """Rows of all pages
+        :param row_class: Class of rows. Default is a row type of the included fields or of the fields of the first row
+        """
+        for results in self.pages(table_id, include, filters):
+            for data in results:
+                if row_class is None:
+                    row_class = row_type(include or list(data))
+                yield row_class.from_json(data)
+
+    async def apages(self, table_id: int, include: Optional[Sequence[str]] = None,
+                     filters: Optional[Dict[str, Any]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Async version of pages"""
+        async with http.async_client(headers=self.settings.headers, timeout=self.timeout) as client:
+            page = await self._afetch(client, table_id, self.url(table_id, include, filters))
+            next_page: Optional[asyncio.Future] = None
+            try:
+                while True:
+                    url = page.get('next')
+                    if url and self.prefetch:
+                        next_page = asyncio.ensure_future(self._afetch(client, table_id, url))
+                    yield page['results']
+                    if not url:
+                        return
+                    page = await next_page if next_page is not None else await self._afetch(client, table_id, url)
+                    next_page = None
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
+                    await asyncio.gather(next_page, return_exceptions=True)
+
+    async def arows(self, table_id: int, include: Optional[Sequence[str]] = None,
+                    filters: Optional[Dict[str, Any]] = None, row_class: Optional[Type[Row]] = None) -> AsyncIterator[Row]:
+        """Async version of rows"""
+        async for results in self.apages(table_id, include, filters):
+            for data in results:
+                if row_class is None:
+                    row_class = row_type(include or list(data))
+                yield row_class.from_json(data)
+
+    def close(self) -> None:
+        """Stop prefetch threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
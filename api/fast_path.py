@@ -0,0 +1,162 @@
+"""Rule-based extraction of scheduling commands.
+
+Most commands follow fixed patterns, e.g. "Отмени сессию у Перовой Алёны 14.07 в 12:00. Заявка #17".
+They are parsed locally into the json schema of `prompt_with_baserow_id`, and only commands
+which the rules can't parse confidently are sent to the model.
+"""
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+ACTIONS: Dict[str, re.Pattern] = {
+    'cancel': re.compile(r'\bотмен\w*', re.IGNORECASE),
+    'change': re.compile(r'\bперен[еёо]\w*', re.IGNORECASE),
+    'new': re.compile(r'\b(?:запиш\w*|записат\w*|назнач\w*)', re.IGNORECASE),
+}
+"""Verb patterns of the actions"""
+
+DATE_PATTERN = re.compile(r'\b(\d{1,2})\.(\d{1,2})(?:\.(\d{4}))?\b')
+"""DD.MM or DD.MM.YYYY"""
+
+TIME_PATTERN = re.compile(r'\b([01]?\d|2[0-3]):([0-5]\d)\b')
+"""HH:MM"""
+
+TICKET_PATTERN = re.compile(r'(?:[#№]\s*|\bзаявк\w*\s+)(\d+)\b', re.IGNORECASE)
+"""#17, №17, заявка 17"""
+
+WORD_PATTERN = re.compile(r'[а-яёА-ЯЁ]+(?:-[а-яёА-ЯЁ]+)?')
+
+RELATIVE_DAY_PATTERN = re.compile(
+    r'\b(?:сегодня|завтра|послезавтра|понедельник\w*|вторник\w*|сред[аыу]|четверг\w*|пятниц\w*|суббот\w*|воскресень\w*)\b',
+    re.IGNORECASE
+)
+"""Days which need the calendar to be resolved. Commands with them are left to the model"""
+
+STOP_WORDS = frozenset({
+    'сессия', 'сессию', 'сессии', 'встреча', 'встречу', 'встречи', 'приём', 'прием', 'приёма', 'приема',
+    'консультация', 'консультацию', 'консультации', 'запись', 'записи', 'заявка', 'заявки', 'заявку',
+    'у', 'к', 'ко', 'с', 'со', 'на', 'в', 'во', 'от', 'до', 'по', 'и', 'для',
+    'пожалуйста', 'время', 'дата', 'часов', 'час', 'клиента', 'клиентку', 'клиенту', 'психолога', 'психологу',
+})
+"""Words which are neither commands nor names"""
+
+UNRESOLVED_CONFIDENCE = 0.6
+"""Confidence of commands with a name which isn't resolved to a canonical one. The model converts names
+to the nominative case, e.g. "Перовой" to "Перова", the rules can't"""
+
+
+class Extraction:
+    """Result of rule-based extraction"""
+
+    __slots__ = ('result', 'confidence')
+
+    def __init__(self, result: Dict[str, Any], confidence: float):
+        self.result = result
+        """Command in the json schema of the model's answer"""
+
+        self.confidence = confidence
+        """Confidence from 0 to 1 that the result is equal to the model's answer"""
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**self.result, 'confidence': self.confidence}
+
+
+class CommandExtractor:
+    """Deterministic extractor of action, specialist, dates, times and ticket id of scheduling commands"""
+
+    def __init__(self, year: Optional[int] = None, resolve_specialist: Optional[Callable[[str], Optional[str]]] = None):
+        """
+        :param year: Year of the sessions. Default is the current year at the moment of extraction.
+        Pass the year the prompts tell the model, so both give equal dates
+        :param resolve_specialist: Function which returns canonical name of a specialist by a name in any case
+        or None if the specialist is unknown. Commands with unresolved names get low confidence
+        """
+        self.year = year
+        self.resolve_specialist = resolve_specialist
+
+    def _parse_dates(self, text: str) -> Optional[List[str]]:
+        """ISO dates of the text or None if some date is invalid"""
+        year = self.year or datetime.now().year
+        dates = []
+        for day, month, explicit_year in DATE_PATTERN.findall(text):
+            try:
+                dates.append(date(int(explicit_year or year), int(month), int(day)).isoformat())
+            except ValueError:
+                return None
+        return dates
+
+    @staticmethod
+    def _extract_specialist(text: str) -> str:
+        """Extract words of the specialist's name as they are written"""
+        words = WORD_PATTERN.findall(text)
+        name: List[str] = []
+        for word in words:
+            if word.lower() in STOP_WORDS or any(p.fullmatch(word) for p in ACTIONS.values()):
+                if name:
+                    # Name words go one after another
+                    break
+                continue
+            name.append(word[:1].upper() + word[1:].lower())
+        return ' '.join(name)
+
+    def key_facts(self, text: str) -> Hashable:
+        """Facts which commands with equal answers share, key facts of SemanticCache: numbers and the specialist.
+        The specialist is the canonical name or, if it isn't resolved, the name as it is written:
+        "Перову" and "Перовой" may be different psychologists
+        """
+        from sdk.semantic_cache import numbers
+
+        rest = TIME_PATTERN.sub(' ', DATE_PATTERN.sub(' ', TICKET_PATTERN.sub(' ', text)))
+        specialist = self._extract_specialist(rest)
+        canonical = self.resolve_specialist(specialist) if specialist and self.resolve_specialist else None
+        return numbers(text), canonical or specialist.lower()
+
+    def extract(self, text: str) -> Extraction:
+        """Extract command from the text
+        :returns Extraction. Its confidence is 0 if the text doesn't match the rules
+        """
+        actions = [action for action, pattern in ACTIONS.items() if pattern.search(text)]
+        if len(actions) != 1 or RELATIVE_DAY_PATTERN.search(text):
+            return Extraction({}, 0.0)
+        action = actions[0]
+
+        ticket = TICKET_PATTERN.search(text)
+        # Remove ticket and dates before searching for times and names, e.g. "#17" must not be a part of the name
+        rest = TICKET_PATTERN.sub(' ', text)
+        dates = self._parse_dates(rest)
+        rest = DATE_PATTERN.sub(' ', rest)
+        times = [f'{int(h):02d}:{m}' for h, m in TIME_PATTERN.findall(rest)]
+        rest = TIME_PATTERN.sub(' ', rest)
+
+        specialist = self._extract_specialist(rest)
+        if not specialist or specialist.count(' ') > 1 or dates is None:
+            return Extraction({}, 0.0)
+
+        canonical = self.resolve_specialist(specialist) if self.resolve_specialist else None
+        if canonical is not None:
+            specialist = canonical
+
+        result: Dict[str, Any] = {'action': action, 'specialist': specialist}
+        if ticket:
+            result['ticket_id'] = int(ticket.group(1))
+
+        confidence = 1.0
+        if action == 'change':
+            if len(times) != 2 or len(dates) not in (1, 2):
+                return Extraction({}, 0.0)
+            # The only date is the date of both sessions
+            from_date, to_date = dates if len(dates) == 2 else dates * 2
+            result['params'] = {
+                'from': {'date': from_date, 'time': times[0]},
+                'to': {'date': to_date, 'time': times[1]},
+            }
+        else:
+            if len(times) != 1 or len(dates) != 1:
+                return Extraction({}, 0.0)
+            result['date'] = dates[0]
+            result['time'] = times[0]
+
+        if canonical is None:
+            # The name may be inflected, e.g. "Отмени сессию Перовой", and the model would answer "Перова"
+            confidence *= UNRESOLVED_CONFIDENCE
+        return Extraction(result, confidence)
@@ -0,0 +1,187 @@
+"""In-memory index of psychologists' names.
+
+Users and the model write names in any case and order: "у Алёны Перовой", "к перовой", "Перова Алёна".
+The index maps such names to canonical records of the psychologists table: words are reduced to
+stems by stripping Russian case endings, then matched exactly or by trigram similarity.
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+from pydantic import ValidationError
+from tenacity import RetryError
+
+from api.baserow import BaserowReader
+from api.settings import BaserowSettings, get_baserow_settings
+from sdk.exceptions import DeadlineExceeded
+
+CASE_ENDINGS = (
+    'ыми', 'ими', 'ого', 'его', 'ому', 'ему',
+    'ой', 'ей', 'ым', 'им', 'ом', 'ем', 'ую', 'юю', 'ая', 'яя',
+    'а', 'я', 'у', 'ю', 'ы', 'и', 'е', 'ь', 'й',
+)
+"""Case endings of Russian names. The longest matching one is stripped"""
+
+MIN_STEM_LENGTH = 3
+
+
+def stem(word: str) -> str:
+    """Reduce a name word to a stem which is the same in all cases, e.g. Перовой, Перову, Перова -> перов"""
+    word = word.lower().replace('ё', 'е').strip()
+    for ending in CASE_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameMatch:
+    """Record found by name"""
+
+    __slots__ = ('record_id', 'name', 'score')
+
+    def __init__(self, record_id: int, name: str, score: float):
+        self.record_id = record_id
+        self.name = name
+        """Canonical name of the record"""
+        self.score = score
+        """Similarity from 0 to 1"""
+
+    def __repr__(self):
+        return f'NameMatch(record_id={self.record_id}, name={self.name!r}, score={self.score:.2f})'
+
+
+class NameIndex:
+    """Index of names with lookup tolerant to cases, word order and typos"""
+
+    def __init__(self, records: Iterable[Tuple[int, str]] = (), min_score: float = 0.6, min_margin: float = 0.1):
+        """
+        :param records: (record id, canonical name) pairs
+        :param min_score: Matches with lower similarity are not returned
+        :param min_margin: The best match is returned only if it's better than the second one by this margin
+        """
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self._names: Dict[int, str] = {}
+        self._stems: Dict[int, List[Tuple[str, Set[str]]]] = {}
+        """Stems of record's words with their trigrams"""
+        self._by_trigram: Dict[str, Set[int]] = {}
+        for record_id, name in records:
+            self.add(record_id, name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, record_id: int, name: str) -> None:
+        """Add a record to the index"""
+        stems = [stem(w) for w in name.split()]
+        if not stems:
+            return
+        self._names[record_id] = ' '.join(name.split())
+        self._stems[record_id] = [(s, trigrams(s)) for s in stems]
+        for s in stems:
+            for trigram in trigrams(s):
+                self._by_trigram.setdefault(trigram, set()).add(record_id)
+
+    @staticmethod
+    def _similarity(query_stem: str, query_trigrams: Set[str], record_stems: List[Tuple[str, Set[str]]]) -> float:
+        best = 0.0
+        for record_stem, record_trigrams in record_stems:
+            if record_stem == query_stem:
+                return 1.0
+            best = max(best, len(query_trigrams & record_trigrams) / len(query_trigrams | record_trigrams))
+        return best
+
+    def lookup(self, name: str) -> Optional[NameMatch]:
+        """Find the record of a name
+        :param name: Name in any case and word order, e.g. "Алёны Перовой" or "перова"
+        :returns The best match or None if there is no confident unambiguous match
+        """
+        query = [(s, trigrams(s)) for s in (stem(w) for w in name.split())]
+        if not query:
+            return None
+
+        candidates: Set[int] = set()
+        for _, query_trigrams in query:
+            for trigram in query_trigrams:
+                candidates |= self._by_trigram.get(trigram, set())
+
+        scored = sorted(
+            (
+                (sum(self._similarity(s, t, self._stems[record_id]) for s, t in query) / len(query), record_id)
+                for record_id in candidates
+            ),
+            reverse=True
+        )
+        if not scored or scored[0][0] < self.min_score:
+            return None
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < self.min_margin:
+            return None
+
+        score, record_id = scored[0]
+        return NameMatch(record_id, self._names[record_id], score)
+
+
+class PsychologistDirectory:
+    """Name index of Baserow psychologists table. Loaded on first use and reloaded every {ttl} seconds"""
+
+    retry_delay: float = 30
+    """Delay before the next loading attempt after a failed one"""
+
+    def __init__(self, settings: Optional[BaserowSettings] = None, ttl: float = 600):
+        """
+        :param settings: Baserow settings. Default are settings from .env file, read on first load
+        """
+        self._settings = settings
+        self.ttl = ttl
+        self._index: Optional[NameIndex] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        # Failed loads are retried after {retry_delay}, not by the reader
+        self.reader = BaserowReader(settings, max_attempts=1)
+
+    @property
+    def settings(self) -> BaserowSettings:
+        return self._settings or get_baserow_settings()
+
+    @property
+    def configured(self) -> bool:
+        """The psychologists table is set. Without it names aren't normalized locally"""
+        try:
+            return self.settings.baserow_psychologists_table_id is not None
+        except ValidationError:
+            # Without Baserow settings there is no table to load either
+            return False
+
+    def _load(self) -> NameIndex:
+        table_id = self.settings.baserow_psychologists_table_id
+        if table_id is None:
+            return NameIndex()
+
+        field = self.settings.baserow_psychologist_name_field
+        rows = self.reader.rows(table_id, include=(field,))
+        records = [(row.id, row[field]) for row in rows if row[field]]
+        return NameIndex(records)
+
+    @property
+    def index(self) -> NameIndex:
+        if self._index is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._index is None or time.monotonic() - self._loaded_at > self.ttl:
+                    try:
+                        self._index = self._load()
+                        self._loaded_at = time.monotonic()
+                    except (requests.RequestException, RetryError, DeadlineExceeded):
+                        # Keep the stale index, an empty one if there is none yet, and retry later.
+                        # A load cut by the deadline of a request is retried later too
+                        self._index = self._index or NameIndex()
+                        self._loaded_at = time.monotonic() - self.ttl + self.retry_delay
+        return self._index
+
+    def lookup(self, name: str) -> Optional[NameMatch]:
+        return self.index.lookup(name)
@@ -0,0 +1,38 @@
+"""System prompts of the API. Prompts are stored in text files of this package and read on first use"""
+import os
+import re
+from functools import lru_cache
+
+PROMPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_CURRENT_YEAR = re.compile(r'(Текущий год: )\d{4}')
+
+_ANSWER_ALGORITHM = 'Алгоритм формирования ответа'
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    """Text of the prompt from {name}.txt
+    :raises FileNotFoundError: If there is no such prompt
+    """
+    with open(os.path.join(PROMPTS_DIR, f'{name}.txt'), encoding='utf-8') as f:
+        return f.read()
+
+
+def with_year(prompt: str, year: int) -> str:
+    """Prompt which tells the model that the current year is {year}. Prompts are written with a fixed year"""
+    return _CURRENT_YEAR.sub(rf'\g<1>{year}', prompt)
+
+
+def with_name_normalization(prompt: str) -> str:
+    """Prompt which asks the model to write names in full and in the nominative case. For APIs without
+    the psychologists table, which normalizes names locally. The instructions go before the answer algorithm"""
+    return prompt.replace(_ANSWER_ALGORITHM, load_prompt('name_normalization') + _ANSWER_ALGORITHM, 1)
+
+
+def __getattr__(name: str) -> str:
+    # `from api.prompts import prompt_with_date` keeps working, but reads only the imported prompt
+    try:
+        return load_prompt(name)
+    except FileNotFoundError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
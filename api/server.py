@@ -0,0 +1,43 @@
+"""Production server of the API:
+
+    python -m api.server --workers 4
+
+Runs the API in N worker processes. On SIGTERM or SIGINT the workers stop accepting
+connections and finish in-flight requests for up to the graceful timeout. Completions and
+free slots are cached in a SQLite file shared by the workers, see ServerSettings.
+Defaults of the options are taken from .env file.
+"""
+import argparse
+import os
+from typing import Optional, Sequence
+
+import uvicorn
+
+from api.settings import get_server_settings
+
+APP = 'api.main:app'
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    settings = get_server_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=settings.server_host)
+    parser.add_argument('--port', type=int, default=settings.server_port)
+    parser.add_argument('--workers', type=int, default=settings.server_workers or os.cpu_count() or 1)
+    parser.add_argument('--graceful-timeout', type=float, default=settings.server_graceful_timeout,
+                        help='Seconds to finish in-flight requests on shutdown')
+    args = parser.parse_args(argv)
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=int(args.graceful_timeout),
+        # Workers are behind a load balancer or docker's proxy
+        proxy_headers=True,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+from functools import lru_cache
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from sdk.llm.yandex.settings import CONFIG_PATH
+
+
+class BaserowSettings(BaseSettings):
+    """Baserow connection and tables from .env file"""
+    baserow_url: str = 'https://baserow.hrani.live'
+    baserow_token: str
+    """Database token of Baserow. Required: set BASEROW_TOKEN in .env file or the environment"""
+
+    baserow_slots_table_id: int = 373
+    """Table of psychologists' time slots"""
+
+    baserow_psychologists_table_id: Optional[int] = None
+    """Table of psychologists. Names aren't normalized if it isn't set"""
+
+    baserow_psychologist_name_field: str = 'Имя'
+    """Field of psychologists table with full name of psychologist"""
+
+    model_config = SettingsConfigDict(env_file=CONFIG_PATH, extra='ignore')
+
+    @property
+    def headers(self):
+        """Returns auth headers"""
+        return {'Authorization': f'Token {self.baserow_token}'}
+
+
+class ServerSettings(BaseSettings):
+    """Workers of the API server and caches shared by them, from .env file"""
+    server_host: str = '0.0.0.0'
+    server_port: int = 3125
+
+    server_workers: Optional[int] = None
+    """Amount of worker processes. Default is the amount of CPUs"""
+
+    server_graceful_timeout: float = 30
+    """Seconds to finish in-flight requests after SIGTERM or SIGINT"""
+
+    server_json_logs: bool = False
+    """Write logs of the workers as json lines"""
+
+    scheduler_max_concurrency: int = 10
+    """Most model requests of a worker served at the same time. Others wait in the priority queue"""
+
+    adaptive_concurrency: bool = True
+    """Find the amount of concurrent model requests the provider serves without 429, up to scheduler_max_concurrency"""
+
+    initial_concurrency: int = 4
+    """Concurrent model requests of a worker until the adaptive limit learns the capacity of the provider"""
+
+    interactive_timeout: float = 10
+    """Seconds in which model requests of interactive endpoints must start, otherwise they get 503"""
+
+    request_timeout: float = 30
+    """Seconds of a whole request of an endpoint. Model and Baserow requests and their retries get
+    the remaining time, requests which can't finish in it get 503"""
+
+    cache_path: str = os.path.join(tempfile.gettempdir(), 'gpt-sdk-cache.sqlite3')
+    """SQLite file of caches shared by the workers"""
+
+    completion_cache_ttl: float = 24 * 60 * 60
+    """Seconds to keep model completions. Completions aren't cached if it is 0"""
+
+    slots_cache_ttl: float = 30
+    """Seconds to keep free slots of Baserow. Slots aren't cached if it is 0"""
+
+    semantic_cache_size: int = 0
+    """Prompts of a worker kept by the cache of near-duplicate prompts. The cache is disabled if it is 0"""
+
+    semantic_cache_threshold: float = 0.8
+    """Least similarity of near-duplicate prompts, see benchmarks.semantic_cache for its precision and recall"""
+
+    model_config = SettingsConfigDict(env_file=CONFIG_PATH, extra='ignore')
+
+
+@lru_cache(maxsize=None)
+def get_server_settings() -> ServerSettings:
+    """Settings from .env file. Read on first use"""
+    return ServerSettings()
+
+
+@lru_cache(maxsize=None)
+def get_baserow_settings() -> BaserowSettings:
+    """Settings from .env file. Read on first use, so importing the API doesn't need them"""
+    return BaserowSettings()
@@ -0,0 +1,64 @@
+"""Free time slots of psychologists from Baserow slots table"""
+import json
+from typing import List, Optional
+
+from tenacity import Retrying, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+
+from api.baserow import BaserowReader
+from api.settings import BaserowSettings, get_baserow_settings
+from sdk.cache import BaseCache
+from sdk.deadline import stop_before_deadline
+from sdk.exceptions import DeadlineExceeded
+from sdk.retry import log_and_report_retry
+
+PSYCHOLOGIST_FIELD = 'Психолог'
+
+
+class SlotIndex:
+    """Psychologists with a free slot at a date and time.
+    Answers are kept in a cache, which is shared by the workers if it is SQLiteCache"""
+
+    def __init__(self, settings: Optional[BaserowSettings] = None, cache: Optional[BaseCache] = None):
+        """
+        :param settings: Baserow settings. Default are settings from .env file, read on first use
+        :param cache: Cache of answers. Use a cache with a short ttl: slots are booked all the time
+        """
+        self._settings = settings
+        self.cache = cache
+        # Whole fetches are retried below, so a failed page isn't retried by the reader
+        self.reader = BaserowReader(settings, max_attempts=1)
+
+    @property
+    def settings(self) -> BaserowSettings:
+        return self._settings or get_baserow_settings()
+
+    def free_psychologists(self, date: str, time: str) -> List[str]:
+        """Names of psychologists with a free slot, one name per slot
+        :param date: Date in the format of the table, e.g. 14/07/2024
+        :param time: Time, e.g. 12:00
+        :raises tenacity.RetryError: If Baserow fails 5 times in a row or a retry can't finish before the deadline
+        :raises DeadlineExceeded: If the deadline passes
+        """
+        key = f'{date} {time}'
+        if self.cache is not None:
+            cached = self.cache.lookup(key)
+            if cached is not None:
+                return json.loads(cached)
+
+        names = self._fetch(date, time)
+        if self.cache is not None:
+            self.cache.update(key, json.dumps(names, ensure_ascii=False))
+        return names
+
+    def _fetch(self, date: str, time: str) -> List[str]:
+        filters = {'filter_type': 'AND', 'filters': [
+            {'type': 'contains', 'field': 'Время', 'value': time},
+            {'type': 'contains', 'field': 'Дата', 'value': date},
+            {'type': 'contains', 'field': 'Статус', 'value': 'Свободен'},
+        ], 'groups': []}
+        for attempt in Retrying(stop=stop_after_attempt(5) | stop_before_deadline,
+                                retry=retry_if_not_exception_type(DeadlineExceeded),
+                                wait=wait_exponential(multiplier=2, min=2, max=10), before_sleep=log_and_report_retry):
+            with attempt:
+                rows = self.reader.rows(self.settings.baserow_slots_table_id, (PSYCHOLOGIST_FIELD,), filters)
+                return [row[PSYCHOLOGIST_FIELD][0].value for row in rows if row[PSYCHOLOGIST_FIELD]]
@@ -0,0 +1,24 @@
+"""Run the SDK benchmarks and write all results as one json document:
+
+    python -m benchmarks --output results.json
+
+The API load test starts servers and is run separately with `python -m benchmarks.api_load`.
+"""
+import argparse
+
+from benchmarks import micro, model_throughput, runnable_overhead, semantic_cache
+from benchmarks.common import write_results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100, help='Model calls per benchmark')
+    parser.add_argument('--latency', default='lognormal:0.05:0.5', help='Latency of the mock completion API')
+    parser.add_argument('--output', help='Write json to the file instead of stdout')
+    args = parser.parse_args()
+
+    write_results('all', {
+        'runnable_overhead': runnable_overhead.run(),
+        'micro': micro.run(),
+        'semantic_cache': semantic_cache.run(),
+        'model_throughput': model_throughput.run(args.calls, latency=args.latency),
+    }, args.output)
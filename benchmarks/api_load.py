@@ -0,0 +1,145 @@
+"""Load test of the API endpoints.
+
+Sends requests to every endpoint from {concurrency} concurrent clients and reports latency
+percentiles and throughput per endpoint. With --mock the API is started in a subprocess
+which talks to a local mock of the completion and Baserow APIs, otherwise --url must
+point to a running API. Run with:
+
+    python -m benchmarks.api_load --mock --requests 500 --concurrency 32 --output api.json
+
+The environment is passed to the API, so with SDK_CASSETTE it replays recorded completions
+and Baserow responses instead of calling the mock, see sdk.cassette.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import summarize, write_results
+from benchmarks.mock_server import MockServer
+
+API_PORT = 3125
+
+ENDPOINTS: Dict[str, Tuple[str, str, Dict[str, str]]] = {
+    'action-info': ('GET', '/action-info', {'user_prompt': 'Перенеси сессию у Перовой Алёны с 14.07 12:00 на 15.07 13:00'}),
+    'action-info-with-bid/fast-path': (
+        'GET', '/action-info-with-bid', {'user_prompt': 'Отмени сессию у Давиташвили 14.07 в 12:00. Заявка #17'}
+    ),
+    'action-info-with-bid/model': (
+        'GET', '/action-info-with-bid', {'user_prompt': 'Клиентка просит отменить завтрашнюю встречу с Алёной'}
+    ),
+    'group-free-slots-by-psychologist': ('POST', '/group-free-slots-by-psychologist', {'slots': '01.07 11:00;02.07 12:00'}),
+    'metrics': ('GET', '/metrics', {}),
+}
+"""Benchmarked requests: (method, path, query parameters)"""
+
+
+async def load(client: httpx.AsyncClient, method: str, path: str, params: Dict[str, str],
+               requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params)
+                failed = response.status_code >= 400 or 'error' in response.text[:20]
+            except httpx.HTTPError:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run_load(url: str, requests: int, concurrency: int, endpoints: List[str]) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        results = {}
+        for name in endpoints:
+            method, path, params = ENDPOINTS[name]
+            results[name] = await load(client, method, path, params, requests, concurrency)
+        return results
+
+
+def wait_for_api(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'API exited with code {process.returncode}')
+        try:
+            httpx.get(url + '/metrics', timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise TimeoutError('API did not start')
+
+
+def run(url: Optional[str] = None, requests: int = 200, concurrency: int = 16,
+        endpoints: Optional[List[str]] = None, latency: str = 'lognormal:0.05:0.5',
+        baserow_latency: str = 'fixed:0.01', rate_limit_rate: float = 0.0, workers: int = 1) -> Dict[str, Any]:
+    """Load the API at {url} or, if it is None, an API started with the mock"""
+    endpoints = endpoints or list(ENDPOINTS)
+    if url is not None:
+        return {'url': url, 'endpoints': asyncio.run(run_load(url, requests, concurrency, endpoints))}
+
+    with MockServer(latency=latency, baserow_latency=baserow_latency, rate_limit_rate=rate_limit_rate, seed=0) as mock, \
+            tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'YC_COMPLETION_URL': mock.completion_url,
+            'BASEROW_URL': mock.url,
+            'BASEROW_TOKEN': 'mock',
+            'BASEROW_PSYCHOLOGISTS_TABLE_ID': '374',
+            # Every run starts with empty caches
+            'CACHE_PATH': os.path.join(tmp, 'cache.sqlite3'),
+        }
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'api.server', '--host', '127.0.0.1', '--port', str(API_PORT), '--workers', str(workers)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        url = f'http://127.0.0.1:{API_PORT}'
+        try:
+            wait_for_api(url, process)
+            results = asyncio.run(run_load(url, requests, concurrency, endpoints))
+        finally:
+            process.terminate()
+            process.wait()
+        return {
+            'mock': {'latency': latency, 'baserow_latency': baserow_latency, 'rate_limit_rate': rate_limit_rate,
+                     'requests': dict(mock.stats)},
+            'concurrency': concurrency,
+            'workers': workers,
+            'endpoints': results,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='Url of a running API')
+    target.add_argument('--mock', action='store_true', help='Start the API with mock completion and Baserow APIs')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), help='Default is all endpoints')
+    parser.add_argument('--latency', default='lognormal:0.05:0.5')
+    parser.add_argument('--baserow-latency', default='fixed:0.01')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=1, help='Workers of the API started with --mock')
+    parser.add_argument('--output', help='Write json to the file instead of stdout')
+    args = parser.parse_args()
+    write_results('api_load', run(args.url, args.requests, args.concurrency, args.endpoint, args.latency,
+                                  args.baserow_latency, args.rate_limit_rate, args.workers), args.output)
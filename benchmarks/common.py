@@ -0,0 +1,59 @@
+"""Helpers shared by benchmarks: latency summaries and json results"""
+import json
+import platform
+import sys
+import time
+from typing import Any, Dict, Optional, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentile {q} from 0 to 100 with linear interpolation"""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies: Sequence[float], elapsed: Optional[float] = None, errors: int = 0) -> Dict[str, Any]:
+    """Count, throughput and latency percentiles in milliseconds
+    :param latencies: Latencies of successful calls in seconds
+    :param elapsed: Wall time of all calls. Throughput isn't reported without it
+    """
+    summary: Dict[str, Any] = {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000 if latencies else float('nan'),
+    }
+    if elapsed is not None:
+        summary['elapsed_s'] = elapsed
+        summary['throughput_rps'] = len(latencies) / elapsed if elapsed else float('nan')
+    return summary
+
+
+def environment() -> Dict[str, str]:
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def write_results(name: str, results: Any, output: Optional[str] = None) -> str:
+    """Dump results with the environment as json to the file or stdout
+    :returns The json
+    """
+    data = json.dumps({'benchmark': name, 'environment': environment(), 'results': results},
+                      indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+    return data
+
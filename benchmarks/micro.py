@@ -0,0 +1,132 @@
+"""Microbenchmarks of message merging and serialization.
+
+- merge: summing streamed chunk messages and merging their contents
+- serialization: json and the compact codec for message histories, completion request bodies
+- payload: completion request body with a 30 KB system prompt, encoded as a whole with json
+  as `requests` does and with the cached prefix of PayloadEncoder: time and allocated bytes
+- parse: JsonOutputParser on a typical model answer
+
+Run with:
+
+    python -m benchmarks.micro --output micro.json
+"""
+import argparse
+import json
+import timeit
+import tracemalloc
+from functools import reduce
+from typing import Any, Callable, Dict
+
+from benchmarks.common import write_results
+from benchmarks.mock_server import DEFAULT_ANSWER
+from sdk.llm.yandex.model import YandexGPT
+from sdk.llm.yandex.payload import PayloadEncoder
+from sdk.llm.yandex.settings import YandexAuth
+from sdk.messages.base import merge_content, messages_to_dict
+from sdk.messages.codec import decode_messages, encode_messages
+from sdk.messages.human import HumanChunkMessage, HumanMessage
+from sdk.messages.system import SystemMessage
+from sdk.messages.utils import messages_from_dict
+from sdk.output_parsers.json import JsonOutputParser
+
+
+def measure(func: Callable[[], Any], number: int, repeat: int = 5) -> Dict[str, float]:
+    """Best and median time of one call in microseconds"""
+    times = sorted(t / number * 1e6 for t in timeit.repeat(func, number=number, repeat=repeat))
+    return {'best_us': times[0], 'median_us': times[len(times) // 2]}
+
+
+def history(size: int):
+    messages = [SystemMessage(content='Ты помощник администратора психологического центра.')]
+    for i in range(size - 1):
+        messages.append(HumanMessage(content=f'Отмени сессию у Перовой Алёны 14.07 в 12:00. Заявка #{i}'))
+    return messages
+
+
+def bench_merge(number: int) -> Dict[str, Any]:
+    chunks = [HumanChunkMessage(content=f'часть {i} ') for i in range(50)]
+    contents = [c.content for c in chunks]
+    return {
+        'chunk_add_50': measure(lambda: reduce(lambda a, b: a + b, chunks), number // 10),
+        'merge_content_50': measure(lambda: merge_content(*contents), number),
+    }
+
+
+def bench_serialization(number: int, history_size: int) -> Dict[str, Any]:
+    messages = history(history_size)
+    as_json = json.dumps(messages_to_dict(messages), ensure_ascii=False)
+    encoded = encode_messages(messages)
+    model = YandexGPT()
+    prompts = [{'role': 'user', 'text': m.content} for m in messages]
+    iterations = max(1, number // history_size)
+    return {
+        'history_size': history_size,
+        'json_bytes': len(as_json.encode()),
+        'codec_bytes': len(encoded),
+        'json_encode': measure(lambda: json.dumps(messages_to_dict(messages), ensure_ascii=False), iterations),
+        'json_decode': measure(lambda: messages_from_dict(json.loads(as_json)), iterations),
+        'codec_encode': measure(lambda: encode_messages(messages), iterations),
+        'codec_decode': measure(lambda: decode_messages(encoded), iterations),
+        'completion_request': measure(lambda: json.dumps(model._completion_request(prompts)), iterations),
+    }
+
+
+def allocated(func: Callable[[], Any]) -> int:
+    """Peak bytes allocated by one call"""
+    func()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_payload(number: int, system_prompt_kb: int = 30) -> Dict[str, Any]:
+    line = 'Ты помощник администратора психологического центра. Отвечай в формате json.\n'
+    system = line * (system_prompt_kb * 1024 // len(line.encode()))
+    model = YandexGPT()
+    model.auth = YandexAuth(yc_api_key_id='id', yc_api_key='key', yc_folder_id='folder')
+    model.payload_encoder = PayloadEncoder()
+    calls = iter(range(10 ** 9))
+
+    def prompts():
+        # A new user message on every call, like requests of users
+        return [{'role': 'system', 'text': system}, {'role': 'user', 'text': f'Отмени заявку #{next(calls)}'}]
+
+    def stdlib_json():
+        # requests encodes json= bodies with json.dumps and the default ensure_ascii
+        return json.dumps(model._completion_request(prompts())).encode()
+
+    def precompiled():
+        return model._completion_body(prompts())
+
+    iterations = max(1, number // 10)
+    return {
+        'body_bytes': {'json': len(stdlib_json()), 'precompiled': len(precompiled())},
+        'json': {**measure(stdlib_json, iterations), 'allocated_bytes': allocated(stdlib_json)},
+        'precompiled': {**measure(precompiled, iterations), 'allocated_bytes': allocated(precompiled)},
+    }
+
+
+def bench_parse(number: int) -> Dict[str, Any]:
+    parser = JsonOutputParser()
+    return {'json_output_parser': measure(lambda: parser.parse(DEFAULT_ANSWER), number)}
+
+
+def run(number: int = 10000, history_size: int = 100) -> Dict[str, Any]:
+    return {
+        'merge': bench_merge(number),
+        'serialization': bench_serialization(number, history_size),
+        'payload': bench_payload(number),
+        'parse': bench_parse(number),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=10000)
+    parser.add_argument('--history-size', type=int, default=100)
+    parser.add_argument('--output', help='Write json to the file instead of stdout')
+    args = parser.parse_args()
+    write_results('micro', run(args.number, args.history_size), args.output)
@@ -0,0 +1,478 @@
+"""Local mock of YandexGPT completion API and Baserow rows API.
+
+Speaks the request/response shape of `/foundationModels/v1/completion` (including the
+streaming mode, where every line is a json with the whole text generated so far), of the
+deferred `/foundationModels/v1/completionAsync` with `/operations/{id}` and of
+`/api/database/rows/table/{id}/`, so the SDK and the API can be benchmarked without the
+paid API. Latency is drawn from a configurable distribution, errors and 429 responses
+are injected with configurable rates. Run standalone with:
+
+    python -m benchmarks.mock_server --port 8900 --latency lognormal:0.3:0.5 --rate-limit-rate 0.05
+"""
+import argparse
+import json
+import math
+import random
+import re
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+COMPLETION_PATH = '/foundationModels/v1/completion'
+ASYNC_COMPLETION_PATH = '/foundationModels/v1/completionAsync'
+OPERATIONS_PATH = '/operations'
+ROWS_PATH = re.compile(r'^/api/database/rows/table/(\d+)/$')
+BATCH_ROWS_PATH = re.compile(r'^/api/database/rows/table/(\d+)/batch/$')
+BATCH_SIZE_LIMIT = 200
+"""Most rows of a batch request, as in Baserow"""
+
+DEFAULT_ANSWER = (
+    '```\n{"action": "cancel", "specialist": "Перова Алёна", "date": "2024-07-14", "time": "12:00"}\n```'
+)
+
+
+class Latency:
+    """Distribution of response delays in seconds.
+
+    Specs: `fixed:S`, `uniform:MIN:MAX`, `normal:MEAN:STDDEV`, `lognormal:MEDIAN:SIGMA`.
+    Negative samples are clipped to 0
+    """
+
+    def __init__(self, spec: str = 'fixed:0', seed: Optional[int] = None):
+        kind, *params = spec.split(':')
+        self.spec = spec
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        values = [float(p) for p in params]
+        samplers: Dict[str, Callable[[], float]] = {
+            'fixed': lambda: values[0],
+            'uniform': lambda: self._random.uniform(values[0], values[1]),
+            'normal': lambda: self._random.gauss(values[0], values[1]),
+            'lognormal': lambda: self._random.lognormvariate(math.log(values[0]), values[1]) if values[0] > 0 else 0,
+        }
+        expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if kind not in samplers or len(values) != expected[kind]:
+            raise ValueError(f'Invalid latency spec: {spec}')
+        self._sample = samplers[kind]
+
+    def sample(self) -> float:
+        # random.Random isn't thread safe for gauss
+        with self._lock:
+            return max(0.0, self._sample())
+
+    def __repr__(self):
+        return f'Latency({self.spec!r})'
+
+
+def _tokens(text: str) -> int:
+    """Rough token count of Russian text"""
+    return max(1, len(text) // 4)
+
+
+def slot_rows(count: int = 500) -> List[Dict[str, Any]]:
+    """Rows of a slots table with the fields used by the API"""
+    psychologists = ['Перова Алёна', 'Иванов Пётр', 'Смирнова Анна', 'Кузнецов Олег']
+    rows = []
+    for i in range(count):
+        day = i // 40 % 28 + 1
+        rows.append({
+            'id': i + 1,
+            'Психолог': [{'id': i % len(psychologists) + 1, 'value': psychologists[i % len(psychologists)]}],
+            'Дата': f'{day:02d}/07/{time.localtime().tm_year}',
+            'Время': f'{10 + i % 10}:00',
+            'Статус': 'Свободен' if i % 3 else 'Занят',
+        })
+    return rows
+
+
+def psychologist_rows() -> List[Dict[str, Any]]:
+    """Rows of a psychologists table"""
+    names = ['Перова Алёна', 'Иванов Пётр', 'Смирнова Анна', 'Кузнецов Олег']
+    return [{'id': i + 1, 'Имя': name} for i, name in enumerate(names)]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    """The default backlog of 5 drops connections of concurrent clients, which then wait for SYN retransmission"""
+
+
+class MockServer:
+    """Mock APIs served by a ThreadingHTTPServer in a daemon thread. Use as a context manager"""
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency: Union[Latency, str] = 'fixed:0',
+                 baserow_latency: Union[Latency, str] = 'fixed:0',
+                 error_rate: float = 0.0,
+                 baserow_error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 capacity: Optional[int] = None,
+                 invalid_keys: Sequence[str] = (),
+                 stream_chunks: int = 8,
+                 answer: Union[str, Callable[[List[Dict[str, str]]], str]] = DEFAULT_ANSWER,
+                 tables: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+                 seed: Optional[int] = None):
+        """
+        :param port: 0 picks a free port
+        :param latency: Delay of completion responses. Streamed responses spread it over the chunks,
+        deferred completions are done after it
+        :param error_rate: Share of completion requests answered with 500
+        :param baserow_error_rate: Share of Baserow requests answered with 503
+        :param rate_limit_rate: Share of completion requests answered with 429
+        :param capacity: Completion requests of a folder (x-folder-id header) served at the same time, others
+        are answered with 429. Unlimited if None
+        :param invalid_keys: API keys answered with 401
+        :param stream_chunks: Amount of lines of streamed responses
+        :param answer: Text of the model or function of request messages which returns it
+        :param tables: Rows of Baserow tables by table id. Default is a slots table 373 and psychologists table 374
+        """
+        self.latency = Latency(latency, seed) if isinstance(latency, str) else latency
+        self.baserow_latency = Latency(baserow_latency, seed) if isinstance(baserow_latency, str) else baserow_latency
+        self.error_rate = error_rate
+        self.baserow_error_rate = baserow_error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.capacity = capacity
+        self.invalid_keys = set(invalid_keys)
+        self.in_flight: Dict[str, int] = {}
+        """Completion requests being served by folder"""
+        self.max_in_flight = 0
+        self.folders: Dict[str, int] = {}
+        """Served completion requests by folder"""
+        self.stream_chunks = stream_chunks
+        self.answer = answer
+        self.tables = tables if tables is not None else {373: slot_rows(), 374: psychologist_rows()}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'completion': 0, 'stream': 0, 'rate_limited': 0, 'errors': 0, 'baserow': 0,
+                                      'async_completion': 0, 'operation_polls': 0, 'unauthorized': 0, 'stream_cancelled': 0,
+                                      'baserow_batch': 0, 'baserow_batch_rows': 0, 'baserow_errors': 0}
+        """Amount of handled requests by kind"""
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        """Deferred completions by id: time when they are done and their response"""
+        self._operation_ids = itertools.count(1)
+
+        self._server = _Server((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def completion_url(self) -> str:
+        return self.url + COMPLETION_PATH
+
+    @property
+    def async_completion_url(self) -> str:
+        return self.url + ASYNC_COMPLETION_PATH
+
+    @property
+    def operations_url(self) -> str:
+        return self.url + OPERATIONS_PATH
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name='mock-server')
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.stats[kind] += 1
+
+    def _injected_failure(self, folder: str) -> Optional[int]:
+        """Status code of an injected failure or None. Requests without 429 are in flight until `_done`"""
+        with self._lock:
+            roll = self._random.random()
+            in_flight = self.in_flight.get(folder, 0)
+            if roll < self.rate_limit_rate or (self.capacity is not None and in_flight >= self.capacity):
+                return 429
+            self.in_flight[folder] = in_flight + 1
+            self.max_in_flight = max(self.max_in_flight, in_flight + 1)
+            self.folders[folder] = self.folders.get(folder, 0) + 1
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+    def _done(self, folder: str) -> None:
+        with self._lock:
+            self.in_flight[folder] -= 1
+
+    def _operation(self, done_at: float, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a deferred completion and return its operation as the API answers on submission"""
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        operation = {
+            'id': f'd7q{next(self._operation_ids):017d}',
+            'description': 'Async GPT Completion',
+            'createdAt': now,
+            'createdBy': 'mock',
+            'modifiedAt': now,
+            'done': False,
+            'metadata': None,
+        }
+        with self._lock:
+            self.operations[operation['id']] = {**operation, 'done_at': done_at, 'response': response}
+        return operation
+
+    def _answer(self, messages: List[Dict[str, str]]) -> str:
+        return self.answer(messages) if callable(self.answer) else self.answer
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read_json(self) -> Any:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _baserow_failed(self) -> bool:
+                """Answer with an injected 503"""
+                with server._lock:
+                    failed = server._random.random() < server.baserow_error_rate
+                if failed:
+                    server._count('baserow_errors')
+                    self._send_json(503, {'error': 'ERROR_SERVICE_UNAVAILABLE'})
+                return failed
+
+            def _write_rows(self, table_id: int, create: bool) -> None:
+                """Batch create or update of rows. Like Baserow, a batch is applied as a whole or not at all"""
+                items = self._read_json().get('items', [])
+                if self._baserow_failed():
+                    return
+                if not 0 < len(items) <= BATCH_SIZE_LIMIT:
+                    self._send_json(400, {'error': 'ERROR_REQUEST_BODY_VALIDATION',
+                                          'detail': f'Batch must have 1 to {BATCH_SIZE_LIMIT} items'})
+                    return
+                server._count('baserow_batch')
+                time.sleep(server.baserow_latency.sample())
+                with server._lock:
+                    rows = server.tables[table_id]
+                    by_id = {row['id']: row for row in rows}
+                    missing = [item.get('id') for item in items if not create and item.get('id') not in by_id]
+                    if missing:
+                        self._send_json(404, {'error': 'ERROR_ROW_DOES_NOT_EXIST',
+                                              'detail': f'The rows {missing} do not exist'})
+                        return
+                    written = []
+                    for item in items:
+                        if create:
+                            row = {**item, 'id': max(by_id, default=0) + 1}
+                            rows.append(row)
+                            by_id[row['id']] = row
+                        else:
+                            row = by_id[item['id']]
+                            row.update(item)
+                        written.append(dict(row))
+                    server.stats['baserow_batch_rows'] += len(items)
+                self._send_json(200, {'items': written})
+
+            def do_PATCH(self):
+                match = BATCH_ROWS_PATH.match(urlsplit(self.path).path)
+                if not match or int(match.group(1)) not in server.tables:
+                    self._send_json(404, {'error': 'ERROR_TABLE_DOES_NOT_EXIST'})
+                    return
+                self._write_rows(int(match.group(1)), create=False)
+
+            def do_POST(self):
+                path = urlsplit(self.path).path
+                match = BATCH_ROWS_PATH.match(path)
+                if match and int(match.group(1)) in server.tables:
+                    self._write_rows(int(match.group(1)), create=True)
+                    return
+                if path not in (COMPLETION_PATH, ASYNC_COMPLETION_PATH):
+                    self._send_json(404, {'error': 'Not found'})
+                    return
+                request = self._read_json()
+                if self.headers.get('Authorization', '').removeprefix('Api-key ') in server.invalid_keys:
+                    server._count('unauthorized')
+                    self._send_json(401, {'error': {
+                        'grpcCode': 16, 'httpCode': 401, 'httpStatus': 'Unauthorized', 'message': 'Unknown api key',
+                    }})
+                    return
+                folder = self.headers.get('x-folder-id', '')
+                failure = server._injected_failure(folder)
+                if failure == 429:
+                    server._count('rate_limited')
+                    self._send_json(429, {'error': {
+                        'grpcCode': 8, 'httpCode': 429, 'httpStatus': 'Too Many Requests',
+                        'message': 'ai.textGenerationCompletionSessionsCount.count gauge quota limit exceed',
+                    }}, {'Retry-After': '1'})
+                    return
+                try:
+                    self._complete(path, request, failure)
+                finally:
+                    server._done(folder)
+
+            def _complete(self, path: str, request: Dict[str, Any], failure: Optional[int]) -> None:
+                if failure == 500:
+                    server._count('errors')
+                    time.sleep(server.latency.sample())
+                    self._send_json(500, {'error': {
+                        'grpcCode': 13, 'httpCode': 500, 'httpStatus': 'Internal Server Error',
+                        'message': 'Internal error',
+                    }})
+                    return
+
+                messages = request.get('messages', [])
+                text = server._answer(messages)
+                input_tokens = sum(_tokens(m.get('text', '')) for m in messages)
+                if path == ASYNC_COMPLETION_PATH:
+                    server._count('async_completion')
+                    self._send_json(200, server._operation(
+                        time.monotonic() + server.latency.sample(),
+                        self._result(text, input_tokens, 'ALTERNATIVE_STATUS_FINAL')['result'],
+                    ))
+                elif request.get('completionOptions', {}).get('stream'):
+                    server._count('stream')
+                    self._stream(text, input_tokens, server.latency.sample())
+                else:
+                    server._count('completion')
+                    time.sleep(server.latency.sample())
+                    self._send_json(200, self._result(text, input_tokens, 'ALTERNATIVE_STATUS_FINAL'))
+
+            @staticmethod
+            def _result(text: str, input_tokens: int, status: str) -> Dict[str, Any]:
+                output_tokens = _tokens(text)
+                return {'result': {
+                    'alternatives': [{'message': {'role': 'assistant', 'text': text}, 'status': status}],
+                    'usage': {
+                        'inputTextTokens': str(input_tokens),
+                        'completionTokens': str(output_tokens),
+                        'totalTokens': str(input_tokens + output_tokens),
+                    },
+                    'modelVersion': 'mock',
+                }}
+
+            def _stream(self, text: str, input_tokens: int, latency: float) -> None:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                chunks = max(1, server.stream_chunks)
+                try:
+                    for i in range(1, chunks + 1):
+                        time.sleep(latency / chunks)
+                        partial = text[:len(text) * i // chunks]
+                        status = 'ALTERNATIVE_STATUS_FINAL' if i == chunks else 'ALTERNATIVE_STATUS_PARTIAL'
+                        line = json.dumps(self._result(partial, input_tokens, status), ensure_ascii=False).encode()
+                        self.wfile.write(b'%x\r\n%s\n\r\n' % (len(line) + 1, line))
+                        self.wfile.flush()
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed the connection, the rest of the answer isn't generated
+                    server._count('stream_cancelled')
+                    self.close_connection = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path.startswith(OPERATIONS_PATH + '/'):
+                    self._get_operation(url.path[len(OPERATIONS_PATH) + 1:])
+                    return
+                match = ROWS_PATH.match(url.path)
+                if not match or int(match.group(1)) not in server.tables:
+                    self._send_json(404, {'error': 'ERROR_TABLE_DOES_NOT_EXIST'})
+                    return
+                if self._baserow_failed():
+                    return
+                server._count('baserow')
+                time.sleep(server.baserow_latency.sample())
+
+                table_id = int(match.group(1))
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                rows = server.tables[table_id]
+                if 'filters' in query:
+                    rows = _filter_rows(rows, json.loads(query['filters']))
+                page, size = int(query.get('page', 1)), int(query.get('size', 100))
+                start = (page - 1) * size
+                next_url = None
+                if start + size < len(rows):
+                    next_url = f'{server.url}{url.path}?{urlencode({**query, "page": page + 1})}'
+                results = rows[start:start + size]
+                if 'include' in query:
+                    fields = {'id', *query['include'].split(',')}
+                    results = [{k: v for k, v in row.items() if k in fields} for row in results]
+                self._send_json(200, {
+                    'count': len(rows),
+                    'next': next_url,
+                    'previous': None,
+                    'results': results,
+                })
+
+            def _get_operation(self, operation_id: str) -> None:
+                operation = server.operations.get(operation_id)
+                if operation is None:
+                    self._send_json(404, {'code': 5, 'message': f'Operation {operation_id} not found'})
+                    return
+                server._count('operation_polls')
+                body = {k: v for k, v in operation.items() if k not in ('done_at', 'response')}
+                if time.monotonic() >= operation['done_at']:
+                    body['done'] = True
+                    body['response'] = {
+                        '@type': 'type.googleapis.com/yandex.cloud.ai.foundation_models.v1.CompletionResponse',
+                        **operation['response'],
+                    }
+                self._send_json(200, body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _filter_rows(rows: List[Dict[str, Any]], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply Baserow `contains` filters joined with AND"""
+    conditions = [f for f in filters.get('filters', []) if f.get('type') == 'contains']
+
+    def matches(row):
+        return all(str(c['value']) in json.dumps(row.get(c['field']), ensure_ascii=False) for c in conditions)
+
+    return [row for row in rows if matches(row)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', default='lognormal:0.3:0.5')
+    parser.add_argument('--baserow-latency', default='fixed:0.02')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--baserow-error-rate', type=float, default=0.0)
+    parser.add_argument('--stream-chunks', type=int, default=8)
+    args = parser.parse_args()
+
+    mock = MockServer(args.host, args.port, args.latency, args.baserow_latency, error_rate=args.error_rate,
+                      baserow_error_rate=args.baserow_error_rate, rate_limit_rate=args.rate_limit_rate,
+                      stream_chunks=args.stream_chunks)
+    print(f'Mock server on {mock.url}')
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,102 @@
+"""Throughput and latency of YandexChatGPT calls against the mock completion API.
+
+Measures sequential `invoke` latency, `batch` and `abatch` throughput and time to the
+first streamed chunk. Every call has a unique prompt, so single-flight doesn't merge them.
+Run with:
+
+    python -m benchmarks.model_throughput --calls 200 --concurrency 16 --latency lognormal:0.05:0.5
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict
+
+from benchmarks.common import summarize, write_results
+from benchmarks.mock_server import MockServer
+from sdk.llm.yandex.chat_model import YandexChatGPT
+
+
+def _prompt(i: int) -> str:
+    return f'Отмени сессию у Перовой Алёны 14.07 в 12:00. Заявка #{i}'
+
+
+def bench_invoke(model: YandexChatGPT, calls: int) -> Dict[str, Any]:
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for i in range(calls):
+        call_started = time.perf_counter()
+        try:
+            model.invoke(_prompt(i))
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def bench_batch(model: YandexChatGPT, calls: int, concurrency: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    results = model.batch([_prompt(i) for i in range(calls)], {'max_concurrency': concurrency},
+                          return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    errors = sum(isinstance(r, Exception) for r in results)
+    return {'count': calls - errors, 'errors': errors, 'concurrency': concurrency,
+            'elapsed_s': elapsed, 'throughput_rps': (calls - errors) / elapsed}
+
+
+def bench_abatch(model: YandexChatGPT, calls: int, concurrency: int) -> Dict[str, Any]:
+    async def run():
+        return await model.abatch([_prompt(i) for i in range(calls)], {'max_concurrency': concurrency},
+                                  return_exceptions=True)
+
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    errors = sum(isinstance(r, Exception) for r in results)
+    return {'count': calls - errors, 'errors': errors, 'concurrency': concurrency,
+            'elapsed_s': elapsed, 'throughput_rps': (calls - errors) / elapsed}
+
+
+def bench_stream(model: YandexChatGPT, calls: int) -> Dict[str, Any]:
+    first_chunk, total, errors = [], [], 0
+    for i in range(calls):
+        started = time.perf_counter()
+        try:
+            for n, _ in enumerate(model.stream(_prompt(i))):
+                if n == 0:
+                    first_chunk.append(time.perf_counter() - started)
+        except Exception:
+            errors += 1
+            continue
+        total.append(time.perf_counter() - started)
+    return {'first_chunk': summarize(first_chunk), 'total': summarize(total, errors=errors)}
+
+
+def run(calls: int = 100, concurrency: int = 16, latency: str = 'lognormal:0.05:0.5',
+        error_rate: float = 0.0, rate_limit_rate: float = 0.0) -> Dict[str, Any]:
+    with MockServer(latency=latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate, seed=0) as mock:
+        model = YandexChatGPT()
+        model.base_url = mock.completion_url
+        results = {
+            'mock': {'latency': latency, 'error_rate': error_rate, 'rate_limit_rate': rate_limit_rate},
+            'invoke': bench_invoke(model, calls),
+            'batch': bench_batch(model, calls, concurrency),
+            'abatch': bench_abatch(model, calls, concurrency),
+            'stream': bench_stream(model, max(1, calls // 4)),
+        }
+        results['mock']['requests'] = dict(mock.stats)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', default='lognormal:0.05:0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--output', help='Write json to the file instead of stdout')
+    args = parser.parse_args()
+    write_results('model_throughput',
+                  run(args.calls, args.concurrency, args.latency, args.error_rate, args.rate_limit_rate),
+                  args.output)
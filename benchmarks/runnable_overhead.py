@@ -0,0 +1,42 @@
+"""Per-step overhead of Runnable composition.
+
+Compares calling N plain functions one after another with invoking the same
+functions composed into a RunnableSequence. Run with:
+
+    python -m benchmarks.runnable_overhead
+"""
+import json
+import timeit
+
+from sdk.runnable.base import RunnableLambda, RunnableSequence
+
+
+def step(x):
+    return x + 1
+
+
+def run(steps: int = 10, number: int = 20000) -> dict:
+    funcs = [step] * steps
+    sequence = RunnableSequence(*(RunnableLambda(f) for f in funcs))
+
+    def direct():
+        x = 0
+        for f in funcs:
+            x = f(x)
+        return x
+
+    assert direct() == sequence.invoke(0) == steps
+
+    direct_time = min(timeit.repeat(direct, number=number, repeat=5)) / number
+    sequence_time = min(timeit.repeat(lambda: sequence.invoke(0), number=number, repeat=5)) / number
+
+    return {
+        'steps': steps,
+        'direct_us': direct_time * 1e6,
+        'sequence_us': sequence_time * 1e6,
+        'overhead_per_step_us': (sequence_time - direct_time) / steps * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
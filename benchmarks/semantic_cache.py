@@ -0,0 +1,112 @@
+"""Precision and recall of the semantic cache on a labeled replay set of user commands.
+
+Prompts of the replay set with equal labels need equal answers of the model. Paraphrases of
+a command share its label; commands which differ in the action, the psychologist, the date
+or the time have different labels. Names are resolved by an index of SPECIALISTS, as the API
+resolves them by the psychologists table. Run with:
+
+    python -m benchmarks.semantic_cache --output semantic_cache.json
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from api.fast_path import CommandExtractor
+from api.names import NameIndex
+from benchmarks.common import write_results
+from sdk.semantic_cache import SemanticCache, evaluate
+
+SPECIALISTS = ('Перова Алёна', 'Перов Игорь', 'Иванов Пётр', 'Иванов Алексей', 'Иванов Александр',
+               'Смирнова Анна', 'Кузнецов Олег', 'Петрова Мария', 'Петровский Илья')
+"""Canonical names of psychologists of the replay set"""
+
+REPLAY: List[Tuple[str, str]] = [
+    ('Отмени сессию у Перовой 14.07 12:00', 'cancel Перова 14.07 12:00'),
+    ('отмена Перова 14.07 в 12:00', 'cancel Перова 14.07 12:00'),
+    ('Отмените, пожалуйста, сессию у Перовой 14.07 в 12:00', 'cancel Перова 14.07 12:00'),
+    ('Отменить сессию у Перовой Алёны 14.07 12:00', 'cancel Перова 14.07 12:00'),
+    ('Отмени сессию у Перовой 15.07 12:00', 'cancel Перова 15.07 12:00'),
+    ('отмена Перова 15.07 в 12:00', 'cancel Перова 15.07 12:00'),
+    ('Отмени сессию у Перовой 14.07 13:00', 'cancel Перова 14.07 13:00'),
+    ('Отмени сессию у Иванова 14.07 12:00', 'cancel Иванов 14.07 12:00'),
+    ('отмена Иванов 14.07 в 12:00', 'cancel Иванов 14.07 12:00'),
+    ('Отмените сессию у Иванова Петра 14.07 в 12:00', 'cancel Иванов 14.07 12:00'),
+    ('Запиши к Перовой 14.07 12:00', 'new Перова 14.07 12:00'),
+    ('Запишите клиента к Перовой на 14.07 в 12:00', 'new Перова 14.07 12:00'),
+    ('запись к Перовой 14.07 12:00', 'new Перова 14.07 12:00'),
+    ('Запиши к Иванову 14.07 12:00', 'new Иванов 14.07 12:00'),
+    ('запись Иванов 14.07 12:00', 'new Иванов 14.07 12:00'),
+    ('Перенеси сессию у Перовой с 14.07 12:00 на 15.07 13:00', 'move Перова 14.07 12:00 15.07 13:00'),
+    ('перенос Перова с 14.07 12:00 на 15.07 13:00', 'move Перова 14.07 12:00 15.07 13:00'),
+    ('Перенесите сессию у Перовой Алёны с 14.07 в 12:00 на 15.07 в 13:00', 'move Перова 14.07 12:00 15.07 13:00'),
+    ('Перенеси сессию у Перовой с 15.07 13:00 на 14.07 12:00', 'move Перова 15.07 13:00 14.07 12:00'),
+    ('Перенеси сессию у Смирновой с 14.07 12:00 на 15.07 13:00', 'move Смирнова 14.07 12:00 15.07 13:00'),
+    ('перенос Смирнова с 14.07 12:00 на 15.07 13:00', 'move Смирнова 14.07 12:00 15.07 13:00'),
+    ('Отмени сессию у Смирновой 14.07 12:00', 'cancel Смирнова 14.07 12:00'),
+    ('Отмени сессию у Смирновой Анны 14.07 в 12:00', 'cancel Смирнова 14.07 12:00'),
+    ('Отмени сессию у Кузнецова 20.07 18:00', 'cancel Кузнецов 20.07 18:00'),
+    ('отмена Кузнецов 20.07 18:00', 'cancel Кузнецов 20.07 18:00'),
+    ('Отмени сессию у Кузнецова 20.07 18:00. Заявка #17', 'cancel Кузнецов 20.07 18:00 #17'),
+    ('отмена Кузнецов 20.07 18:00, заявка 17', 'cancel Кузнецов 20.07 18:00 #17'),
+    ('Отмени сессию у Кузнецова 20.07 18:00. Заявка #18', 'cancel Кузнецов 20.07 18:00 #18'),
+    ('Запиши к Кузнецову 20.07 18:00', 'new Кузнецов 20.07 18:00'),
+    ('Запишите к Кузнецову Олегу на 20.07 в 18:00', 'new Кузнецов 20.07 18:00'),
+    ('Отмени сессию у Перовой 14.07 12:00', 'cancel Перова 14.07 12:00'),
+    ('Запиши к Смирновой 14.07 12:00', 'new Смирнова 14.07 12:00'),
+    ('запись к Смирновой на 14.07 12:00', 'new Смирнова 14.07 12:00'),
+    ('Отмени сессию у Иванова 14.07 12:00', 'cancel Иванов 14.07 12:00'),
+    ('Перенеси сессию у Иванова с 14.07 12:00 на 15.07 13:00', 'move Иванов 14.07 12:00 15.07 13:00'),
+    ('Перенесите сессию у Иванова с 14.07 в 12:00 на 15.07 в 13:00', 'move Иванов 14.07 12:00 15.07 13:00'),
+    # Names which share all leading n-grams and commands with negations
+    ('Отмени сессию у Иванова Алексея 16.07 10:00', 'cancel Иванов Алексей 16.07 10:00'),
+    ('Отмени сессию у Иванова Александра 16.07 10:00', 'cancel Иванов Александр 16.07 10:00'),
+    ('отмена Иванов Александр 16.07 в 10:00', 'cancel Иванов Александр 16.07 10:00'),
+    ('Запиши к Перовой 17.07 11:00', 'new Перова 17.07 11:00'),
+    ('Запиши к Перову 17.07 11:00', 'new Перов 17.07 11:00'),
+    ('Отмени сессию у Петровой 18.07 15:00', 'cancel Петрова 18.07 15:00'),
+    ('Отмени сессию у Петровского 18.07 15:00', 'cancel Петровский 18.07 15:00'),
+    ('Отмени сессию у Смирновой 21.07 12:00', 'cancel Смирнова 21.07 12:00'),
+    ('Не отменяй сессию у Смирновой 21.07 12:00', 'keep Смирнова 21.07 12:00'),
+]
+"""Labeled prompts in the order they are replayed"""
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def specialist_index() -> NameIndex:
+    return NameIndex(enumerate(SPECIALISTS))
+
+
+def command_cache(threshold: float = 0.8, index: Optional[NameIndex] = None) -> SemanticCache:
+    """Semantic cache of commands whose key facts are numbers and the resolved specialist, as in the API"""
+    index = index or specialist_index()
+
+    def resolve(name: str) -> Optional[str]:
+        match = index.lookup(name)
+        return match.name if match else None
+
+    return SemanticCache(threshold=threshold, key_facts=CommandExtractor(resolve_specialist=resolve).key_facts)
+
+
+def run(replay: Sequence[Tuple[str, str]] = tuple(REPLAY), thresholds: Sequence[float] = THRESHOLDS) -> Dict[str, Any]:
+    """Precision, recall and hit rate by threshold, and latency of a lookup"""
+    results: Dict[str, Any] = {'prompts': len(replay), 'labels': len({label for _, label in replay}), 'thresholds': {}}
+    index = specialist_index()
+    for threshold in thresholds:
+        results['thresholds'][str(threshold)] = evaluate(command_cache(threshold, index), replay)
+
+    cache = command_cache(index=index)
+    for prompt, label in replay:
+        cache.update(prompt, label)
+    started = time.perf_counter()
+    for prompt, _ in replay:
+        cache.lookup(prompt)
+    results['lookup_us'] = (time.perf_counter() - started) / len(replay) * 1e6
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='Write json to the file instead of stdout')
+    args = parser.parse_args()
+    write_results('semantic_cache', run(), args.output)
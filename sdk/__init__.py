@@ -0,0 +1,4 @@
+import logging
+
+# The application configures logging, the SDK only provides records
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,175 @@
+"""Key-value caches of model completions and other expensive results.
+
+`InMemoryCache` lives in the process. `SQLiteCache` keeps entries in a local SQLite file, so
+all worker processes of a server share one cache: a completion computed by one worker is a
+hit in every other worker.
+"""
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class BaseCache(ABC):
+    """Cache of string values by string keys"""
+
+    @abstractmethod
+    def lookup(self, key: str) -> Optional[str]:
+        """Cached value or None if there is no value or it is expired"""
+
+    @abstractmethod
+    def update(self, key: str, value: str) -> None:
+        """Store the value of the key"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all entries"""
+
+    def close(self) -> None:
+        """Release resources of the cache"""
+
+
+class InMemoryCache(BaseCache):
+    """LRU cache of the process"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        :param maxsize: Least recently used entries are evicted above this size
+        :param ttl: Seconds after which entries expire. Entries don't expire if it is None
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def update(self, key: str, value: str) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(BaseCache):
+    """Cache in a SQLite file shared by processes.
+
+    The database is in WAL mode, so readers of all processes don't block each other and the writer.
+    Every thread uses its own connection. Expired entries are removed and the cache is trimmed
+    to {max_entries} every {cleanup_interval} updates of the process.
+    """
+
+    def __init__(self,
+                 path: str,
+                 namespace: str = 'default',
+                 ttl: Optional[float] = None,
+                 max_entries: Optional[int] = 100_000,
+                 cleanup_interval: int = 1000):
+        """
+        :param path: Path of the database file. It is created if it doesn't exist
+        :param namespace: Caches with different namespaces share the file but not the entries
+        :param ttl: Seconds after which entries expire. Entries don't expire if it is None
+        :param max_entries: The oldest entries of the namespace are removed above this amount
+        """
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._updates = 0
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, '
+                'created_at REAL NOT NULL, expires_at REAL, '
+                'PRIMARY KEY (namespace, key))'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_created_at ON cache (namespace, created_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection of the current thread. Connections aren't shared with forked processes"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def lookup(self, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?', (self.namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def update(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (self.namespace, key, value, now, expires_at)
+            )
+        with self._lock:
+            self._updates += 1
+            cleanup = self._updates % self.cleanup_interval == 0
+        if cleanup:
+            self.cleanup()
+
+    def cleanup(self) -> None:
+        """Remove expired entries and the oldest ones above {max_entries}"""
+        with self._connect() as connection:
+            connection.execute('DELETE FROM cache WHERE namespace = ? AND expires_at < ?', (self.namespace, time.time()))
+            if self.max_entries is not None:
+                connection.execute(
+                    'DELETE FROM cache WHERE namespace = ? AND key IN ('
+                    'SELECT key FROM cache WHERE namespace = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                    (self.namespace, self.namespace, self.max_entries)
+                )
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cache WHERE namespace = ?', (self.namespace,)).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._connect() as connection:
+            connection.execute('DELETE FROM cache WHERE namespace = ?', (self.namespace,))
+
+    def close(self) -> None:
+        """Close connections of all threads of the process"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
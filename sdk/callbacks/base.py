@@ -0,0 +1,45 @@
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+
+class CallInfo:
+    """State of an instrumented call of a model or an external service.
+    Handlers get the same object in all events of the call"""
+
+    __slots__ = ('run_id', 'kind', 'name', 'started_at', 'latency', 'input_tokens', 'output_tokens',
+                 'cache_hit', 'retries', 'error', 'extra')
+
+    def __init__(self, kind: str, name: str, **extra: Any):
+        self.run_id = uuid.uuid4().hex
+        self.kind = kind
+        """Kind of the call, e.g. "llm" or "baserow\""""
+        self.name = name
+        """Name of the called thing, e.g. model URI or endpoint"""
+        self.started_at = time.perf_counter()
+        self.latency: Optional[float] = None
+        """Seconds from start to end or error"""
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_hit = False
+        self.retries = 0
+        self.error: Optional[BaseException] = None
+        self.extra: Dict[str, Any] = extra
+        """Additional attributes of the call"""
+
+
+class BaseCallbackHandler:
+    """Base class of instrumentation handlers. All events are no-op by default.
+    Handlers are called synchronously in the calling thread, so they must be fast and must not raise"""
+
+    def on_start(self, call: CallInfo) -> None:
+        """Call has started"""
+
+    def on_end(self, call: CallInfo) -> None:
+        """Call has finished successfully"""
+
+    def on_error(self, call: CallInfo) -> None:
+        """Call has failed. The exception is in call.error"""
+
+    def on_retry(self, call: CallInfo, error: BaseException, sleep: float) -> None:
+        """Attempt of the call has failed with {error}, the next attempt starts in {sleep} seconds"""
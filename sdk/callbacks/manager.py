@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional, Tuple
+
+from sdk.callbacks.base import BaseCallbackHandler, CallInfo
+
+_handlers: Tuple[BaseCallbackHandler, ...] = ()
+"""Registered handlers. Replaced on change, so events iterate it without locks"""
+
+_current_call: ContextVar[Optional[CallInfo]] = ContextVar('current_call', default=None)
+
+
+def add_handler(handler: BaseCallbackHandler) -> None:
+    """Register a handler of all instrumented calls of the process"""
+    global _handlers
+    _handlers = _handlers + (handler,)
+
+
+def remove_handler(handler: BaseCallbackHandler) -> None:
+    global _handlers
+    _handlers = tuple(h for h in _handlers if h is not handler)
+
+
+def get_handlers() -> Tuple[BaseCallbackHandler, ...]:
+    return _handlers
+
+
+def current_call() -> Optional[CallInfo]:
+    """Instrumented call which is running in the current context"""
+    return _current_call.get()
+
+
+@contextmanager
+def trace_call(kind: str, name: str, set_current: bool = True, **extra: Any) -> Iterator[CallInfo]:
+    """Instrument a call: handlers get on_start, then on_end or on_error.
+    Fill tokens and cache_hit of the yielded CallInfo inside the block.
+
+    :param set_current: Make the call current, so retries inside the block are reported for it.
+    Disable it in generators: they can be resumed in other contexts
+
+    For example:
+        with trace_call('llm', model_uri) as call:
+            completion = ...
+            call.output_tokens = completion.output_tokens
+    """
+    call = CallInfo(kind, name, **extra)
+    handlers = _handlers
+    token = _current_call.set(call) if set_current else None
+    for handler in handlers:
+        handler.on_start(call)
+    try:
+        yield call
+    except BaseException as e:
+        call.latency = time.perf_counter() - call.started_at
+        call.error = e
+        for handler in handlers:
+            handler.on_error(call)
+        raise
+    else:
+        call.latency = time.perf_counter() - call.started_at
+        for handler in handlers:
+            handler.on_end(call)
+    finally:
+        if token is not None:
+            _current_call.reset(token)
+
+
+def on_retry(error: BaseException, sleep: float) -> None:
+    """Report a retry of the current call"""
+    call = _current_call.get()
+    if call is None:
+        return
+    call.retries += 1
+    for handler in _handlers:
+        handler.on_retry(call, error, sleep)
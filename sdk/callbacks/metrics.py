@@ -0,0 +1,39 @@
+from typing import Optional
+
+from sdk.callbacks.base import BaseCallbackHandler, CallInfo
+from sdk.metrics import REGISTRY, Counter, Histogram, MetricsRegistry
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Record calls in Prometheus metrics:
+    - sdk_calls_total{kind, name, status}
+    - sdk_call_latency_seconds{kind, name}
+    - sdk_tokens_total{kind, name, direction}
+    - sdk_cache_hits_total{kind, name}
+    - sdk_retries_total{kind, name}
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        registry = registry or REGISTRY
+        self.calls = Counter('sdk_calls', 'Finished calls', ['kind', 'name', 'status'], registry=registry)
+        self.latency = Histogram('sdk_call_latency_seconds', 'Latency of calls', ['kind', 'name'], registry=registry)
+        self.tokens = Counter('sdk_tokens', 'Tokens of model calls', ['kind', 'name', 'direction'], registry=registry)
+        self.cache_hits = Counter('sdk_cache_hits', 'Calls answered from cache', ['kind', 'name'], registry=registry)
+        self.retries = Counter('sdk_retries', 'Retried attempts of calls', ['kind', 'name'], registry=registry)
+
+    def on_end(self, call: CallInfo) -> None:
+        self.calls.labels(call.kind, call.name, 'ok').inc()
+        self.latency.labels(call.kind, call.name).observe(call.latency)
+        if call.input_tokens:
+            self.tokens.labels(call.kind, call.name, 'input').inc(call.input_tokens)
+        if call.output_tokens:
+            self.tokens.labels(call.kind, call.name, 'output').inc(call.output_tokens)
+        if call.cache_hit:
+            self.cache_hits.labels(call.kind, call.name).inc()
+
+    def on_error(self, call: CallInfo) -> None:
+        self.calls.labels(call.kind, call.name, 'error').inc()
+        self.latency.labels(call.kind, call.name).observe(call.latency)
+
+    def on_retry(self, call: CallInfo, error: BaseException, sleep: float) -> None:
+        self.retries.labels(call.kind, call.name).inc()
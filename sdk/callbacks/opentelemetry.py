@@ -0,0 +1,52 @@
+from typing import Any, Dict
+
+from sdk.callbacks.base import BaseCallbackHandler, CallInfo
+
+
+class OpenTelemetryCallbackHandler(BaseCallbackHandler):
+    """Emit an OpenTelemetry span for every call. Requires opentelemetry-api package"""
+
+    def __init__(self, tracer_name: str = 'gpt_sdk'):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                'Could not import opentelemetry. Please install it with `pip install opentelemetry-api`'
+            ) from e
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name)
+        self._spans: Dict[str, Any] = {}
+
+    def on_start(self, call: CallInfo) -> None:
+        span = self._tracer.start_span(f'{call.kind} {call.name}')
+        span.set_attribute('sdk.kind', call.kind)
+        span.set_attribute('sdk.name', call.name)
+        self._spans[call.run_id] = span
+
+    def _finish(self, call: CallInfo) -> Any:
+        span = self._spans.pop(call.run_id, None)
+        if span is None:
+            return None
+        span.set_attribute('sdk.input_tokens', call.input_tokens)
+        span.set_attribute('sdk.output_tokens', call.output_tokens)
+        span.set_attribute('sdk.cache_hit', call.cache_hit)
+        span.set_attribute('sdk.retries', call.retries)
+        return span
+
+    def on_end(self, call: CallInfo) -> None:
+        span = self._finish(call)
+        if span is not None:
+            span.end()
+
+    def on_error(self, call: CallInfo) -> None:
+        span = self._finish(call)
+        if span is not None:
+            span.record_exception(call.error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(call.error)))
+            span.end()
+
+    def on_retry(self, call: CallInfo, error: BaseException, sleep: float) -> None:
+        span = self._spans.get(call.run_id)
+        if span is not None:
+            span.add_event('retry', {'error': repr(error), 'sleep': sleep})
@@ -0,0 +1,310 @@
+"""Record and replay of HTTP traffic of the SDK.
+
+Tests and benchmarks which run the whole pipeline call YandexGPT and Baserow, which is slow,
+costs money and gives different answers every time. A cassette records responses once and
+serves them afterwards without the network:
+
+    with Cassette('tests/cassettes/dragon.jsonl', mode='auto').use():
+        model.invoke(messages)
+
+Responses are found by a hash of the normalized request: method, path, sorted query and the
+body with sorted json keys. The host and the folder of the model URI aren't part of it, so a
+cassette recorded with the real API replays against a mock or with other credentials. Headers
+aren't recorded, so cassettes don't contain API keys. Responses of the same request are
+replayed in the order they were recorded, the last one repeats.
+
+Cassettes are json lines, gzipped if the path ends with .gz. Modes:
+
+- replay: serve recorded responses, requests which aren't recorded raise CassetteError
+- record: send every request and record it into an empty cassette
+- auto: serve recorded responses and record the others
+"""
+import asyncio
+import base64
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from sdk.exceptions import CassetteError
+from sdk.http import _cassette
+
+MODES = ('replay', 'record', 'auto')
+
+RECORDED_HEADERS = ('content-type', 'retry-after')
+"""Headers of responses which are recorded. Others, like dates and request ids, change every time"""
+
+_MODEL_FOLDER = re.compile(r'^gpt://[^/]+/')
+
+
+def _normalized_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _normalized_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalized_json(v) for v in value]
+    if isinstance(value, str):
+        # Requests sent with credentials of other folders have other model URIs
+        return _MODEL_FOLDER.sub('gpt://-/', value)
+    return value
+
+
+def request_key(method: str, url: str, body: Optional[bytes]) -> str:
+    """Hash of a normalized request"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    if body:
+        try:
+            body = json.dumps(_normalized_json(json.loads(body)), sort_keys=True, ensure_ascii=False).encode()
+        except ValueError:
+            pass
+    digest = hashlib.sha256(f'{method.upper()} {parts.path}?{query}\n'.encode())
+    digest.update(body or b'')
+    return digest.hexdigest()[:32]
+
+
+class Interaction:
+    """Recorded response of a request"""
+    __slots__ = ('key', 'request', 'status', 'headers', 'body', 'latency')
+
+    def __init__(self, key: str, request: str, status: int, headers: Dict[str, str], body: bytes, latency: float):
+        self.key = key
+        self.request = request
+        """Method and path, to find interactions in cassettes by eye"""
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.latency = latency
+        """Seconds from sending the request until the whole response was read"""
+
+    def to_json(self) -> Dict[str, Any]:
+        data = {'key': self.key, 'request': self.request, 'status': self.status, 'headers': self.headers,
+                'latency': round(self.latency, 4)}
+        try:
+            data['body'] = self.body.decode()
+        except UnicodeDecodeError:
+            data['body_base64'] = base64.b64encode(self.body).decode()
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'Interaction':
+        body = data['body'].encode() if 'body' in data else base64.b64decode(data['body_base64'])
+        return cls(data['key'], data['request'], data['status'], data['headers'], body, data['latency'])
+
+
+class Cassette:
+    """Recorded interactions of a file. Shared by threads and event loops"""
+
+    def __init__(self, path: Union[str, os.PathLike], mode: str = 'replay', latency: Union[float, str] = 0.0):
+        """
+        :param path: File of the cassette
+        :param mode: replay, record or auto
+        :param latency: Seconds of every replayed response, or "recorded" to wait as long as the recorded request took
+        """
+        if mode not in MODES:
+            raise ValueError(f'Unknown mode {mode}, use one of {MODES}')
+        self.path = os.fspath(path)
+        self.mode = mode
+        self.latency = latency
+        self.replayed = 0
+        self.recorded = 0
+
+        self._interactions: Dict[str, List[Interaction]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if mode == 'record':
+            self._open('w').close()
+        elif os.path.exists(self.path):
+            with self._open('r') as file:
+                for line in file:
+                    if line.strip():
+                        interaction = Interaction.from_json(json.loads(line))
+                        self._interactions[interaction.key].append(interaction)
+        elif mode == 'replay':
+            raise FileNotFoundError(f'No cassette {self.path}')
+
+    def __len__(self):
+        return sum(len(interactions) for interactions in self._interactions.values())
+
+    def _open(self, mode: str):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    @contextlib.contextmanager
+    def use(self) -> Iterator['Cassette']:
+        """Send requests of the SDK in the block through the cassette. Threads and tasks started in the block
+        with the context of the block use it too"""
+        token = _cassette.set(self)
+        try:
+            yield self
+        finally:
+            _cassette.reset(token)
+
+    def adapter(self) -> 'CassetteAdapter':
+        """Adapter of requests sessions"""
+        return CassetteAdapter(self)
+
+    def transport(self, **kwargs: Any) -> 'CassetteTransport':
+        """Transport of httpx clients. Keyword arguments are options of the transports of recorded requests"""
+        return CassetteTransport(self, **kwargs)
+
+    def find(self, key: str, request: str) -> Optional[Interaction]:
+        """Recorded response of the request, None if it should be sent and recorded
+        :raises CassetteError: If the request isn't recorded in replay mode
+        """
+        if self.mode == 'record':
+            return None
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                if self.mode == 'replay':
+                    raise CassetteError(f'{request} is not recorded in {self.path}', key=key)
+                return None
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.replayed += 1
+            return interactions[min(position, len(interactions) - 1)]
+
+    def record(self, interaction: Interaction) -> None:
+        line = json.dumps(interaction.to_json(), ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._interactions[interaction.key].append(interaction)
+            # An identical request replays what is recorded after this one
+            self._positions[interaction.key] += 1
+            self.recorded += 1
+            with self._open('a') as file:
+                file.write(line + '\n')
+
+    def delay(self, interaction: Interaction) -> float:
+        """Seconds to wait before a replayed response"""
+        return interaction.latency if self.latency == 'recorded' else float(self.latency)
+
+
+def _headers(headers) -> Dict[str, str]:
+    return {name: headers[name] for name in RECORDED_HEADERS if name in headers}
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Adapter of requests which replays responses of the cassette and records the others"""
+
+    def __init__(self, cassette: Cassette, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        key = request_key(request.method, request.url, body)
+        description = f'{request.method} {urlsplit(request.url).path}'
+        interaction = self.cassette.find(key, description)
+        if interaction is not None:
+            delay = self.cassette.delay(interaction)
+            if delay:
+                time.sleep(delay)
+        else:
+            started_at = time.monotonic()
+            response = super().send(request, **kwargs)
+            # Streamed responses are read at once, they are replayed from memory anyway
+            content = response.content
+            interaction = Interaction(key, description, response.status_code, _headers(response.headers),
+                                      content, time.monotonic() - started_at)
+            response.close()
+            self.cassette.record(interaction)
+        return self._response(request, interaction)
+
+    @staticmethod
+    def _response(request: requests.PreparedRequest, interaction: Interaction) -> requests.Response:
+        response = requests.Response()
+        response.status_code = interaction.status
+        response.headers = CaseInsensitiveDict(interaction.headers)
+        response.raw = io.BytesIO(interaction.body)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = ''
+        return response
+
+
+class CassetteTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Sync and async transport of httpx which replays responses of the cassette and records the others"""
+
+    def __init__(self, cassette: Cassette, **kwargs: Any):
+        """
+        :param kwargs: Options of httpx transports which send recorded requests, e.g. limits
+        """
+        self.cassette = cassette
+        self._options = kwargs
+        self._transport: Optional[httpx.HTTPTransport] = None
+        self._async_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+    def _find(self, request: httpx.Request):
+        key = request_key(request.method, str(request.url), request.read())
+        description = f'{request.method} {request.url.path}'
+        return key, description, self.cassette.find(key, description)
+
+    @staticmethod
+    def _response(interaction: Interaction) -> httpx.Response:
+        return httpx.Response(interaction.status, headers=interaction.headers, content=interaction.body)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key, description, interaction = self._find(request)
+        if interaction is not None:
+            delay = self.cassette.delay(interaction)
+            if delay:
+                time.sleep(delay)
+            return self._response(interaction)
+
+        if self._transport is None:
+            self._transport = httpx.HTTPTransport(**self._options)
+        started_at = time.monotonic()
+        response = self._transport.handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        interaction = Interaction(key, description, response.status_code, _headers(response.headers),
+                                  content, time.monotonic() - started_at)
+        self.cassette.record(interaction)
+        return self._response(interaction)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key, description, interaction = self._find(request)
+        if interaction is not None:
+            delay = self.cassette.delay(interaction)
+            if delay:
+                await asyncio.sleep(delay)
+            return self._response(interaction)
+
+        if self._async_transport is None:
+            self._async_transport = httpx.AsyncHTTPTransport(**self._options)
+        started_at = time.monotonic()
+        response = await self._async_transport.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        interaction = Interaction(key, description, response.status_code, _headers(response.headers),
+                                  content, time.monotonic() - started_at)
+        # Writing a line is fast enough for the loop
+        self.cassette.record(interaction)
+        return self._response(interaction)
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+
+    async def aclose(self) -> None:
+        if self._async_transport is not None:
+            await self._async_transport.aclose()
@@ -0,0 +1,82 @@
+"""Deadlines of requests.
+
+A deadline is set for a block of code and flows into everything the block calls: chains,
+model requests, their retries and Baserow requests, including Runnable.batch threads,
+executor threads and async tasks started in the block:
+
+    with deadline(15):
+        chain.invoke(...)
+
+Every HTTP request uses the remaining time as its timeout if it is shorter than the usual one,
+requests after the deadline raise DeadlineExceeded at once, and retries which can't finish
+before the deadline aren't made. Nested deadlines can only shorten the outer one.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from sdk.exceptions import DeadlineExceeded
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('sdk_deadline', default=None)
+"""Monotonic deadline of the current context"""
+
+
+@contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    """Set the deadline of the block
+    :param timeout: Seconds from now. No deadline, or the deadline of the outer block, if it is None
+    :returns The monotonic deadline of the block
+    """
+    current = _deadline.get()
+    if timeout is not None:
+        current = min(current, time.monotonic() + timeout) if current is not None else time.monotonic() + timeout
+    token = _deadline.set(current)
+    try:
+        yield current
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """Monotonic deadline of the current context or None"""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds until the deadline of the current context, negative if it has passed. None if there is no deadline"""
+    current = _deadline.get()
+    return current - time.monotonic() if current is not None else None
+
+
+def request_timeout(read: float, connect: Optional[float] = None) -> Tuple[float, float]:
+    """Connect and read timeouts of a request: the usual ones or the remaining time if it is shorter
+    :param read: Usual seconds to wait for the response
+    :param connect: Usual seconds to connect. Default is the read timeout
+    :raises DeadlineExceeded: If the deadline has passed
+    """
+    left = remaining()
+    connect = read if connect is None else connect
+    if left is None:
+        return connect, read
+    if left <= 0:
+        raise DeadlineExceeded(f'Deadline passed {-left:.2f} seconds ago')
+    return min(connect, left), min(read, left)
+
+
+def raise_if_exceeded(error: BaseException) -> None:
+    """Raise DeadlineExceeded from the error if the deadline has passed, e.g. when a request timed out
+    because its timeout was cut by the deadline"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f'Deadline passed: {error!r}') from error
+
+
+def stop_before_deadline(retry_state) -> bool:
+    """Stop condition of tenacity: stop if the sleep before the next attempt and an attempt as long as
+    the previous ones on average don't fit before the deadline"""
+    left = remaining()
+    if left is None:
+        return False
+    attempt = (retry_state.seconds_since_start - retry_state.idle_for) / retry_state.attempt_number
+    return retry_state.upcoming_sleep + attempt >= left
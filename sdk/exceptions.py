@@ -1,2 +1,68 @@
+from typing import Optional
+
+
 class SdkException(Exception):
     ...
+
+
+class OutputParserException(SdkException, ValueError):
+    """Raised when model's output can't be parsed"""
+
+    def __init__(self, message: str, llm_output: str = ''):
+        super().__init__(message)
+        self.llm_output = llm_output
+
+
+class OverloadedError(SdkException):
+    """Raised when a request is rejected instead of waiting, because it can't be served in time"""
+
+    def __init__(self, message: str, retry_after: float = 1.0, reason: str = 'overloaded'):
+        super().__init__(message)
+        self.retry_after = retry_after
+        """Seconds after which a retry will probably be served"""
+        self.reason = reason
+
+
+class DeadlineExceeded(OverloadedError):
+    """Raised when the deadline of the context passes before a request is sent or while it waits for the response.
+    It isn't retried"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message, retry_after, reason='deadline')
+
+
+class OperationError(SdkException):
+    """Raised when a deferred completion failed or its result is requested before it is done"""
+
+    def __init__(self, message: str, operation_id: str = ''):
+        super().__init__(message)
+        self.operation_id = operation_id
+
+
+class ProviderError(SdkException):
+    """Raised when the model provider rejects a request with 429 or fails with 5xx. Such requests are retried"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        """Seconds from Retry-After header of the response"""
+
+
+class RejectedRequestError(SdkException):
+    """Raised when the model provider rejects a request with 4xx other than 429, 401 and 403, e.g. an invalid body.
+    A retry would be rejected too, so such requests aren't retried"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CassetteError(LookupError):
+    """Raised when a request isn't recorded in a cassette in replay mode.
+    It isn't an SdkException, so the request isn't retried"""
+
+    def __init__(self, message: str, key: str = ''):
+        super().__init__(message)
+        self.key = key
+        """Hash of the normalized request"""
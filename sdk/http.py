@@ -0,0 +1,71 @@
+"""HTTP clients of the SDK.
+
+Models and Baserow clients send requests through `session` and `async_client`, so a cassette
+replaces the network for all of them at once, see `sdk.cassette`. Set SDK_CASSETTE in the
+environment to replay a cassette in a whole process, e.g. in benchmarks:
+
+    SDK_CASSETTE=benchmarks/cassettes/pipeline.jsonl.gz SDK_CASSETTE_MODE=replay python -m benchmarks ...
+"""
+import functools
+import os
+import threading
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+    from sdk.cassette import Cassette
+
+_cassette: ContextVar[Optional['Cassette']] = ContextVar('cassette', default=None)
+_local = threading.local()
+
+
+@functools.lru_cache(maxsize=None)
+def default_cassette() -> Optional['Cassette']:
+    """Cassette of SDK_CASSETTE environment variable in SDK_CASSETTE_MODE, replay by default. None if it isn't set"""
+    path = os.environ.get('SDK_CASSETTE')
+    if not path:
+        return None
+    from sdk.cassette import Cassette
+
+    return Cassette(path, mode=os.environ.get('SDK_CASSETTE_MODE', 'replay'))
+
+
+def current_cassette() -> Optional['Cassette']:
+    """Cassette of `Cassette.use` in the current context or the default one"""
+    cassette = _cassette.get()
+    return cassette if cassette is not None else default_cassette()
+
+
+def mount(session: 'requests.Session') -> 'requests.Session':
+    """Mount the adapter of the current cassette on a session, if there is one"""
+    cassette = current_cassette()
+    if cassette is not None:
+        adapter = cassette.adapter()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
+
+def session() -> 'requests.Session':
+    """Session of the current thread for the current cassette. Connections are kept alive between calls"""
+    import requests
+
+    sessions: Dict[Optional['Cassette'], requests.Session] = _local.__dict__.setdefault('sessions', {})
+    cassette = current_cassette()
+    if cassette not in sessions:
+        sessions[cassette] = mount(requests.Session())
+    return sessions[cassette]
+
+
+def async_client(**kwargs: Any) -> 'httpx.AsyncClient':
+    """httpx.AsyncClient which sends requests through the transport of the current cassette, if there is one.
+    Keyword arguments are options of the client"""
+    import httpx
+
+    cassette = current_cassette()
+    if cassette is not None:
+        kwargs['transport'] = cassette.transport(limits=kwargs.pop('limits', httpx.Limits()))
+    return httpx.AsyncClient(**kwargs)
@@ -0,0 +1,389 @@
+"""Scheduler of model requests with priority classes, deadlines and load shedding.
+
+Requests to the provider share a limited amount of concurrent slots. A request which can't
+start immediately waits in a priority queue: interactive requests go first, bulk requests
+start only when no request of a higher class waits and can't take the slots reserved for
+interactive traffic. A request whose deadline can't be met by the estimated wait is rejected
+immediately with OverloadedError instead of waiting.
+
+Priority and deadline of requests are set for a block of code:
+
+    with scheduling(Priority.INTERACTIVE, timeout=10):
+        chain.invoke(...)
+
+A request also can't start after the deadline of the whole request, see sdk.deadline.
+
+With an `AIMDLimiter` the amount of slots follows the capacity of the provider, like the
+congestion window of TCP: it grows by one slot per {limit} successful requests while latency
+stays flat and is cut by half on 429, 5xx or a latency spike.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from sdk.deadline import current_deadline
+from sdk.exceptions import OverloadedError
+from sdk.metrics import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry, get_or_create
+
+
+class Priority(IntEnum):
+    """Priority classes. Lower values are served first"""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BULK = 2
+
+
+_scheduling: contextvars.ContextVar[Tuple[Priority, Optional[float]]] = contextvars.ContextVar(
+    'sdk_scheduling', default=(Priority.DEFAULT, None)
+)
+"""Priority and monotonic deadline of requests of the current context"""
+
+
+@contextmanager
+def scheduling(priority: Priority = Priority.DEFAULT, timeout: Optional[float] = None) -> Iterator[None]:
+    """Set priority and deadline of model requests made in the block, including requests of
+    Runnable.batch threads and async tasks started in it
+    :param timeout: Seconds from now in which requests must start. No deadline if it is None
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    token = _scheduling.set((priority, deadline))
+    try:
+        yield
+    finally:
+        _scheduling.reset(token)
+
+
+def current_scheduling() -> Tuple[Priority, Optional[float]]:
+    """Priority and monotonic deadline of the current context"""
+    return _scheduling.get()
+
+
+class _Waiter:
+    __slots__ = ('priority', 'enqueued_at', 'granted', 'cancelled', 'event', 'future')
+
+    def __init__(self, priority: Priority, future: Optional[asyncio.Future] = None):
+        """
+        :param future: Future of an async waiter, resolved in its loop. Sync waiters wait for the event
+        """
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.event = threading.Event()
+        self.future = future
+
+    def wake(self) -> None:
+        if self.future is None:
+            self.event.set()
+        else:
+            # Slots are released in any thread
+            self.future.get_loop().call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease"""
+
+    def __init__(self,
+                 initial_limit: int = 4,
+                 min_limit: int = 1,
+                 max_limit: int = 64,
+                 backoff: float = 0.5,
+                 latency_tolerance: float = 2.0,
+                 name: str = 'default',
+                 registry: Optional[MetricsRegistry] = None):
+        """
+        :param backoff: Factor of the limit on overload
+        :param latency_tolerance: Latency above the baseline times this factor is an overload
+        :param name: Label of the limiter's metrics
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.name = name
+
+        self.baseline: Optional[float] = None
+        """Latency without load: follows lower latencies fast and higher ones slowly"""
+
+        self._limit = float(initial_limit)
+        self._decreased_at = 0.0
+        self._lock = threading.Lock()
+
+        registry = registry or REGISTRY
+        self._decreases = get_or_create(registry, Counter, 'sdk_concurrency_limit_decreases',
+                                        'Decreases of the adaptive concurrency limit', ['limiter', 'reason'])
+        get_or_create(registry, Gauge, 'sdk_concurrency_limit', 'Adaptive concurrency limit', ['limiter']).labels(
+            name).set_function(lambda: self.limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def on_success(self, started_at: float, latency: float, in_flight: int) -> None:
+        """Report a request which succeeded
+        :param started_at: Monotonic time when the request started
+        :param in_flight: Requests in flight when it finished. The limit doesn't grow while it isn't used
+        """
+        with self._lock:
+            if self.baseline is None:
+                self.baseline = latency
+            if latency > self.baseline * self.latency_tolerance:
+                self._decrease(started_at, 'latency')
+            elif in_flight * 2 >= self.limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            weight = 0.5 if latency < self.baseline else 0.01
+            self.baseline += weight * (latency - self.baseline)
+
+    def on_overload(self, started_at: float) -> None:
+        """Report a request rejected with 429 or failed with 5xx or a network error"""
+        with self._lock:
+            self._decrease(started_at, 'overload')
+
+    def _decrease(self, started_at: float, reason: str) -> None:
+        # Requests of a burst fail together: decrease once for the requests started before the last decrease
+        if started_at < self._decreased_at:
+            return
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        self._decreased_at = time.monotonic()
+        self._decreases.labels(self.name, reason).inc()
+
+
+class RequestScheduler:
+    """Limits concurrent requests and orders waiting ones by priority.
+    Waiting requests of `slot` block their threads, waiting requests of `aslot` wait in the event loop"""
+
+    def __init__(self,
+                 max_concurrency: int = 10,
+                 reserved_interactive: int = 1,
+                 max_queue: int = 1000,
+                 initial_service_time: float = 1.0,
+                 name: str = 'default',
+                 registry: Optional[MetricsRegistry] = None,
+                 limiter: Optional[AIMDLimiter] = None):
+        """
+        :param max_concurrency: Most requests served at the same time
+        :param reserved_interactive: Slots which only interactive requests can take
+        :param max_queue: Requests are rejected when this amount of requests waits
+        :param initial_service_time: Estimated seconds a request holds a slot until the first requests finish
+        :param name: Label of the scheduler's metrics
+        :param limiter: Adaptive limit of requests served at the same time, up to {max_concurrency}
+        """
+        if not 0 <= reserved_interactive < max_concurrency:
+            raise ValueError('reserved_interactive must be less than max_concurrency')
+        self.max_concurrency = max_concurrency
+        self.reserved_interactive = reserved_interactive
+        self.max_queue = max_queue
+        self.name = name
+        self.limiter = limiter
+
+        self.service_time = initial_service_time
+        """Average seconds a request holds a slot"""
+
+        self._active = 0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._waiting = [0] * len(Priority)
+        """Amount of waiters by priority, without cancelled ones"""
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+        registry = registry or REGISTRY
+        self._queue_depth = get_or_create(registry, Gauge, 'sdk_scheduler_queue_depth',
+                                          'Requests waiting for a slot', ['scheduler', 'priority'])
+        self._wait_time = get_or_create(registry, Histogram, 'sdk_scheduler_wait_seconds',
+                                        'Time requests waited for a slot', ['scheduler', 'priority'])
+        self._rejected = get_or_create(registry, Counter, 'sdk_scheduler_rejected',
+                                       'Requests rejected without waiting', ['scheduler', 'priority', 'reason'])
+        self._active_gauge = get_or_create(registry, Gauge, 'sdk_scheduler_active',
+                                           'Requests holding a slot', ['scheduler'])
+        self._active_gauge.labels(name).set_function(lambda: self._active)
+        for priority in Priority:
+            self._queue_depth.labels(name, priority.name.lower()).set_function(
+                lambda p=priority: self._waiting[p]
+            )
+
+    @property
+    def active(self) -> int:
+        """Amount of requests holding a slot"""
+        return self._active
+
+    def queue_depth(self, priority: Optional[Priority] = None) -> int:
+        """Amount of waiting requests of the priority or of all priorities"""
+        return self._waiting[priority] if priority is not None else sum(self._waiting)
+
+    @property
+    def concurrency(self) -> int:
+        """Amount of requests which may be served at the same time"""
+        if self.limiter is None:
+            return self.max_concurrency
+        return min(self.max_concurrency, self.limiter.limit)
+
+    def _limit(self, priority: Priority) -> int:
+        concurrency = self.concurrency
+        return concurrency if priority == Priority.INTERACTIVE else max(1, concurrency - self.reserved_interactive)
+
+    def observe(self, started_at: float, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """Report an attempt of a request to the limiter. Each retry of a request is reported
+        :param started_at: Monotonic time of the start of the attempt
+        :param latency: Seconds of the attempt. Successful attempts without latency aren't reported
+        :param overloaded: The attempt got 429, 5xx or a network error
+        """
+        if self.limiter is None:
+            return
+        if overloaded:
+            self.limiter.on_overload(started_at)
+        elif latency is not None:
+            self.limiter.on_success(started_at, latency, self._active)
+
+    def _estimated_wait(self, priority: Priority) -> float:
+        """Seconds until a new request of the priority gets a slot"""
+        ahead = sum(self._waiting[:priority + 1])
+        capacity = self._limit(priority)
+        busy = max(0, self._active - capacity + 1)
+        return (ahead + busy) / capacity * self.service_time
+
+    def _reject(self, priority: Priority, reason: str, retry_after: float) -> OverloadedError:
+        self._rejected.labels(self.name, priority.name.lower(), reason).inc()
+        return OverloadedError(
+            f'Request of {priority.name.lower()} priority rejected: {reason}',
+            retry_after=max(1.0, math.ceil(retry_after)),
+            reason=reason,
+        )
+
+    def _try_acquire(self, priority: Priority, deadline: Optional[float],
+                     future: Optional[asyncio.Future] = None) -> Optional[_Waiter]:
+        """Take a slot or enqueue a waiter. Must be called with the lock
+        :param future: Future of an async waiter
+        :returns None if a slot is taken, otherwise the waiter
+        :raises OverloadedError: If the request can't start before its deadline or the queue is full
+        """
+        if sum(self._waiting[:priority + 1]) == 0 and self._active < self._limit(priority):
+            self._active += 1
+            self._wait_time.labels(self.name, priority.name.lower()).observe(0.0)
+            return None
+
+        wait = self._estimated_wait(priority)
+        if deadline is not None and time.monotonic() + wait > deadline:
+            raise self._reject(priority, 'deadline', wait)
+        if sum(self._waiting) >= self.max_queue:
+            raise self._reject(priority, 'queue_full', wait)
+
+        waiter = _Waiter(priority, future)
+        heapq.heappush(self._queue, (priority, next(self._counter), waiter))
+        self._waiting[priority] += 1
+        return waiter
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiters in priority order. Must be called with the lock"""
+        while self._queue:
+            priority, _, waiter = self._queue[0]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self._active >= self._limit(priority):
+                # Waiters of lower priorities have lower limits
+                return
+            heapq.heappop(self._queue)
+            self._waiting[priority] -= 1
+            self._active += 1
+            waiter.granted = True
+            self._wait_time.labels(self.name, priority.name.lower()).observe(time.monotonic() - waiter.enqueued_at)
+            waiter.wake()
+
+    def _cancel(self, waiter: _Waiter) -> bool:
+        """Remove the waiter from the queue. Must be called with the lock
+        :returns False if the slot was granted meanwhile
+        """
+        if waiter.granted:
+            return False
+        waiter.cancelled = True
+        self._waiting[waiter.priority] -= 1
+        return True
+
+    def _release(self, started_at: Optional[float]) -> None:
+        """Free a slot
+        :param started_at: Monotonic time when the slot was taken. None if it wasn't used
+        """
+        with self._lock:
+            self._active -= 1
+            if started_at is not None:
+                self.service_time += 0.1 * (time.monotonic() - started_at - self.service_time)
+            self._dispatch()
+
+    def _timeout_error(self, waiter: _Waiter) -> OverloadedError:
+        return self._reject(waiter.priority, 'timeout', self._estimated_wait(waiter.priority))
+
+    @staticmethod
+    def _scheduling(priority: Optional[Priority], deadline: Optional[float]) -> Tuple[Priority, Optional[float]]:
+        """Priority and deadline of a request, defaults are the ones of the current context"""
+        context_priority, context_deadline = _scheduling.get()
+        priority = context_priority if priority is None else priority
+        deadline = context_deadline if deadline is None else deadline
+        request_deadline = current_deadline()
+        if request_deadline is not None:
+            deadline = request_deadline if deadline is None else min(deadline, request_deadline)
+        return priority, deadline
+
+    @contextmanager
+    def slot(self, priority: Optional[Priority] = None, deadline: Optional[float] = None) -> Iterator[None]:
+        """Hold a slot in the block. Blocks the thread while the request waits
+        :param priority: Default is the priority of the current context
+        :param deadline: Monotonic time until which the request must start. Default is the deadline of the context.
+        The deadline of the request from sdk.deadline shortens it
+        :raises OverloadedError: If the request can't start before its deadline or the queue is full
+        """
+        priority, deadline = self._scheduling(priority, deadline)
+        with self._lock:
+            waiter = self._try_acquire(priority, deadline)
+
+        if waiter is not None:
+            timeout = deadline - time.monotonic() if deadline is not None else None
+            if not waiter.event.wait(timeout):
+                with self._lock:
+                    if self._cancel(waiter):
+                        raise self._timeout_error(waiter)
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started_at)
+
+    @asynccontextmanager
+    async def aslot(self, priority: Optional[Priority] = None, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a slot in the block. The request waits in the event loop, without a thread, see `slot`"""
+        priority, deadline = self._scheduling(priority, deadline)
+        with self._lock:
+            waiter = self._try_acquire(priority, deadline, asyncio.get_running_loop().create_future())
+
+        if waiter is not None:
+            timeout = deadline - time.monotonic() if deadline is not None else None
+            try:
+                await asyncio.wait_for(waiter.future, timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    if self._cancel(waiter):
+                        raise self._timeout_error(waiter)
+            except asyncio.CancelledError:
+                with self._lock:
+                    granted = not self._cancel(waiter)
+                # The slot may be granted while the task is cancelled
+                if granted:
+                    self._release(None)
+                raise
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started_at)
@@ -1,12 +1,23 @@
-from typing import List, Any
+from contextlib import aclosing
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Any, Optional, Sequence, Union
 
 import sdk.llm.yandex.model as ym
 from sdk.messages.base import BaseMessage
+from sdk.messages.chat import ChatMessage
 from sdk.messages.human import HumanMessage
 from sdk.messages.system import SystemMessage
+from sdk.prompts.prompt_values import PromptValue
+from sdk.runnable.base import Runnable
+from sdk.runnable.config import RunnableConfig
 
+if TYPE_CHECKING:
+    from sdk.llm.yandex.operations import Operation
 
-class YandexChatGPT(ym.YandexGPT):
+LanguageModelInput = Union[PromptValue, str, Sequence[BaseMessage]]
+"""Input of chat models: prompt value, plain user text or list of messages"""
+
+
+class YandexChatGPT(ym.YandexGPT, Runnable[LanguageModelInput, str]):
 
     @staticmethod
     def convert_message(message: BaseMessage, **kwargs: Any) -> ym.Message:
@@ -15,8 +26,52 @@ class YandexChatGPT(ym.YandexGPT):
             return ym.HumanMessage(text=message.content)
         if isinstance(message, SystemMessage):
             return ym.SystemMessage(text=message.content)
+        if isinstance(message, ChatMessage) and message.role == 'assistant':
+            return ym.AssistantMessage(text=message.content)
+        raise ValueError(f'Message type {message.type} is not supported by YandexGPT')
+
+    @staticmethod
+    def convert_input(input: LanguageModelInput) -> List[BaseMessage]:
+        """Convert model input to list of messages"""
+        if isinstance(input, PromptValue):
+            return input.to_messages()
+        if isinstance(input, str):
+            return [HumanMessage(content=input)]
+        return list(input)
+
+    def _convert(self, input: LanguageModelInput, **kwargs: Any) -> List[ym.Message]:
+        return [self.convert_message(m, **kwargs) for m in self.convert_input(input)]
 
-    def invoke(self, messages: List[BaseMessage], **kwargs):
-        converted_messages = [self.convert_message(m, **kwargs) for m in messages]
-        result = super().invoke(converted_messages)
+    def invoke(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        result = super().invoke(self._convert(input, **kwargs))
         return result
+
+    def complete(self, input: LanguageModelInput, **kwargs: Any) -> ym.Completion:
+        """Generate answer with token usage"""
+        return super().complete(self._convert(input, **kwargs))
+
+    async def acomplete(self, input: LanguageModelInput, **kwargs: Any) -> ym.Completion:
+        """Async version of complete"""
+        return await super().acomplete(self._convert(input, **kwargs))
+
+    def submit(self, input: LanguageModelInput, **kwargs: Any) -> 'Operation':
+        """Start a deferred completion, see YandexGPT.submit"""
+        return super().submit(self._convert(input, **kwargs))
+
+    async def asubmit(self, input: LanguageModelInput, **kwargs: Any) -> 'Operation':
+        """Async version of submit"""
+        return await super().asubmit(self._convert(input, **kwargs))
+
+    async def ainvoke(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None, **kwargs: Any) -> str:
+        completion = await self.acomplete(input, **kwargs)
+        return completion.text
+
+    def stream(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[str]:
+        yield from super().stream(self._convert(input, **kwargs))
+
+    async def astream(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[str]:
+        # Closing this iterator closes the model's one at once, not when it is garbage collected
+        async with aclosing(super().astream(self._convert(input, **kwargs))) as chunks:
+            async for chunk in chunks:
+                yield chunk
@@ -0,0 +1,163 @@
+"""Pool of Yandex Cloud credentials.
+
+Quotas of the completion API are per folder, so one API key caps throughput. `CredentialPool`
+spreads requests over keys of several folders. Every request attempt takes a credential:
+
+- least_loaded: the credential with the fewest requests in flight relative to its weight
+- round_robin: smooth weighted round-robin, credentials get requests in proportion to weights
+
+A credential which gets 429 is ejected for a while, growing with consecutive 429s; a credential
+which gets 401 or 403 is ejected for {auth_ejection} seconds. Retries of the failed request
+take another credential. If all credentials are ejected, the one which returns first is used.
+
+Set YC_CREDENTIALS in .env to use a pool in all models without changes of the code:
+
+    YC_CREDENTIALS=[{"yc_api_key_id": "...", "yc_api_key": "...", "yc_folder_id": "...", "weight": 2}, ...]
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence
+
+from sdk.exceptions import ProviderError
+from sdk.metrics import REGISTRY, Counter, Gauge, MetricsRegistry, get_or_create
+
+if TYPE_CHECKING:
+    from sdk.llm.yandex.settings import YandexAuth
+
+STRATEGIES = ('least_loaded', 'round_robin')
+
+AUTH_ERRORS = (401, 403)
+
+
+class _Credential:
+    __slots__ = ('auth', 'weight', 'in_flight', 'ejected_until', 'rate_limited', 'current_weight')
+
+    def __init__(self, auth: 'YandexAuth', weight: float):
+        self.auth = auth
+        self.weight = weight
+        self.in_flight = 0
+        self.ejected_until = 0.0
+        self.rate_limited = 0
+        """Consecutive 429 responses"""
+        self.current_weight = 0.0
+        """State of smooth weighted round-robin"""
+
+
+class CredentialPool:
+    """Credentials of several folders with their own rate-limit state"""
+
+    def __init__(self,
+                 credentials: Sequence['YandexAuth'],
+                 weights: Optional[Sequence[float]] = None,
+                 strategy: str = 'least_loaded',
+                 rate_limit_ejection: float = 1.0,
+                 max_rate_limit_ejection: float = 60.0,
+                 auth_ejection: float = 300.0,
+                 registry: Optional[MetricsRegistry] = None):
+        """
+        :param weights: Relative share of requests of every credential, e.g. by quotas of folders. Default is 1 for all
+        :param strategy: least_loaded or round_robin
+        :param rate_limit_ejection: Seconds of ejection after 429, doubled with every consecutive 429.
+        Retry-After of the response is used if it is longer
+        :param auth_ejection: Seconds of ejection after 401 or 403
+        """
+        if not credentials:
+            raise ValueError('Pool needs at least one credential')
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Unknown strategy {strategy}, use one of {STRATEGIES}')
+        weights = weights or [1.0] * len(credentials)
+        self._credentials = [_Credential(auth, weight) for auth, weight in zip(credentials, weights)]
+        self.strategy = strategy
+        self.rate_limit_ejection = rate_limit_ejection
+        self.max_rate_limit_ejection = max_rate_limit_ejection
+        self.auth_ejection = auth_ejection
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+        registry = registry or REGISTRY
+        self._ejections = get_or_create(registry, Counter, 'sdk_credential_ejections',
+                                        'Ejections of credentials from the pool', ['folder', 'reason'])
+        in_flight = get_or_create(registry, Gauge, 'sdk_credential_in_flight',
+                                  'Requests in flight by credential', ['folder'])
+        for credential in self._credentials:
+            in_flight.labels(credential.auth.yc_folder_id).set_function(lambda c=credential: c.in_flight)
+
+    def __len__(self):
+        return len(self._credentials)
+
+    @property
+    def primary(self) -> 'YandexAuth':
+        """The first credential. Its folder names the model in cache keys and traces"""
+        return self._credentials[0].auth
+
+    def available(self) -> List['YandexAuth']:
+        """Credentials which aren't ejected"""
+        now = time.monotonic()
+        return [c.auth for c in self._credentials if c.ejected_until <= now]
+
+    def find(self, folder_id: str) -> 'YandexAuth':
+        """Credential of the folder, e.g. to poll operations started with it
+        :raises KeyError: If the pool has no credential of the folder
+        """
+        for credential in self._credentials:
+            if credential.auth.yc_folder_id == folder_id:
+                return credential.auth
+        raise KeyError(folder_id)
+
+    def _choose(self) -> _Credential:
+        now = time.monotonic()
+        live = [c for c in self._credentials if c.ejected_until <= now]
+        if not live:
+            return min(self._credentials, key=lambda c: c.ejected_until)
+        if self.strategy == 'round_robin':
+            total = sum(c.weight for c in live)
+            for credential in live:
+                credential.current_weight += credential.weight
+            chosen = max(live, key=lambda c: c.current_weight)
+            chosen.current_weight -= total
+            return chosen
+        # Rotate the start, so credentials with equal load take turns
+        start = next(self._counter) % len(live)
+        rotated = live[start:] + live[:start]
+        return min(rotated, key=lambda c: (c.in_flight + 1) / c.weight)
+
+    @contextmanager
+    def acquire(self) -> Iterator['YandexAuth']:
+        """Credential for a request attempt. ProviderError raised in the block ejects it on 429, 401 and 403"""
+        with self._lock:
+            credential = self._choose()
+            credential.in_flight += 1
+        try:
+            yield credential.auth
+        except ProviderError as e:
+            self._failed(credential, e)
+            raise
+        else:
+            credential.rate_limited = 0
+        finally:
+            with self._lock:
+                credential.in_flight -= 1
+
+    def _failed(self, credential: _Credential, error: ProviderError) -> None:
+        if error.status_code == 429:
+            with self._lock:
+                credential.rate_limited += 1
+                ejection = min(self.max_rate_limit_ejection,
+                               self.rate_limit_ejection * 2 ** (credential.rate_limited - 1))
+                ejection = max(ejection, error.retry_after or 0)
+                credential.ejected_until = time.monotonic() + ejection
+            self._ejections.labels(credential.auth.yc_folder_id, 'rate_limit').inc()
+        elif error.status_code in AUTH_ERRORS:
+            with self._lock:
+                credential.ejected_until = time.monotonic() + self.auth_ejection
+            self._ejections.labels(credential.auth.yc_folder_id, 'auth').inc()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """In-flight requests and remaining ejection seconds by folder"""
+        now = time.monotonic()
+        return {
+            c.auth.yc_folder_id: {'in_flight': c.in_flight, 'ejected_for': max(0.0, c.ejected_until - now)}
+            for c in self._credentials
+        }
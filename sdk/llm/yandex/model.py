@@ -1,11 +1,49 @@
-from typing import List, Any, Literal, Dict
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Any, Literal, Dict, Optional
 from enum import Enum
-import requests
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
 
+from sdk import http
+from sdk.cache import BaseCache
+from sdk.callbacks.manager import trace_call
+from sdk.deadline import raise_if_exceeded, request_timeout
+from sdk.exceptions import ProviderError, RejectedRequestError, SdkException
+from sdk.llm.scheduler import RequestScheduler
+from sdk.llm.yandex.payload import PayloadEncoder
+from sdk.log import LogSampler
 from sdk.retry import retry_n_times
-from sdk.llm.yandex.settings import YandexAuth
+from sdk.runnable.config import run_in_executor
+from sdk.utils.singleflight import AsyncSingleFlight, SingleFlight
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from sdk.llm.yandex.credentials import CredentialPool
+    from sdk.llm.yandex.operations import Operation, OperationPoller
+    from sdk.llm.yandex.settings import YandexAuth
+    from sdk.semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+_sampled = LogSampler(logger)
+
+
+@functools.lru_cache(maxsize=None)
+def default_auth() -> 'YandexAuth':
+    """Credentials from .env file. Read on first use, so importing the SDK doesn't need them"""
+    from sdk.llm.yandex.settings import YandexAuth
+    return YandexAuth()
+
+
+@functools.lru_cache(maxsize=None)
+def default_credentials() -> Optional['CredentialPool']:
+    """Pool of credentials from YC_CREDENTIALS of .env file or None if it isn't set"""
+    from sdk.llm.yandex.settings import YandexCredentials
+    return YandexCredentials().pool()
+
 
 class Message(BaseModel):
     text: str
@@ -33,38 +71,384 @@ class YandexGPTModel(Enum):
     Summarization = 'summarization/latest'
 
 
+class Completion(BaseModel):
+    """Generated text with token usage"""
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> 'Completion':
+        """Completion from the result of the completion API or the response of a completion operation"""
+        usage = result.get('usage', {})
+        return cls(
+            text=result['alternatives'][0]['message']['text'],
+            input_tokens=int(usage.get('inputTextTokens', 0)),
+            output_tokens=int(usage.get('completionTokens', 0)),
+        )
+
+
 class YandexGPT:
     temperature: float = 0.4
     max_tokens: int = 1500
 
     model = YandexGPTModel.Lite
-    auth = YandexAuth()
-    base_url: str = 'https://llm.api.cloud.yandex.net/foundationModels/v1/completion'
+    _auth: Optional['YandexAuth'] = None
+    base_url: str = os.environ.get('YC_COMPLETION_URL', 'https://llm.api.cloud.yandex.net/foundationModels/v1/completion')
+    """Completion endpoint. YC_COMPLETION_URL environment variable replaces it, e.g. with a mock for benchmarks"""
+
+    async_url: str = os.environ.get('YC_ASYNC_COMPLETION_URL',
+                                    'https://llm.api.cloud.yandex.net/foundationModels/v1/completionAsync')
+    """Endpoint of deferred completions. YC_ASYNC_COMPLETION_URL environment variable replaces it"""
+
+    operations_url: str = os.environ.get('YC_OPERATIONS_URL', 'https://operation.api.cloud.yandex.net/operations')
+    """Operation API which reports results of deferred completions. YC_OPERATIONS_URL environment variable replaces it"""
+
+    single_flight: bool = True
+    """Concurrent identical requests wait for the first one and share its result instead of calling the API"""
+
+    cache: Optional[BaseCache] = None
+    """Cache of completions. Use SQLiteCache to share completions between processes"""
+
+    semantic_cache: Optional['SemanticCache'] = None
+    """Cache of answers to near-duplicate prompts. It is looked up by the last user message,
+    other messages and options of the request must be equal"""
+
+    credentials: Optional['CredentialPool'] = None
+    """Pool of credentials of several folders. Default is the pool from YC_CREDENTIALS of .env file
+    unless `auth` is set"""
+
+    scheduler: Optional[RequestScheduler] = None
+    """Scheduler of requests to the API. Priority and deadline of requests are set with `scheduling`"""
+
+    timeout: float = 60.0
+    """Seconds to wait for a response, or for the next line of a streamed one.
+    Requests in a deadline wait at most until it, see sdk.deadline"""
+
+    connect_timeout: float = 10.0
+    """Seconds to connect to the API"""
+
+    payload_encoder: Optional[PayloadEncoder] = PayloadEncoder()
+    """Encoder of request bodies which keeps leading messages of prompts encoded, shared by models.
+    Bodies are encoded with json as a whole if it is None"""
+
+    _flight = SingleFlight()
+    _async_flight = AsyncSingleFlight()
+
+    def __init__(self,
+                 model: Optional[YandexGPTModel] = None,
+                 temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None):
+        """Options which are not passed keep their class defaults"""
+        if model is not None:
+            self.model = model
+        if temperature is not None:
+            self.temperature = temperature
+        if max_tokens is not None:
+            self.max_tokens = max_tokens
+
+    @property
+    def auth(self) -> 'YandexAuth':
+        """Credentials of the model. Default are the first credentials of the pool or credentials from .env file"""
+        if self._auth is not None:
+            return self._auth
+        pool = self._pool()
+        return pool.primary if pool is not None else default_auth()
+
+    @auth.setter
+    def auth(self, auth: 'YandexAuth') -> None:
+        self._auth = auth
+
+    def _pool(self) -> Optional['CredentialPool']:
+        if self.credentials is not None:
+            return self.credentials
+        return default_credentials() if self._auth is None else None
+
+    def _credential(self):
+        """Credentials for a request attempt"""
+        pool = self._pool()
+        return pool.acquire() if pool is not None else contextlib.nullcontext(self.auth)
+
+    def _model_uri_of(self, auth: 'YandexAuth') -> str:
+        return f'gpt://{auth.yc_folder_id}/{self.model.value}'
 
     @property
     def _model_uri(self):
-        """Return model URI"""
-        return f'gpt://{self.auth.yc_folder_id}/{self.model.value}'
+        """Return model URI. Requests sent with credentials of other folders of the pool have other URIs"""
+        return self._model_uri_of(self.auth)
 
     def invoke(self, messages: List[Message]):
         msgs_dump = [m.model_dump() for m in messages]
         return self._generate_messages(msgs_dump)
 
-    @retry_n_times(4)
-    def _generate_messages(self,
-                           prompts: List[Dict[str, str]],
-                           **kwargs: Any,
-                           ):
-        req = {
-            "modelUri": self._model_uri,
+    def complete(self, messages: List[Message]) -> Completion:
+        """Generate answer with token usage"""
+        msgs_dump = [m.model_dump() for m in messages]
+        return self._shared_complete(msgs_dump)
+
+    async def acomplete(self, messages: List[Message]) -> Completion:
+        """Async version of complete"""
+        msgs_dump = [m.model_dump() for m in messages]
+        return await self._ashared_complete(msgs_dump)
+
+    def stream(self, messages: List[Message]) -> Iterator[str]:
+        """Generate answer and yield new parts of the text as soon as the model produces them"""
+        msgs_dump = [m.model_dump() for m in messages]
+        return self._stream_messages(msgs_dump)
+
+    def astream(self, messages: List[Message]) -> AsyncIterator[str]:
+        """Async version of stream. Closing the iterator or cancelling its task closes the connection
+        to the API, so an abandoned generation stops"""
+        msgs_dump = [m.model_dump() for m in messages]
+        return self._astream_messages(msgs_dump)
+
+    def _completion_request(self, prompts: List[Dict[str, str]], stream: bool = False,
+                            auth: Optional['YandexAuth'] = None) -> Dict[str, Any]:
+        """Build request body of the completion endpoint
+        :param auth: Credentials the request is sent with. Default are the model's credentials
+        """
+        return {
+            "modelUri": self._model_uri_of(auth or self.auth),
             "completionOptions": {
+                "stream": stream,
                 "max_tokens": self.max_tokens,
                 "temperature": self.temperature
             },
             "messages": prompts
         }
 
-        headers = self.auth.headers
-        llm_response = requests.post(self.base_url, headers=headers, json=req)
-        text = llm_response.json()
-        return text['result']['alternatives'][0]['message']['text']
+    def _completion_body(self, prompts: List[Dict[str, str]], stream: bool = False,
+                         auth: Optional['YandexAuth'] = None) -> bytes:
+        """Encoded request body of the completion endpoint, see `_completion_request`"""
+        if self.payload_encoder is None:
+            return json.dumps(self._completion_request(prompts, stream, auth), ensure_ascii=False).encode()
+        options = {"stream": stream, "max_tokens": self.max_tokens, "temperature": self.temperature}
+        return self.payload_encoder.encode(self._model_uri_of(auth or self.auth), options, prompts)
+
+    @staticmethod
+    def _json_headers(auth: 'YandexAuth') -> Dict[str, str]:
+        return {**auth.headers, 'Content-Type': 'application/json'}
+
+    def _request_key(self, prompts: List[Dict[str, str]]) -> str:
+        """Key of single-flight deduplication. Requests with equal keys get equal answers"""
+        return json.dumps([self._model_uri, self.temperature, self.max_tokens, prompts], ensure_ascii=False)
+
+    def _shared_complete(self, prompts: List[Dict[str, str]]) -> Completion:
+        cache_key = None
+        if self.cache is not None:
+            cache_key = hashlib.sha256(self._request_key(prompts).encode()).hexdigest()
+            cached = self.cache.lookup(cache_key)
+            if cached is not None:
+                with trace_call('llm', self._model_uri) as call:
+                    call.cache_hit = True
+                    return Completion.model_validate_json(cached)
+
+        if self.semantic_cache is not None and prompts and prompts[-1]['role'] == 'user':
+            cached = self.semantic_cache.lookup(prompts[-1]['text'], self._request_key(prompts[:-1]))
+            if cached is not None:
+                with trace_call('llm', self._model_uri, semantic=True) as call:
+                    call.cache_hit = True
+                    return Completion.model_validate_json(cached)
+
+        if not self.single_flight:
+            return self._cached_complete(prompts, cache_key)
+        return self._flight.do(self._request_key(prompts), self._cached_complete, prompts, cache_key)
+
+    def _cached_complete(self, prompts: List[Dict[str, str]], cache_key: Optional[str]) -> Completion:
+        """Complete and store the completion in the cache. Called once for all waiters of a single-flight call"""
+        completion = self._traced_complete(prompts)
+        if cache_key is not None:
+            self.cache.update(cache_key, completion.model_dump_json())
+        if self.semantic_cache is not None and prompts and prompts[-1]['role'] == 'user':
+            self.semantic_cache.update(prompts[-1]['text'], completion.model_dump_json(), self._request_key(prompts[:-1]))
+        return completion
+
+    async def _ashared_complete(self, prompts: List[Dict[str, str]]) -> Completion:
+        if not self.single_flight:
+            return await run_in_executor(self._shared_complete, prompts)
+        # Waiters in the loop don't occupy executor threads. The executor call is also shared with sync callers
+        return await self._async_flight.do(self._request_key(prompts), run_in_executor, self._shared_complete, prompts)
+
+    def _generate_messages(self,
+                           prompts: List[Dict[str, str]],
+                           **kwargs: Any,
+                           ):
+        return self._shared_complete(prompts).text
+
+    def _traced_complete(self, prompts: List[Dict[str, str]]) -> Completion:
+        with trace_call('llm', self._model_uri) as call:
+            completion = self._complete(prompts)
+            call.input_tokens = completion.input_tokens
+            call.output_tokens = completion.output_tokens
+        _sampled.debug('Completion of %s: %d input tokens, %d output tokens',
+                       self._model_uri, completion.input_tokens, completion.output_tokens)
+        return completion
+
+    @retry_n_times(4)
+    def _complete(self,
+                  prompts: List[Dict[str, str]],
+                  **kwargs: Any,
+                  ) -> Completion:
+        import requests
+
+        # Every attempt takes a slot, so retries wait for the current limit and backoff doesn't hold slots.
+        # It also takes credentials, so retries of rejected requests go to other folders of the pool
+        with self._slot(), self._credential() as auth:
+            body = self._completion_body(prompts, auth=auth)
+            # The slot may have been waited for until the deadline
+            timeout = request_timeout(self.timeout, self.connect_timeout)
+            started_at = time.monotonic()
+            try:
+                llm_response = http.session().post(self.base_url, headers=self._json_headers(auth), data=body,
+                                                   timeout=timeout)
+            except requests.RequestException as e:
+                # Requests cut by the deadline don't tell anything about the load of the provider
+                raise_if_exceeded(e)
+                self._observe(started_at, overloaded=True)
+                raise
+            self._check_response(llm_response, started_at)
+            self._observe(started_at, time.monotonic() - started_at)
+        return Completion.from_result(llm_response.json()['result'])
+
+    def _slot(self):
+        """Slot of the scheduler for a request to the API"""
+        return self.scheduler.slot() if self.scheduler is not None else contextlib.nullcontext()
+
+    def _aslot(self):
+        """Slot of the scheduler for an async request. The slot is waited for in the event loop"""
+        return self.scheduler.aslot() if self.scheduler is not None else contextlib.nullcontext()
+
+    def _observe(self, started_at: float, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """Report an attempt to the adaptive concurrency limit of the scheduler"""
+        if self.scheduler is not None:
+            self.scheduler.observe(started_at, latency, overloaded)
+
+    def _check_response(self, response, started_at: Optional[float] = None) -> None:
+        """:raises ProviderError: If the provider answered with 429, 5xx or rejected the credentials"""
+        overloaded = response.status_code == 429 or response.status_code >= 500
+        if overloaded and started_at is not None:
+            self._observe(started_at, overloaded=True)
+        if overloaded or response.status_code in (401, 403):
+            retry_after = response.headers.get('Retry-After')
+            raise ProviderError(f'Request failed: {response.status_code} {response.text[:200]}',
+                                status_code=response.status_code,
+                                retry_after=float(retry_after) if retry_after else None)
+
+    def submit(self, messages: List[Message]) -> 'Operation':
+        """Start a deferred completion. The request returns at once, poll the operation for the answer:
+        see `poller`. Deferred completions bypass the cache, single-flight and the scheduler
+        """
+        msgs_dump = [m.model_dump() for m in messages]
+        return self._traced_submit(msgs_dump)
+
+    async def asubmit(self, messages: List[Message]) -> 'Operation':
+        """Async version of submit"""
+        msgs_dump = [m.model_dump() for m in messages]
+        return await run_in_executor(self._traced_submit, msgs_dump)
+
+    def poller(self, **kwargs: Any) -> 'OperationPoller':
+        """Poller of operations started by submit. Keyword arguments are options of OperationPoller"""
+        from sdk.llm.yandex.operations import OperationPoller
+
+        pool = self._pool()
+        if pool is None:
+            return OperationPoller(self.auth.headers, self.operations_url, **kwargs)
+        # Operations are polled with the credentials of the folder which started them
+        return OperationPoller(lambda operation: pool.find(operation.folder_id).headers, self.operations_url, **kwargs)
+
+    def _traced_submit(self, prompts: List[Dict[str, str]]) -> 'Operation':
+        with trace_call('llm', self._model_uri, deferred=True):
+            return self._submit(prompts)
+
+    @retry_n_times(4)
+    def _submit(self, prompts: List[Dict[str, str]]) -> 'Operation':
+        import requests
+
+        from sdk.llm.yandex.operations import Operation
+
+        with self._credential() as auth:
+            submitted_at = time.monotonic()
+            try:
+                response = http.session().post(self.async_url, headers=self._json_headers(auth),
+                                               data=self._completion_body(prompts, auth=auth),
+                                               timeout=request_timeout(self.timeout, self.connect_timeout))
+            except requests.Timeout as e:
+                raise_if_exceeded(e)
+                raise
+            # 429, 5xx and rejected credentials are retried, other 4xx aren't
+            self._check_response(response)
+            if 400 <= response.status_code < 500:
+                raise RejectedRequestError(f'Deferred completion was rejected: {response.status_code} {response.text}',
+                                           status_code=response.status_code)
+            if response.status_code != 200:
+                raise SdkException(f'Deferred completion was not accepted: {response.status_code} {response.text}')
+        return Operation(id=response.json()['id'], model_uri=self._model_uri_of(auth), submitted_at=submitted_at)
+
+    def _stream_messages(self,
+                         prompts: List[Dict[str, str]],
+                         **kwargs: Any,
+                         ) -> Iterator[str]:
+        import requests
+
+        # The generator may be resumed in different contexts, so the call isn't made current
+        with self._slot(), self._credential() as auth, \
+                trace_call('llm', self._model_uri, set_current=False, stream=True) as call:
+            body = self._completion_body(prompts, stream=True, auth=auth)
+            timeout = request_timeout(self.timeout, self.connect_timeout)
+            started_at = time.monotonic()
+            try:
+                with http.session().post(self.base_url, headers=self._json_headers(auth), data=body,
+                                         stream=True, timeout=timeout) as llm_response:
+                    # Latency of streams depends on the length of answers, so only overloads are reported
+                    self._check_response(llm_response, started_at)
+                    generated = ''
+                    for line in llm_response.iter_lines():
+                        if not line:
+                            continue
+                        text = self._stream_text(line, call)
+                        if len(text) > len(generated):
+                            yield text[len(generated):]
+                            generated = text
+            except (requests.Timeout, requests.ConnectionError) as e:
+                # Timeouts of reads of streams are raised as ConnectionError
+                raise_if_exceeded(e)
+                raise
+
+    @staticmethod
+    def _stream_text(line, call) -> str:
+        """Text of a line of a streamed response and its token usage recorded in the call.
+        Every line is a json with the whole text generated so far"""
+        result = json.loads(line)['result']
+        usage = result.get('usage', {})
+        call.input_tokens = int(usage.get('inputTextTokens', 0))
+        call.output_tokens = int(usage.get('completionTokens', 0))
+        return result['alternatives'][0]['message']['text']
+
+    async def _astream_messages(self, prompts: List[Dict[str, str]]) -> AsyncIterator[str]:
+        import httpx
+
+        async with self._aslot():
+            with self._credential() as auth, \
+                    trace_call('llm', self._model_uri, set_current=False, stream=True) as call:
+                body = self._completion_body(prompts, stream=True, auth=auth)
+                connect, read = request_timeout(self.timeout, self.connect_timeout)
+                started_at = time.monotonic()
+                # Leaving the block on cancellation or aclose closes the connection, so the API stops generating
+                try:
+                    async with http.async_client(timeout=httpx.Timeout(read, connect=connect)) as client, \
+                            client.stream('POST', self.base_url, headers=self._json_headers(auth),
+                                          content=body) as llm_response:
+                        if llm_response.status_code != 200:
+                            await llm_response.aread()
+                        self._check_response(llm_response, started_at)
+                        generated = ''
+                        async for line in llm_response.aiter_lines():
+                            if not line:
+                                continue
+                            text = self._stream_text(line, call)
+                            if len(text) > len(generated):
+                                yield text[len(generated):]
+                                generated = text
+                except httpx.TimeoutException as e:
+                    raise_if_exceeded(e)
+                    raise
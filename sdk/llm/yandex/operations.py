@@ -0,0 +1,213 @@
+"""Deferred completions with the long-running operation API of Yandex Cloud.
+
+`YandexGPT.submit` sends a request to the asynchronous completion endpoint, which answers
+at once with an operation id instead of keeping the connection open until the text is
+generated. `OperationPoller` checks many operations over a few shared connections and
+yields them as they finish:
+
+    poller = model.poller()
+    for job in jobs:
+        poller.add(model.submit(job))
+    async for operation in poller:
+        completion = operation.result()
+
+Every operation is polled with its own interval. The first poll happens after the typical
+generation time learned from finished operations, then the interval grows by {backoff}
+while the operation isn't done, so long generations aren't polled every {min_interval}.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+from pydantic import BaseModel, ConfigDict
+
+from sdk import http
+from sdk.exceptions import OperationError
+from sdk.llm.yandex.model import Completion
+
+
+class Operation(BaseModel):
+    """Handle of a deferred completion"""
+    model_config = ConfigDict(protected_namespaces=())
+
+    id: str
+    model_uri: str = ''
+    submitted_at: float = 0.0
+    """Monotonic time of submission"""
+    done: bool = False
+    completion: Optional[Completion] = None
+    error: Optional[str] = None
+
+    @property
+    def folder_id(self) -> str:
+        """Folder of the credentials which started the operation"""
+        return self.model_uri[len('gpt://'):].split('/', 1)[0]
+
+    def result(self) -> Completion:
+        """Completion of the finished operation
+        :raises OperationError: If the operation failed or isn't done
+        """
+        if not self.done:
+            raise OperationError(f'Operation {self.id} is not done', operation_id=self.id)
+        if self.error is not None:
+            raise OperationError(f'Operation {self.id} failed: {self.error}', operation_id=self.id)
+        return self.completion
+
+
+class _Polled:
+    __slots__ = ('operation', 'interval', 'polls')
+
+    def __init__(self, operation: Operation, interval: float):
+        self.operation = operation
+        self.interval = interval
+        self.polls = 0
+
+
+class OperationPoller:
+    """Polls operations concurrently and yields them as they finish. Iterate it in one task"""
+
+    def __init__(self,
+                 headers: Union[Dict[str, str], Callable[[Operation], Dict[str, str]]],
+                 operations_url: str,
+                 min_interval: float = 0.5,
+                 max_interval: float = 30.0,
+                 backoff: float = 1.5,
+                 max_concurrency: int = 16,
+                 timeout: float = 30.0):
+        """
+        :param headers: Auth headers of the operation API or function of an operation which returns them
+        :param operations_url: Url of the operations, the id of an operation is appended to it
+        :param min_interval: Least seconds between polls of an operation
+        :param max_interval: Most seconds between polls of an operation
+        :param backoff: Factor of the interval after a poll of an unfinished operation
+        :param max_concurrency: Polls in flight, which is also the amount of open connections
+        :param timeout: Seconds of a poll request
+        """
+        self.headers = headers
+        self.operations_url = operations_url.rstrip('/')
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+        self.expected_duration = min_interval
+        """Average seconds from submission until an operation is done, learned from finished operations"""
+        self.polls = 0
+        """Amount of poll requests sent"""
+
+        self._queue: List[Tuple[float, int, _Polled]] = []
+        self._counter = itertools.count()
+        self._paused_until = 0.0
+        self._in_flight: Dict[asyncio.Future, _Polled] = {}
+
+    def __len__(self):
+        """Amount of operations which aren't yielded yet"""
+        return len(self._queue) + len(self._in_flight)
+
+    def add(self, operation: Operation) -> None:
+        """Poll the operation. Operations may be added while the poller is iterated"""
+        if operation.done:
+            self._schedule(_Polled(operation, self.min_interval), time.monotonic())
+            return
+        delay = self._clamp(self.expected_duration - (time.monotonic() - operation.submitted_at))
+        self._schedule(_Polled(operation, delay), time.monotonic() + delay)
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _schedule(self, polled: _Polled, at: float) -> None:
+        heapq.heappush(self._queue, (at, next(self._counter), polled))
+
+    def _retry_later(self, polled: _Polled, delay: Optional[float] = None) -> None:
+        polled.interval = self._clamp(polled.interval * self.backoff) if delay is None else delay
+        self._schedule(polled, time.monotonic() + polled.interval)
+
+    def _finish(self, polled: _Polled, body: Dict) -> Operation:
+        operation = polled.operation
+        if 'error' in body:
+            operation.error = body['error'].get('message') or str(body['error'])
+        else:
+            operation.completion = Completion.from_result(body['response'])
+        operation.done = True
+        if operation.error is None and operation.submitted_at:
+            duration = time.monotonic() - operation.submitted_at
+            self.expected_duration += 0.2 * (duration - self.expected_duration)
+        return operation
+
+    async def _poll(self, client: httpx.AsyncClient, polled: _Polled) -> Optional[Operation]:
+        """Check the operation once
+        :returns The operation if it is done, otherwise None and the operation is scheduled again
+        """
+        operation = polled.operation
+        if operation.done:
+            return operation
+
+        self.polls += 1
+        polled.polls += 1
+        try:
+            headers = self.headers(operation) if callable(self.headers) else None
+            response = await client.get(f'{self.operations_url}/{operation.id}', headers=headers)
+        except httpx.HTTPError:
+            self._retry_later(polled)
+            return None
+
+        if response.status_code == 429:
+            # Quota of the operation API is shared, so all polls wait
+            delay = float(response.headers.get('Retry-After') or polled.interval)
+            self._paused_until = time.monotonic() + delay
+            self._retry_later(polled, delay)
+            return None
+        if response.status_code >= 500:
+            self._retry_later(polled)
+            return None
+        if response.status_code != 200:
+            operation.done = True
+            operation.error = f'{response.status_code} {response.text}'
+            return operation
+
+        body = response.json()
+        if not body.get('done'):
+            self._retry_later(polled)
+            return None
+        return self._finish(polled, body)
+
+    async def __aiter__(self) -> AsyncIterator[Operation]:
+        """Yield operations in the order they finish until no operation is left"""
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        in_flight = self._in_flight
+        headers = None if callable(self.headers) else self.headers
+        async with http.async_client(headers=headers, limits=limits, timeout=self.timeout) as client:
+            try:
+                while self._queue or in_flight:
+                    now = time.monotonic()
+                    while (self._queue and self._queue[0][0] <= now and now >= self._paused_until
+                           and len(in_flight) < self.max_concurrency):
+                        _, _, polled = heapq.heappop(self._queue)
+                        in_flight[asyncio.ensure_future(self._poll(client, polled))] = polled
+
+                    timeout = None
+                    if self._queue and len(in_flight) < self.max_concurrency:
+                        timeout = max(0.0, max(self._queue[0][0], self._paused_until) - now)
+                    if not in_flight:
+                        await asyncio.sleep(timeout)
+                        continue
+                    done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        del in_flight[task]
+                        operation = task.result()
+                        if operation is not None:
+                            yield operation
+            finally:
+                # Operations of interrupted polls are polled again by the next iteration
+                for task, polled in in_flight.items():
+                    task.cancel()
+                    self._schedule(polled, time.monotonic())
+                in_flight.clear()
+
+    async def wait(self) -> List[Operation]:
+        """All operations, once all of them are done"""
+        return [operation async for operation in self]
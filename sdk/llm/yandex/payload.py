@@ -0,0 +1,73 @@
+"""Request bodies of the completion API with pre-serialized static prefixes.
+
+Prompts of a chain start with the same messages on every call: a system prompt of tens of
+kilobytes, few-shot examples, the history of a dialog. Only the last user message changes.
+`PayloadEncoder` encodes the model URI, completion options and the leading messages with orjson
+once and keeps the bytes. A call encodes only the last message and splices it in:
+
+    {"modelUri":...,"completionOptions":{...},"messages":[<cached leading messages>,<last message>]}
+
+The result is byte-for-byte equal to `orjson.dumps` of the whole request.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+
+import orjson
+
+
+class PayloadEncoder:
+    """LRU cache of encoded request prefixes"""
+
+    def __init__(self, maxsize: int = 128):
+        """
+        :param maxsize: Amount of cached prefixes. Least recently used prefixes are evicted above it
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._prefixes: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._prefixes)
+
+    @staticmethod
+    def _key(model_uri: str, options: Dict[str, Any], static: Sequence[Dict[str, str]]) -> Tuple:
+        # Strings cache their hashes, so keys of the same prompt objects are hashed once
+        return model_uri, tuple(options.items()), tuple(tuple(m.items()) for m in static)
+
+    @staticmethod
+    def _encode_prefix(model_uri: str, options: Dict[str, Any], static: Sequence[Dict[str, str]]) -> bytes:
+        head = orjson.dumps({'modelUri': model_uri, 'completionOptions': options})
+        messages = b','.join(orjson.dumps(m) for m in static)
+        return head[:-1] + b',"messages":[' + messages + (b',' if static else b'')
+
+    def prefix(self, model_uri: str, options: Dict[str, Any], static: Sequence[Dict[str, str]]) -> bytes:
+        """Encoded request up to the last message, with a trailing comma if there are leading messages"""
+        key = self._key(model_uri, options, static)
+        with self._lock:
+            prefix = self._prefixes.get(key)
+            if prefix is not None:
+                self._prefixes.move_to_end(key)
+                self.hits += 1
+                return prefix
+            self.misses += 1
+
+        prefix = self._encode_prefix(model_uri, options, static)
+        with self._lock:
+            self._prefixes[key] = prefix
+            while len(self._prefixes) > self.maxsize:
+                self._prefixes.popitem(last=False)
+        return prefix
+
+    def encode(self, model_uri: str, options: Dict[str, Any], messages: List[Dict[str, str]]) -> bytes:
+        """Body of the completion request. All messages but the last one are the static prefix"""
+        if not messages:
+            return self.prefix(model_uri, options, ()) + b']}'
+        # One join copies the prefix once
+        return b''.join((self.prefix(model_uri, options, messages[:-1]), orjson.dumps(messages[-1]), b']}'))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._prefixes.clear()
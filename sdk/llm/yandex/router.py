@@ -0,0 +1,234 @@
+import itertools
+import re
+import threading
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Pattern, Sequence, Tuple, Union
+
+from sdk.exceptions import OutputParserException
+from sdk.llm.yandex.chat_model import LanguageModelInput, YandexChatGPT
+from sdk.llm.yandex.model import YandexGPTModel
+from sdk.messages.human import HumanMessage
+from sdk.output_parsers.base import BaseOutputParser
+from sdk.output_parsers.json import JsonOutputParser, PartialJsonParser
+from sdk.runnable.base import Runnable
+from sdk.runnable.config import RunnableConfig
+
+MODEL_PRICES: Dict[YandexGPTModel, float] = {
+    YandexGPTModel.Lite: 0.2,
+    YandexGPTModel.Pro: 1.2,
+    YandexGPTModel.Summarization: 0.2,
+}
+"""Price of 1000 tokens in roubles"""
+
+
+class ModelStats:
+    """Exponentially weighted statistics of a model's calls"""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        """Weight of the latest observation"""
+
+        self.calls = 0
+        self.failures = 0
+
+        self.latency: Optional[float] = None
+        """Average latency in seconds. None until the first call"""
+
+        self.cost: Optional[float] = None
+        """Average cost of a call in roubles. None until the first call"""
+
+    def _average(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.alpha * (value - current)
+
+    def observe(self, latency: float, cost: float) -> None:
+        self.calls += 1
+        self.latency = self._average(self.latency, latency)
+        self.cost = self._average(self.cost, cost)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'calls': self.calls, 'failures': self.failures, 'latency': self.latency, 'cost': self.cost}
+
+
+class YandexModelRouter(Runnable[LanguageModelInput, Any]):
+    """Route every request to YandexGPT Lite or Pro.
+
+    Routing uses cheap local signals of the user's prompt:
+    - prompts longer than {max_lite_length} characters or matching one of {hard_patterns} go to Pro
+    - other prompts go to Lite, unless observed statistics say Lite doesn't pay off for prompts of this length:
+      when Lite's expected latency and cost, including escalations to Pro, exceed Pro's ones.
+
+    If {parser} is set, the router returns parsed output and escalates to Pro when Lite's output can't be parsed.
+    Parse failures of Lite are tracked per prompt length bucket and feed the routing decision above.
+    """
+
+    def __init__(self,
+                 parser: Optional[BaseOutputParser] = None,
+                 models: Optional[Dict[YandexGPTModel, YandexChatGPT]] = None,
+                 max_lite_length: int = 1000,
+                 hard_patterns: Sequence[Union[str, Pattern]] = (),
+                 cost_weight: float = 1.0,
+                 length_bucket_size: int = 100,
+                 probe_interval: int = 20,
+                 name: Optional[str] = None):
+        """
+        :param parser: Parser of model's output. Lite's outputs which fail parsing are regenerated by Pro
+        :param models: Models by their type. Default is YandexChatGPT of Lite and Pro
+        :param max_lite_length: Prompts longer than this amount of characters are sent to Pro
+        :param hard_patterns: Regular expressions of prompts which are sent to Pro
+        :param cost_weight: Seconds of latency which are worth one rouble. Balances latency and cost in routing
+        :param length_bucket_size: Prompts are grouped by length in buckets of this size to track Lite's failures
+        :param probe_interval: Every {probe_interval}-th prompt routed to Pro by statistics is still sent to Lite,
+        so the statistics can notice when Lite gets better
+        """
+        self.parser = parser
+        self.models = models or {m: YandexChatGPT(model=m) for m in (YandexGPTModel.Lite, YandexGPTModel.Pro)}
+        self.max_lite_length = max_lite_length
+        self.hard_patterns: List[Pattern] = [re.compile(p, re.IGNORECASE) if isinstance(p, str) else p
+                                             for p in hard_patterns]
+        self.cost_weight = cost_weight
+        self.length_bucket_size = length_bucket_size
+        self.probe_interval = probe_interval
+        self.name = name
+
+        self.stats: Dict[YandexGPTModel, ModelStats] = {m: ModelStats() for m in self.models}
+        self._lite_failure_rate: Dict[int, float] = {}
+        """Exponentially weighted rate of Lite's parse failures by prompt length bucket"""
+        self._lock = threading.Lock()
+        self._statistical_decisions = itertools.count(1)
+
+    @staticmethod
+    def _user_prompt(input: LanguageModelInput) -> str:
+        """Text of the last human message. System prompts are the same for all requests and aren't a signal"""
+        messages = YandexChatGPT.convert_input(input)
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage) and isinstance(message.content, str):
+                return message.content
+        return ''
+
+    def _bucket(self, prompt: str) -> int:
+        return len(prompt) // self.length_bucket_size
+
+    def _score(self, model: YandexGPTModel) -> Optional[float]:
+        stats = self.stats[model]
+        if stats.latency is None:
+            return None
+        return stats.latency + self.cost_weight * stats.cost
+
+    def choose_model(self, input: LanguageModelInput) -> YandexGPTModel:
+        """Choose a model for the input"""
+        prompt = self._user_prompt(input)
+
+        if len(prompt) > self.max_lite_length or any(p.search(prompt) for p in self.hard_patterns):
+            return YandexGPTModel.Pro
+
+        lite_score = self._score(YandexGPTModel.Lite)
+        pro_score = self._score(YandexGPTModel.Pro)
+        if lite_score is None or pro_score is None:
+            return YandexGPTModel.Lite
+
+        # Lite's failed outputs are regenerated by Pro, so a failing Lite costs both calls
+        failure_rate = self._lite_failure_rate.get(self._bucket(prompt), 0.0)
+        if lite_score + failure_rate * pro_score > pro_score:
+            if next(self._statistical_decisions) % self.probe_interval == 0:
+                return YandexGPTModel.Lite
+            return YandexGPTModel.Pro
+        return YandexGPTModel.Lite
+
+    def _call(self, model: YandexGPTModel, input: LanguageModelInput) -> str:
+        started = time.perf_counter()
+        completion = self.models[model].complete(input)
+        latency = time.perf_counter() - started
+
+        cost = (completion.input_tokens + completion.output_tokens) / 1000 * MODEL_PRICES[model]
+        with self._lock:
+            self.stats[model].observe(latency, cost)
+        return completion.text
+
+    def _observe_failure(self, model: YandexGPTModel) -> None:
+        with self._lock:
+            self.stats[model].failures += 1
+
+    def _observe_lite_result(self, prompt: str, failed: bool) -> None:
+        bucket = self._bucket(prompt)
+        alpha = self.stats[YandexGPTModel.Lite].alpha
+        with self._lock:
+            rate = self._lite_failure_rate.get(bucket, 0.0)
+            self._lite_failure_rate[bucket] = rate + alpha * (float(failed) - rate)
+
+    def invoke(self, input: LanguageModelInput, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        model = self.choose_model(input)
+        text = self._call(model, input)
+
+        if self.parser is None:
+            return text
+
+        try:
+            result = self.parser.parse(text)
+        except OutputParserException:
+            if model is not YandexGPTModel.Lite:
+                self._observe_failure(model)
+                raise
+            self._observe_failure(YandexGPTModel.Lite)
+            self._observe_lite_result(self._user_prompt(input), failed=True)
+        else:
+            if model is YandexGPTModel.Lite:
+                self._observe_lite_result(self._user_prompt(input), failed=False)
+            return result
+
+        try:
+            return self.parser.parse(self._call(YandexGPTModel.Pro, input))
+        except OutputParserException:
+            self._observe_failure(YandexGPTModel.Pro)
+            raise
+
+    @staticmethod
+    def _feed(parser: PartialJsonParser, chunk: str) -> bool:
+        try:
+            return parser.feed(chunk)
+        except OutputParserException:
+            # The whole output is parsed at the end and escalated to Pro if it fails
+            return False
+
+    async def astream_events(self, input: LanguageModelInput) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream the answer of the routed model as events:
+        - ('token', text): a new part of the generated text
+        - ('partial', output): with JsonOutputParser, the fields of the output completed so far, every time a field
+          is completed, so downstream steps can start before the generation finishes
+        - ('escalation', 'pro'): Lite's output can't be parsed, new tokens of Pro's answer follow
+        - ('result', output): parsed output, or the whole text without a parser
+
+        Closing the iterator closes the connection to the API. Streamed calls update parse failure
+        rates, but not latency and cost of models: their token usage is in the traces.
+        :raises OutputParserException: If Pro's output can't be parsed
+        """
+        model = self.choose_model(input)
+        while True:
+            chunks = []
+            partial = PartialJsonParser() if isinstance(self.parser, JsonOutputParser) else None
+            async with aclosing(self.models[model].astream(input)) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield 'token', chunk
+                    if partial is not None and self._feed(partial, chunk):
+                        yield 'partial', partial.value
+            text = ''.join(chunks)
+            if self.parser is None:
+                yield 'result', text
+                return
+
+            try:
+                result = self.parser.parse(text)
+            except OutputParserException:
+                self._observe_failure(model)
+                if model is not YandexGPTModel.Lite:
+                    raise
+                self._observe_lite_result(self._user_prompt(input), failed=True)
+                model = YandexGPTModel.Pro
+                yield 'escalation', 'pro'
+                continue
+
+            if model is YandexGPTModel.Lite:
+                self._observe_lite_result(self._user_prompt(input), failed=False)
+            yield 'result', result
+            return
@@ -1,6 +1,11 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
 
+if TYPE_CHECKING:
+    from sdk.llm.yandex.credentials import CredentialPool
+
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))[:-len('sdk/llm/yandex')]
 CONFIG_PATH = os.path.join(ROOT_DIR, '.env')
 
@@ -22,5 +27,24 @@ class YandexAuth(BaseSettings):
         }
 
 
+class YandexCredentials(BaseSettings):
+    """Pool of credentials of several folders from .env file"""
+    yc_credentials: List[Dict[str, Any]] = []
+    """Json list of objects with the fields of YandexAuth and an optional weight"""
+    yc_credentials_strategy: str = 'least_loaded'
+
+    model_config = SettingsConfigDict(env_file=CONFIG_PATH, extra='ignore')
+
+    def pool(self) -> Optional['CredentialPool']:
+        """The pool or None if no credentials are set"""
+        if not self.yc_credentials:
+            return None
+        from sdk.llm.yandex.credentials import CredentialPool
+
+        credentials = [YandexAuth(**{k: v for k, v in c.items() if k != 'weight'}) for c in self.yc_credentials]
+        weights = [float(c.get('weight', 1)) for c in self.yc_credentials]
+        return CredentialPool(credentials, weights, strategy=self.yc_credentials_strategy)
+
+
 class YException(Exception):
     pass
@@ -0,0 +1,86 @@
+"""Logging of the SDK.
+
+The SDK only creates loggers under the `sdk` logger and never configures the root logger:
+handlers, levels and formats belong to the application. Messages use %-style arguments,
+so they are formatted only if a handler actually emits them, and hot paths guard debug
+messages with `LogSampler`, which checks the level before anything else is done.
+
+Structured logs are opt-in::
+
+    from sdk.log import enable_json_logging
+    enable_json_logging(logging.INFO)
+"""
+import itertools
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import IO, Any, Optional
+
+import orjson
+
+ROOT_LOGGER_NAME = 'sdk'
+
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+"""Attributes of every log record. Other attributes are passed in `extra`"""
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger of an SDK module. Names outside of the SDK hierarchy are put under it"""
+    if name != ROOT_LOGGER_NAME and not name.startswith(ROOT_LOGGER_NAME + '.'):
+        name = f'{ROOT_LOGGER_NAME}.{name}'
+    return logging.getLogger(name)
+
+
+class LogSampler:
+    """Emits every {every}-th debug message of a hot path.
+
+    Nothing is counted or formatted while debug is disabled for the logger, so a disabled
+    sampler costs one level check.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = 100):
+        if every < 1:
+            raise ValueError('every must be positive')
+        self.logger = logger
+        self.every = every
+        self._counter = itertools.count()
+
+    def debug(self, msg: str, *args: Any) -> None:
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        # next() of itertools.count is atomic, so samples are not lost between threads
+        n = next(self._counter)
+        if n % self.every == 0:
+            self.logger.debug(msg + ' [sampled 1/%d, #%d]', *args, self.every, n + 1)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one-line json objects with time, level, logger, message,
+    exception and fields passed in `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        return orjson.dumps(entry, default=repr).decode()
+
+
+def enable_json_logging(level: int = logging.INFO, stream: Optional[IO[str]] = None,
+                        logger_name: str = ROOT_LOGGER_NAME) -> logging.Handler:
+    """Write records of the logger (the SDK by default, '' for all loggers) to the stream as json lines
+    :returns The added handler. Remove it from the logger to disable json logging
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger(logger_name)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
@@ -3,8 +3,7 @@ from sdk.utils.merge import merge_lists, merge_dicts
 
 from typing import Dict, List, Optional, Sequence, Union
 
-from pydantic import Field
-from pydantic_settings import SettingsConfigDict
+from pydantic import ConfigDict, Field
 
 
 class BaseMessage(Serializable):
@@ -30,7 +29,7 @@ class BaseMessage(Serializable):
     id: Optional[str] = None
     """Message's id. Should be provided by provider/model which created this message. Optional field"""
 
-    model_config = SettingsConfigDict(extra='allow')
+    model_config = ConfigDict(extra='allow')
 
     @classmethod
     def is_serializable(cls) -> bool:
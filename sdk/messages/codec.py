@@ -0,0 +1,196 @@
+"""Compact wire format for message histories.
+
+JSON produced by `messages_to_dict` repeats every field name and every empty
+dict for each message. This codec stores histories in blocks instead: the
+message types, roles and contents are kept in parallel (columnar) arrays and
+only non-default fields are written, sparsely, per message.
+
+Layout::
+
+    MAGIC | frame | frame | ...
+    frame := varint(len(block)) | block
+    block := orjson({"t": [...], "c": [...], "r": [...]?, "x": [[index, {...}], ...]?})
+
+Known message types are written as small integers, unknown ones as their
+"type" string. Frames are independent, so histories can be encoded and
+decoded incrementally with `iter_encode_messages` / `iter_decode_messages`.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+
+import orjson
+
+from sdk.messages.base import BaseMessage
+from sdk.messages.utils import MESSAGE_TYPES
+
+MAGIC = b'GSM\x01'
+"""Format marker and version written at the start of every encoded history"""
+
+DEFAULT_BLOCK_SIZE = 256
+"""Amount of messages stored in a single frame"""
+
+_TYPE_CODES: List[str] = [
+    'human',
+    'system',
+    'chat',
+    'HumanChunkMessage',
+    'SystemChunkMessage',
+    'ChatMessageChunk',
+]
+"""Wire codes of the message types. Only append to this list: codes are part of the format"""
+
+_CODE_BY_TYPE: Dict[str, int] = {t: code for code, t in enumerate(_TYPE_CODES)}
+
+
+class MessageCodecError(ValueError):
+    """Raised when encoded data is malformed"""
+
+
+def _write_varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(buffer: Union[bytes, bytearray], pos: int):
+    """Read varint starting at {pos}.
+    :returns (value, position after the varint) or (None, pos) if the buffer is incomplete
+    """
+    result = 0
+    shift = 0
+    while pos < len(buffer):
+        byte = buffer[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+    return None, pos
+
+
+def _encode_block(messages: Sequence[BaseMessage]) -> bytes:
+    types: List[Union[int, str]] = []
+    contents: List[Any] = []
+    roles: List[Any] = []
+    extras: List[List[Any]] = []
+
+    for index, message in enumerate(messages):
+        fields = message.model_dump(exclude_defaults=True)
+        fields.pop('type', None)
+        content = fields.pop('content', message.content)
+        role = fields.pop('role', None)
+
+        types.append(_CODE_BY_TYPE.get(message.type, message.type))
+        contents.append(content)
+        roles.append(role)
+
+        if fields:
+            extras.append([index, fields])
+
+    block: Dict[str, Any] = {'t': types, 'c': contents}
+    if any(r is not None for r in roles):
+        block['r'] = roles
+    if extras:
+        block['x'] = extras
+
+    payload = orjson.dumps(block)
+    return _write_varint(len(payload)) + payload
+
+
+def _decode_block(payload: Union[bytes, bytearray, memoryview]) -> List[BaseMessage]:
+    try:
+        block = orjson.loads(payload)
+        types = block['t']
+        contents = block['c']
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+        raise MessageCodecError(f'Malformed message block: {e}') from e
+
+    roles = block.get('r')
+    extras = dict((index, fields) for index, fields in block.get('x', ()))
+
+    messages = []
+    for index, (code, content) in enumerate(zip(types, contents)):
+        if isinstance(code, int) and not 0 <= code < len(_TYPE_CODES):
+            raise MessageCodecError(f'Got unexpected message type code: {code}')
+        message_type = _TYPE_CODES[code] if isinstance(code, int) else code
+        try:
+            cls = MESSAGE_TYPES[message_type]
+        except KeyError:
+            raise MessageCodecError(f'Got unexpected message type: {message_type}')
+
+        fields = extras.get(index, {})
+        if roles is not None and roles[index] is not None:
+            fields['role'] = roles[index]
+        messages.append(cls(content=content, **fields))
+    return messages
+
+
+def iter_encode_messages(
+        messages: Iterable[BaseMessage],
+        block_size: int = DEFAULT_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """Encode messages incrementally.
+    :param messages: Messages to encode. Can be a lazy iterable
+    :param block_size: Amount of messages per frame
+    :returns Iterator over byte chunks. Their concatenation is equal to `encode_messages(messages)`
+    """
+    yield MAGIC
+    block: List[BaseMessage] = []
+    for message in messages:
+        block.append(message)
+        if len(block) >= block_size:
+            yield _encode_block(block)
+            block = []
+    if block:
+        yield _encode_block(block)
+
+
+def iter_decode_messages(chunks: Iterable[Union[bytes, bytearray]]) -> Iterator[BaseMessage]:
+    """Decode messages incrementally from arbitrary split byte chunks.
+    :param chunks: Byte chunks, e.g. read from a socket or a file
+    :returns Iterator over decoded messages. Messages are yielded as soon as their frame is complete
+    :raise MessageCodecError: If the data is not an encoded history or is truncated
+    """
+    buffer = bytearray()
+    header_checked = False
+
+    for chunk in chunks:
+        buffer += chunk
+        if not header_checked:
+            if len(buffer) < len(MAGIC):
+                continue
+            if buffer[:len(MAGIC)] != MAGIC:
+                raise MessageCodecError('Data is not an encoded message history')
+            del buffer[:len(MAGIC)]
+            header_checked = True
+
+        pos = 0
+        while True:
+            size, start = _read_varint(buffer, pos)
+            if size is None or start + size > len(buffer):
+                break
+            yield from _decode_block(memoryview(buffer)[start:start + size])
+            pos = start + size
+        del buffer[:pos]
+
+    if not header_checked or buffer:
+        raise MessageCodecError('Encoded message history is truncated')
+
+
+def encode_messages(messages: Iterable[BaseMessage], block_size: int = DEFAULT_BLOCK_SIZE) -> bytes:
+    """Encode a sequence of messages to the compact format.
+    :param messages: Messages to encode
+    :param block_size: Amount of messages per frame
+    :returns Encoded history
+    """
+    return b''.join(iter_encode_messages(messages, block_size))
+
+
+def decode_messages(data: Union[bytes, bytearray]) -> List[BaseMessage]:
+    """Decode a history produced by `encode_messages`.
+    :param data: Encoded history
+    :returns List of messages
+    """
+    return list(iter_decode_messages([data]))
@@ -1,7 +1,7 @@
-from typing import Union, Sequence
-from sdk.messages.system import SystemMessage
-from sdk.messages.chat import ChatMessage
-from sdk.messages.human import HumanMessage
+from typing import Dict, List, Type, Union, Sequence
+from sdk.messages.system import SystemMessage, SystemChunkMessage
+from sdk.messages.chat import ChatMessage, ChatChunkMessage
+from sdk.messages.human import HumanMessage, HumanChunkMessage
 from sdk.messages.base import BaseMessage
 
 # TODO: Add Tool, Function and AI Messages
@@ -11,6 +11,40 @@ AnyMessage = Union[
     SystemMessage
 ]
 
+MESSAGE_TYPES: Dict[str, Type[BaseMessage]] = {
+    cls.model_fields['type'].default: cls
+    for cls in (
+        HumanMessage,
+        SystemMessage,
+        ChatMessage,
+        HumanChunkMessage,
+        SystemChunkMessage,
+        ChatChunkMessage,
+    )
+}
+"""Message classes by the value of their "type" field. Used for deserialization"""
+
+
+def message_from_dict(message: dict) -> BaseMessage:
+    """Convert a dictionary produced by `message_to_dict` back to a Message.
+    :param message: dict with "type" and "data" keys
+    :returns Message of the class registered for the type
+    :raise ValueError: If the message type is unknown
+    """
+    try:
+        cls = MESSAGE_TYPES[message['type']]
+    except KeyError:
+        raise ValueError(f'Got unexpected message type: {message["type"]}')
+    return cls(**message['data'])
+
+
+def messages_from_dict(messages: Sequence[dict]) -> List[BaseMessage]:
+    """Convert a sequence of dicts produced by `messages_to_dict` back to Messages.
+    :param messages: Sequence of messages (as dicts) to convert.
+    :returns List of messages (BaseMessages).
+    """
+    return [message_from_dict(m) for m in messages]
+
 
 # TODO: Add Tool, Function and AI Messages support
 def get_buffer_string(messages: Sequence[BaseMessage], human_prefix="Human", ai_prefix="AI") -> str:
@@ -0,0 +1,288 @@
+"""Process-local metrics with Prometheus text exposition.
+
+Counters and histograms are updated without locks: every thread writes to its own shard,
+shards are summed only when metrics are collected. Locks are taken only when a thread
+or a label set is seen for the first time, and when a thread ends: its shard is added to the
+totals of finished threads, so short-lived threads of executors don't accumulate shards.
+"""
+import bisect
+import math
+import threading
+import weakref
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+"""Default histogram buckets in seconds"""
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _ThreadEnd:
+    """Object of a thread-local which is collected when the thread ends"""
+    __slots__ = ('__weakref__',)
+
+
+class _Shards:
+    """Per-thread arrays of floats"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: Dict[int, List[float]] = {}
+        """Arrays of live threads by id of the array"""
+        self._finished = [0.0] * size
+        """Totals of finished threads"""
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        """Array of the current thread"""
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._shards[id(cell)] = cell
+            self._local.cell = cell
+            self._local.end = end = _ThreadEnd()
+            weakref.finalize(end, self._fold, cell).atexit = False
+            return cell
+
+    def _fold(self, cell: List[float]) -> None:
+        """Add the array of a finished thread to the totals of finished threads"""
+        with self._lock:
+            del self._shards[id(cell)]
+            self._finished = [total + value for total, value in zip(self._finished, cell)]
+
+    def __len__(self):
+        return len(self._shards)
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            shards = [self._finished, *self._shards.values()]
+        return [sum(column) for column in zip(*shards)]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    type: str = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional['MetricsRegistry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], '_Metric'] = {}
+        self._lock = threading.Lock()
+        if registry is not False:
+            (registry or REGISTRY).register(self)
+
+    def _new_child(self) -> '_Metric':
+        raise NotImplementedError()
+
+    def labels(self, *values: str, **kwargs: str):
+        """Child metric of the label values"""
+        key = tuple(str(v) for v in values) if values else tuple(str(kwargs[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(suffix, labels, value) of all children"""
+        raise NotImplementedError()
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for suffix, labels, value in self._samples():
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+    def _items(self):
+        if not self.labelnames:
+            return [((), self)]
+        return list(self._children.items())
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._shards = _Shards(1)
+
+    def _new_child(self) -> 'Counter':
+        return Counter(self.name, self.documentation, registry=False)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+    def _samples(self):
+        for values, child in self._items():
+            yield '_total', _format_labels(self.labelnames, values), child.value
+
+
+class Gauge(_Metric):
+    """Value which can go up and down, or a function which computes it on collection"""
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> 'Gauge':
+        return Gauge(self.name, self.documentation, registry=False)
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the value with {function} on every collection"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+    def _samples(self):
+        for values, child in self._items():
+            yield '', _format_labels(self.labelnames, values), child.value
+
+
+class Histogram(_Metric):
+    """Distribution of values in buckets"""
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Bucket counts, then sum and count
+        self._shards = _Shards(len(self.buckets) + 3)
+
+    def _new_child(self) -> 'Histogram':
+        return Histogram(self.name, self.documentation, registry=False, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        cell = self._shards.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @property
+    def count(self) -> float:
+        return self._shards.totals()[-1]
+
+    @property
+    def sum(self) -> float:
+        return self._shards.totals()[-2]
+
+    def _samples(self):
+        for values, child in self._items():
+            totals = child._shards.totals()
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), totals):
+                cumulative += count
+                yield '_bucket', _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"'), cumulative
+            yield '_sum', _format_labels(self.labelnames, values), totals[-2]
+            yield '_count', _format_labels(self.labelnames, values), totals[-1]
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Metrics in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(m.render() for m in metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+"""Default registry of SDK metrics"""
+
+
+def get_or_create(registry: MetricsRegistry, cls, name: str, documentation: str, labelnames: Sequence[str] = ()):
+    """Metric of the registry, created on first use. Objects with the same registry share metrics"""
+    metric = registry.get(name)
+    if metric is None:
+        try:
+            metric = cls(name, documentation, labelnames, registry=registry)
+        except ValueError:
+            # Registered by another thread
+            metric = registry.get(name)
+    return metric
+
+
+def start_metrics_server(port: int, host: str = '0.0.0.0', registry: Optional[MetricsRegistry] = None
+                         ) -> 'ThreadingHTTPServer':
+    """Serve /metrics of the registry in a daemon thread. Use it in processes without a web framework"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-server').start()
+    return server
@@ -0,0 +1,25 @@
+from abc import abstractmethod
+from typing import Any, Optional, TypeVar, Union
+
+from sdk.messages.base import BaseMessage
+from sdk.runnable.base import Runnable
+from sdk.runnable.config import RunnableConfig
+
+T = TypeVar('T')
+
+
+class BaseOutputParser(Runnable[Union[str, BaseMessage], T]):
+    """Base class for parsers of model's output"""
+
+    @abstractmethod
+    def parse(self, text: str) -> T:
+        """Parse model's output
+        :param text: Text generated by a model
+        :returns Parsed output
+        :raise OutputParserException: If the text can't be parsed
+        """
+
+    def invoke(self, input: Union[str, BaseMessage], config: Optional[RunnableConfig] = None, **kwargs: Any) -> T:
+        if isinstance(input, BaseMessage):
+            input = input.content
+        return self.parse(input)
@@ -0,0 +1,222 @@
+import json
+import re
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from sdk.exceptions import OutputParserException
+from sdk.messages.base import BaseMessage
+from sdk.output_parsers.base import BaseOutputParser
+from sdk.runnable.config import RunnableConfig
+
+_CODE_FENCE = re.compile(r'^\s*`{3}(?:json)?|`{3}\s*$', re.IGNORECASE)
+
+_LITERALS: Dict[str, Any] = {'true': True, 'false': False, 'null': None, 'True': True, 'False': False, 'None': None}
+"""Literals of json and their Python spellings which models write sometimes"""
+
+_DELIMITERS = frozenset(',:{}[]')
+
+
+class PartialJsonParser:
+    """Incremental parser of a json value in streamed text.
+
+    Chunks of text are fed as they are generated. `value` holds the completed fields of the top-level
+    object, or the completed items of the top-level array, so downstream steps can start on the first
+    fields before the rest is generated. Text before the value and after it, like code fences, is skipped.
+    Strings may be quoted with single quotes.
+    """
+
+    def __init__(self):
+        self.done = False
+        """The top-level value is complete"""
+        self.failed = False
+        """The text isn't json, further chunks are ignored"""
+
+        self._root: Union[Dict[str, Any], List[Any], None] = None
+        self._stack: List[Tuple[Union[Dict[str, Any], List[Any]], List[Optional[str]]]] = []
+        """Open containers with the pending key of objects"""
+        self._quote: Optional[str] = None
+        """Quote of the open string"""
+        self._string: List[str] = []
+        self._escaped = False
+        self._literal: List[str] = []
+
+    @property
+    def started(self) -> bool:
+        return self._root is not None
+
+    @property
+    def is_object(self) -> bool:
+        """The top-level value is an object"""
+        return isinstance(self._root, dict)
+
+    @property
+    def value(self) -> Any:
+        """Copy of the completed part of the top-level value. None until it starts"""
+        return self._root.copy() if self._root is not None else None
+
+    def feed(self, chunk: str) -> bool:
+        """Parse the next chunk of text
+        :returns True if a field or an item of the top-level value is completed in the chunk
+        :raises OutputParserException: If the text isn't json
+        """
+        if self.done or self.failed:
+            return False
+        try:
+            return self._feed(chunk)
+        except OutputParserException:
+            self.failed = True
+            raise
+
+    def _feed(self, chunk: str) -> bool:
+        completed = False
+        for char in chunk:
+            if self.done:
+                break
+            if self._quote is not None:
+                self._feed_string(char)
+                if self._quote is None:
+                    completed |= self._complete_string()
+            elif self._root is None:
+                if char in '{[':
+                    self._open(char)
+            elif char in '"\'':
+                completed |= self._end_literal()
+                self._quote = char
+            elif char in _DELIMITERS or char.isspace():
+                completed |= self._end_literal()
+                if char in '{[':
+                    self._open(char)
+                elif char in '}]':
+                    container, _ = self._stack.pop()
+                    completed |= self._complete(container)
+            else:
+                self._literal.append(char)
+        return completed
+
+    def _feed_string(self, char: str) -> None:
+        if self._escaped:
+            self._escaped = False
+            # Single quotes don't need escapes in json
+            self._string.append(char if char == "'" else '\\' + char)
+        elif char == '\\':
+            self._escaped = True
+        elif char == self._quote:
+            self._quote = None
+        elif char == '"':
+            self._string.append('\\"')
+        else:
+            self._string.append(char)
+
+    def _complete_string(self) -> bool:
+        raw = ''.join(self._string)
+        self._string.clear()
+        try:
+            text = json.loads(f'"{raw}"', strict=False)
+        except json.JSONDecodeError as e:
+            raise OutputParserException(f'Invalid json string: {e}', llm_output=raw) from e
+        container, key = self._stack[-1]
+        if isinstance(container, dict) and key[0] is None:
+            key[0] = text
+            return False
+        return self._complete(text)
+
+    def _end_literal(self) -> bool:
+        if not self._literal:
+            return False
+        literal = ''.join(self._literal)
+        self._literal.clear()
+        if literal in _LITERALS:
+            return self._complete(_LITERALS[literal])
+        try:
+            return self._complete(json.loads(literal))
+        except json.JSONDecodeError as e:
+            raise OutputParserException(f'Invalid json literal: {literal}', llm_output=literal) from e
+
+    def _open(self, char: str) -> None:
+        container: Union[Dict[str, Any], List[Any]] = {} if char == '{' else []
+        if self._root is None:
+            self._root = container
+        self._stack.append((container, [None]))
+
+    def _complete(self, value: Any) -> bool:
+        """Put the completed value into its container
+        :returns True if it is a field or an item of the top-level value
+        """
+        if not self._stack:
+            self.done = True
+            return False
+        container, key = self._stack[-1]
+        if isinstance(container, dict):
+            if key[0] is None:
+                raise OutputParserException(f'Value without key: {value!r}', llm_output=str(value))
+            container[key[0]] = value
+            key[0] = None
+        else:
+            container.append(value)
+        return len(self._stack) == 1
+
+
+class JsonOutputParser(BaseOutputParser[Any]):
+    """Parse model's output as json.
+    Tolerates quirks of YandexGPT answers: markdown code fences and single quotes instead of double ones.
+
+    Streamed output is parsed incrementally: `transform` yields the object with the fields completed so far
+    every time a field is completed, the last yielded object is the whole output. Each object replaces the
+    previous one when a stream is collected. Top-level arrays are yielded once, when they are complete:
+    collecting concatenates lists, so partial arrays would repeat their items.
+    """
+
+    @staticmethod
+    def clean(text: str) -> str:
+        """Remove code fences and replace single quotes with double ones"""
+        return _CODE_FENCE.sub('', text).replace('`', '').replace("'", '"').strip()
+
+    def parse(self, text: str) -> Any:
+        try:
+            return json.loads(self.clean(text))
+        except json.JSONDecodeError as e:
+            raise OutputParserException(f'Invalid json output: {e}', llm_output=text) from e
+
+    def _parse_chunk(self, parser: PartialJsonParser, chunks: List[str], chunk: Union[str, BaseMessage]) -> bool:
+        """Feed the chunk to the parser
+        :returns True if a field of the top-level object is completed
+        """
+        text = chunk.content if isinstance(chunk, BaseMessage) else chunk
+        chunks.append(text)
+        try:
+            return parser.feed(text) and parser.is_object
+        except OutputParserException:
+            # The whole output gets the usual parse at the end
+            return False
+
+    def _result(self, parser: PartialJsonParser, chunks: List[str]) -> Any:
+        return parser.value if parser.done else self.parse(''.join(chunks))
+
+    def transform(
+            self,
+            input: Iterator[Union[str, BaseMessage]],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> Iterator[Any]:
+        parser, chunks, last = PartialJsonParser(), [], None
+        for chunk in input:
+            if self._parse_chunk(parser, chunks, chunk):
+                last = parser.value
+                yield last
+        result = self._result(parser, chunks)
+        if result != last:
+            yield result
+
+    async def atransform(
+            self,
+            input: AsyncIterator[Union[str, BaseMessage]],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        parser, chunks, last = PartialJsonParser(), [], None
+        async for chunk in input:
+            if self._parse_chunk(parser, chunks, chunk):
+                last = parser.value
+                yield last
+        result = self._result(parser, chunks)
+        if result != last:
+            yield result
@@ -0,0 +1,30 @@
+from typing import Any, AsyncIterator, Iterator, Optional, Union
+
+from sdk.messages.base import BaseMessage
+from sdk.output_parsers.base import BaseOutputParser
+from sdk.runnable.config import RunnableConfig
+
+
+class StrOutputParser(BaseOutputParser[str]):
+    """Return model's output as a string. Streams chunks through as soon as they arrive"""
+
+    def parse(self, text: str) -> str:
+        return text
+
+    def transform(
+            self,
+            input: Iterator[Union[str, BaseMessage]],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> Iterator[str]:
+        for chunk in input:
+            yield self.invoke(chunk, config)
+
+    async def atransform(
+            self,
+            input: AsyncIterator[Union[str, BaseMessage]],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> AsyncIterator[str]:
+        async for chunk in input:
+            yield self.invoke(chunk, config)
@@ -0,0 +1,49 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from sdk.messages.base import BaseMessage
+from sdk.messages.chat import ChatMessage
+from sdk.messages.human import HumanMessage
+from sdk.messages.system import SystemMessage
+from sdk.prompts.prompt_values import ChatPromptValue
+from sdk.runnable.base import Runnable
+from sdk.runnable.config import RunnableConfig
+
+MessageLike = Union[BaseMessage, Tuple[str, str]]
+"""Message or (role, template) pair. Templates are formatted with str.format"""
+
+
+class ChatPromptTemplate(Runnable[Dict[str, Any], ChatPromptValue]):
+    """Prompt template for chat models. Builds a ChatPromptValue from input variables.
+
+    Messages passed as BaseMessage are used as is, so they may contain braces (e.g. json examples).
+    Messages passed as (role, template) pairs are formatted with the input variables.
+
+    For example:
+        ChatPromptTemplate([SystemMessage(content=instructions), ('human', '{user_prompt}')])
+    """
+
+    def __init__(self, messages: Sequence[MessageLike], name: Optional[str] = None):
+        self.messages = list(messages)
+        self.name = name
+
+    @staticmethod
+    def _create_message(role: str, content: str) -> BaseMessage:
+        if role in ('human', 'user'):
+            return HumanMessage(content=content)
+        if role == 'system':
+            return SystemMessage(content=content)
+        return ChatMessage(content=content, role=role)
+
+    def format_messages(self, **kwargs: Any) -> List[BaseMessage]:
+        """Format the template's messages with variables"""
+        result = []
+        for message in self.messages:
+            if isinstance(message, BaseMessage):
+                result.append(message)
+            else:
+                role, template = message
+                result.append(self._create_message(role, template.format(**kwargs)))
+        return result
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> ChatPromptValue:
+        return ChatPromptValue(messages=self.format_messages(**input))
@@ -1,25 +1,51 @@
+import functools
 import logging
-from typing import Any, Callable
-import sys
+from typing import Any, Callable, Optional
 
-from tenacity import (
-    before_sleep_log,
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
-)
+from sdk.callbacks.manager import on_retry
+from sdk.deadline import stop_before_deadline
+from sdk.exceptions import OverloadedError, RejectedRequestError, SdkException
 
-from sdk.exceptions import SdkException
-
-logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+def log_and_report_retry(retry_state) -> None:
+    """Log the failed attempt and report it to callback handlers"""
+    sleep = retry_state.next_action.sleep if retry_state.next_action else 0
+    if logger.isEnabledFor(logging.WARNING):
+        fn = retry_state.fn
+        logger.warning('Retrying %s in %.1f seconds as it raised %r',
+                       getattr(fn, '__qualname__', fn), sleep, retry_state.outcome.exception())
+    on_retry(retry_state.outcome.exception(), sleep)
+
+
 def retry_n_times(max_retries: int) -> Callable[[Any], Any]:
-    """Retry decorator. Calls decorated function until amount of unsuccessful attempts is equal to {max_retries}"""
+    """Retry decorator. Calls decorated function until amount of unsuccessful attempts is equal to {max_retries}.
+    Retries which can't finish before the deadline of the context aren't made, see sdk.deadline.
+    tenacity is imported on the first call of the decorated function, not when the SDK is imported"""
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        retrying: Optional[Callable[..., Any]] = None
+
+        @functools.wraps(func)
+        def wrapped(*args: Any, **kwargs: Any) -> Any:
+            nonlocal retrying
+            if retrying is None:
+                retrying = _retry(max_retries)(func)
+                wrapped.retry = retrying.retry
+            return retrying(*args, **kwargs)
 
-    retry_conditions = retry_if_exception_type(SdkException)
+        return wrapped
+
+    return decorator
+
+
+def _retry(max_retries: int) -> Callable[[Any], Any]:
+    from tenacity import retry, retry_if_exception_type, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+
+    # Requests rejected by the scheduler can't be served in time, invalid requests are invalid on retries too
+    retry_conditions = (retry_if_exception_type(SdkException)
+                        & retry_if_not_exception_type((OverloadedError, RejectedRequestError)))
     min_delay_seconds = 1
     max_delay_seconds = 32
 
@@ -27,9 +53,8 @@ def retry_n_times(max_retries: int) -> Callable[[Any], Any]:
     # {min_delay_seconds} seconds, then up to {max_delay_seconds} seconds, then {max_delay_seconds} seconds afterward
     return retry(
         reraise=True,
-        stop=stop_after_attempt(max_retries),
+        stop=stop_after_attempt(max_retries) | stop_before_deadline,
         wait=wait_exponential(multiplier=2, min=min_delay_seconds, max=max_delay_seconds),
         retry=retry_conditions,
-        before_sleep=before_sleep_log(logger, logging.WARNING),
+        before_sleep=log_and_report_retry,
     )
-
@@ -1,19 +1,66 @@
-from typing import Generic, TypeVar, Optional, Type, get_args
-from pydantic import BaseModel
+import asyncio
+import inspect
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+    get_args,
+    get_origin,
+)
+from pydantic import BaseModel, ConfigDict, RootModel, create_model
+
+from sdk.runnable.config import (
+    RunnableConfig,
+    get_config_list,
+    get_executor_for_config,
+    get_shared_executor,
+    run_in_executor,
+)
 
 
 Input = TypeVar('Input')
 Output = TypeVar('Output')
 
 
-class Runnable(Generic[Input, Output]):
-    name: Optional[str]
+class Runnable(Generic[Input, Output], ABC):
+    """A unit of work that can be invoked, batched and streamed.
+
+    Subclasses must implement `invoke`. All other methods have default implementations
+    derived from it:
+    - `batch` runs `invoke` in a thread pool
+    - `stream` yields the result of `invoke`
+    - `ainvoke` runs `invoke` in the event loop's executor
+    - `abatch` runs `ainvoke` concurrently
+    - `astream` iterates `stream` in the executor or yields the result of `ainvoke`
+    Override them when the Runnable has a native batch, async or streaming implementation.
+
+    Runnables are composed with `|`: `prompt | model | parser` is a RunnableSequence
+    which passes the output of every step to the next one. Dicts of runnables in a sequence
+    are RunnableParallel, functions are RunnableLambda.
+    """
+
+    name: Optional[str] = None
     """"Name of Runnable. Use for dbug and tracing"""
 
     def get_name(self, suffix: Optional[str] = None, name: Optional[str] = None):
 
         """Get the name of the Runnable"""
-        name = name or self.name or self.__class__.name
+        name = name or self.name or self.__class__.__name__
 
         if suffix:
             if name[0].isupper():
@@ -26,35 +73,469 @@ class Runnable(Generic[Input, Output]):
     @property
     def input_type(self) -> Type[Input]:
         """The type of input this Runnable accepts specified as a type annotation"""
-        for cls in self.__class__.__orig_bases__:
-            type_args = get_args(cls)
-            if type_args and len(type_args) == 2:
-               return type_args[0]
-
-        raise TypeError(f'Runnable {self.get_name()} doesn\'t have an inferable InputType.'
-                        'Override the input_type property to specify input type')
+        type_args = _runnable_type_args(self.__class__)
+        if type_args is None:
+            raise TypeError(f'Runnable {self.get_name()} doesn\'t have an inferable InputType.'
+                            'Override the input_type property to specify input type')
+        return type_args[0]
 
     @property
     def output_type(self) -> Type[Output]:
         """The type of output this Runnable accepts specified as a type annotation"""
-        for cls in self.__class__.__orig_bases__:
-            type_args = get_args(cls)
-            if type_args and len(type_args) == 2:
-                return type_args[1]
-
-        raise TypeError(f'Runnable {self.get_name()} doesn\'t have an inferable OutputType.'
-                        'Override the input_type property to specify input type')
+        type_args = _runnable_type_args(self.__class__)
+        if type_args is None:
+            raise TypeError(f'Runnable {self.get_name()} doesn\'t have an inferable OutputType.'
+                            'Override the output_type property to specify output type')
+        return type_args[1]
 
     @property
     def input_schema(self) -> Type[BaseModel]:
         """The type of input this Runnable accepts specified as a pydantic model."""
         return self.get_input_schema()
 
-    def get_input_schema(self, config: Optional = None) -> Type[BaseModel]:
-        ...
+    def get_input_schema(self, config: Optional[RunnableConfig] = None) -> Type[BaseModel]:
+        """Get a pydantic model that can be used to validate input to the Runnable.
+        Models are cached: Runnables with the same name and input type share the model"""
+        return _create_root_schema(self.get_name('Input'), self.input_type)
 
     @property
     def output_schema(self) -> Type[BaseModel]:
         """The type of output this Runnable accepts specified as a pydantic model."""
         return self.get_output_schema()
 
+    def get_output_schema(self, config: Optional[RunnableConfig] = None) -> Type[BaseModel]:
+        """Get a pydantic model that can be used to validate output of the Runnable.
+        Models are cached: Runnables with the same name and output type share the model"""
+        return _create_root_schema(self.get_name('Output'), self.output_type)
+
+    def __or__(self, other: 'RunnableLike') -> 'RunnableSequence':
+        """Compose this Runnable with another one: the output of this Runnable is the input of the other"""
+        return RunnableSequence(self, coerce_to_runnable(other))
+
+    def __ror__(self, other: 'RunnableLike') -> 'RunnableSequence':
+        """Compose this Runnable with another one: the output of the other Runnable is the input of this one"""
+        return RunnableSequence(coerce_to_runnable(other), self)
+
+    @abstractmethod
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        """Transform a single input into an output
+        :param input: The input of the Runnable
+        :param config: Config of the call
+        :returns The output of the Runnable
+        """
+
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        """Async version of invoke. By default, runs invoke in the executor of the running loop"""
+        return await run_in_executor(self.invoke, input, config, **kwargs)
+
+    def batch(
+            self,
+            inputs: Sequence[Input],
+            config: Optional[RunnableConfig] = None,
+            *,
+            return_exceptions: bool = False,
+            **kwargs: Any
+    ) -> List[Union[Output, Exception]]:
+        """Transform many inputs in parallel threads.
+        :param inputs: Inputs of the Runnable
+        :param config: Config of the calls. Use max_concurrency to limit the amount of threads
+        :param return_exceptions: Return exceptions of failed calls instead of raising the first one
+        :returns Outputs in the order of the inputs
+        """
+        if not inputs:
+            return []
+
+        configs = get_config_list(config, len(inputs))
+
+        def invoke(input_: Input, config_: RunnableConfig) -> Union[Output, Exception]:
+            if return_exceptions:
+                try:
+                    return self.invoke(input_, config_, **kwargs)
+                except Exception as e:
+                    return e
+            return self.invoke(input_, config_, **kwargs)
+
+        if len(inputs) == 1:
+            return [invoke(inputs[0], configs[0])]
+
+        with get_executor_for_config(config) as executor:
+            return list(executor.map(invoke, inputs, configs))
+
+    async def abatch(
+            self,
+            inputs: Sequence[Input],
+            config: Optional[RunnableConfig] = None,
+            *,
+            return_exceptions: bool = False,
+            **kwargs: Any
+    ) -> List[Union[Output, Exception]]:
+        """Async version of batch. Runs ainvoke concurrently, no more than max_concurrency at the same time"""
+        if not inputs:
+            return []
+
+        configs = get_config_list(config, len(inputs))
+        max_concurrency = (config or {}).get('max_concurrency')
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def ainvoke(input_: Input, config_: RunnableConfig) -> Output:
+            if semaphore is None:
+                return await self.ainvoke(input_, config_, **kwargs)
+            async with semaphore:
+                return await self.ainvoke(input_, config_, **kwargs)
+
+        return await asyncio.gather(
+            *(ainvoke(i, c) for i, c in zip(inputs, configs)),
+            return_exceptions=return_exceptions
+        )
+
+    def stream(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Output]:
+        """Transform a single input into a stream of output chunks. By default, yields the output of invoke"""
+        yield self.invoke(input, config, **kwargs)
+
+    async def astream(
+            self,
+            input: Input,
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> AsyncIterator[Output]:
+        """Async version of stream. By default, iterates stream in the executor if the Runnable
+        implements streaming, otherwise yields the output of ainvoke"""
+        if type(self).stream is Runnable.stream:
+            yield await self.ainvoke(input, config, **kwargs)
+            return
+
+        iterator = self.stream(input, config, **kwargs)
+        done = object()
+        while True:
+            chunk = await run_in_executor(next, iterator, done)
+            if chunk is done:
+                break
+            yield chunk
+
+    def transform(
+            self,
+            input: Iterator[Input],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> Iterator[Output]:
+        """Transform a stream of input chunks into a stream of output chunks.
+        By default, collects all input chunks and streams the result for the whole input.
+        Override it in Runnables which can process input incrementally
+        """
+        yield from self.stream(_collect_chunks(input), config, **kwargs)
+
+    async def atransform(
+            self,
+            input: AsyncIterator[Input],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> AsyncIterator[Output]:
+        """Async version of transform"""
+        chunks = [chunk async for chunk in input]
+        async for output in self.astream(_collect_chunks(iter(chunks)), config, **kwargs):
+            yield output
+
+
+def _substitute_type_vars(tp: Any, mapping: Dict[Any, Any]) -> Any:
+    """Replace type variables in {tp} with their values from {mapping}"""
+    if isinstance(tp, TypeVar):
+        return mapping.get(tp, tp)
+    parameters = getattr(tp, '__parameters__', ())
+    if parameters and get_origin(tp) is not None:
+        return tp[tuple(mapping.get(p, p) for p in parameters)]
+    return tp
+
+
+@lru_cache(maxsize=None)
+def _resolve_type_args(cls: type) -> Optional[Tuple[Any, Any]]:
+    """Resolve (Input, Output) type arguments of a Runnable subclass.
+    Walks generic bases of the class and its parents, substituting type variables of generic
+    subclasses, e.g. for `class P(BaseOutputParser[dict])` Output of BaseOutputParser[T] is dict.
+
+    :returns (input type, output type) or None if the class has no generic Runnable base
+    """
+    # Only the class' own __orig_bases__: attribute lookup would return parent's ones
+    for base in cls.__dict__.get('__orig_bases__', ()):
+        origin = get_origin(base)
+        if not (isinstance(origin, type) and issubclass(origin, Runnable)):
+            continue
+
+        args = get_args(base)
+        if origin is Runnable:
+            return cast(Tuple[Any, Any], args)
+
+        parent_args = _resolve_type_args(origin)
+        if parent_args is not None:
+            mapping = dict(zip(origin.__parameters__, args))
+            return cast(Tuple[Any, Any], tuple(_substitute_type_vars(t, mapping) for t in parent_args))
+
+    for base in cls.__bases__:
+        if base is not Runnable and isinstance(base, type) and issubclass(base, Runnable):
+            type_args = _resolve_type_args(base)
+            if type_args is not None:
+                return type_args
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def _runnable_type_args(cls: type) -> Optional[Tuple[Any, Any]]:
+    """(Input, Output) types of a Runnable subclass, computed once per class.
+    Unresolved type variables are Any"""
+    type_args = _resolve_type_args(cls)
+    if type_args is None:
+        return None
+    return cast(Tuple[Any, Any], tuple(Any if isinstance(t, TypeVar) else t for t in type_args))
+
+
+class _RootSchema(RootModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    root: Any
+
+
+@lru_cache(maxsize=None)
+def _create_root_schema(name: str, tp: Any) -> Type[BaseModel]:
+    """Create a pydantic model which validates values of type {tp}"""
+    return create_model(name, __base__=_RootSchema, root=(tp, ...))
+
+
+def _collect_chunks(chunks: Iterator[Any]) -> Any:
+    """Concatenate stream chunks into a whole value. Chunks which don't support `+` replace the previous ones"""
+    final = None
+    has_value = False
+    for chunk in chunks:
+        if not has_value:
+            final = chunk
+            has_value = True
+            continue
+        try:
+            final = final + chunk
+        except TypeError:
+            final = chunk
+    return final
+
+
+class RunnableSequence(Runnable[Input, Output]):
+    """Sequence of Runnables, where the output of each is the input of the next.
+
+    Streaming is passed through the steps: each step transforms the stream of the previous one,
+    so a step which processes input incrementally (e.g. an output parser) starts before the previous
+    step (e.g. a model) has finished.
+    """
+
+    def __init__(self, *steps: Runnable, name: Optional[str] = None):
+        flat: List[Runnable] = []
+        for step in steps:
+            # Flatten nested sequences: (a | b) | c is a single sequence of three steps
+            if isinstance(step, RunnableSequence):
+                flat.extend(step.steps)
+            else:
+                flat.append(step)
+
+        if len(flat) < 2:
+            raise ValueError(f'RunnableSequence must have at least 2 steps, got {len(flat)}')
+
+        self.steps = flat
+        self.name = name
+
+    @property
+    def first(self) -> Runnable:
+        return self.steps[0]
+
+    @property
+    def last(self) -> Runnable:
+        return self.steps[-1]
+
+    @property
+    def input_type(self) -> Type[Input]:
+        return self.first.input_type
+
+    @property
+    def output_type(self) -> Type[Output]:
+        return self.last.output_type
+
+    def get_input_schema(self, config: Optional[RunnableConfig] = None) -> Type[BaseModel]:
+        return self.first.get_input_schema(config)
+
+    def get_output_schema(self, config: Optional[RunnableConfig] = None) -> Type[BaseModel]:
+        return self.last.get_output_schema(config)
+
+    def __or__(self, other: 'RunnableLike') -> 'RunnableSequence':
+        return RunnableSequence(*self.steps, coerce_to_runnable(other), name=self.name)
+
+    def __ror__(self, other: 'RunnableLike') -> 'RunnableSequence':
+        return RunnableSequence(coerce_to_runnable(other), *self.steps, name=self.name)
+
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        for step in self.steps:
+            input = step.invoke(input, config)
+        return cast(Output, input)
+
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        for step in self.steps:
+            input = await step.ainvoke(input, config)
+        return cast(Output, input)
+
+    def batch(
+            self,
+            inputs: Sequence[Input],
+            config: Optional[RunnableConfig] = None,
+            *,
+            return_exceptions: bool = False,
+            **kwargs: Any
+    ) -> List[Union[Output, Exception]]:
+        if return_exceptions:
+            # Failed inputs must not stop the others, so every input runs the whole sequence on its own
+            return super().batch(inputs, config, return_exceptions=True, **kwargs)
+
+        # Run the batch step by step to use native batching of the steps
+        for step in self.steps:
+            inputs = step.batch(inputs, config)
+        return list(inputs)
+
+    async def abatch(
+            self,
+            inputs: Sequence[Input],
+            config: Optional[RunnableConfig] = None,
+            *,
+            return_exceptions: bool = False,
+            **kwargs: Any
+    ) -> List[Union[Output, Exception]]:
+        if return_exceptions:
+            return await super().abatch(inputs, config, return_exceptions=True, **kwargs)
+
+        for step in self.steps:
+            inputs = await step.abatch(inputs, config)
+        return list(inputs)
+
+    def stream(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Output]:
+        yield from self.transform(iter([input]), config, **kwargs)
+
+    def transform(
+            self,
+            input: Iterator[Input],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> Iterator[Output]:
+        stream = input
+        for step in self.steps:
+            stream = step.transform(stream, config)
+        yield from stream
+
+    async def astream(
+            self,
+            input: Input,
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> AsyncIterator[Output]:
+        async def input_stream() -> AsyncIterator[Input]:
+            yield input
+
+        async for chunk in self.atransform(input_stream(), config, **kwargs):
+            yield chunk
+
+    async def atransform(
+            self,
+            input: AsyncIterator[Input],
+            config: Optional[RunnableConfig] = None,
+            **kwargs: Any
+    ) -> AsyncIterator[Output]:
+        stream = input
+        for step in self.steps:
+            stream = step.atransform(stream, config)
+        async for chunk in stream:
+            yield chunk
+
+
+class RunnableParallel(Runnable[Input, Dict[str, Any]]):
+    """Runs a mapping of Runnables with the same input concurrently.
+    Returns a dict with the outputs of the Runnables under their keys.
+
+    For example:
+        RunnableParallel({'answer': prompt | model, 'question': lambda x: x['user_prompt']})
+    """
+
+    def __init__(self, steps: Mapping[str, 'RunnableLike'], name: Optional[str] = None):
+        self.steps: Dict[str, Runnable] = {k: coerce_to_runnable(v) for k, v in steps.items()}
+        self.name = name
+        self._output_schema: Optional[Type[BaseModel]] = None
+
+    @property
+    def output_type(self) -> Type[Dict[str, Any]]:
+        return Dict[str, Any]
+
+    def get_output_schema(self, config: Optional[RunnableConfig] = None) -> Type[BaseModel]:
+        # Steps are fixed after creation, so the schema is built once per instance
+        if self._output_schema is None:
+            self._output_schema = create_model(
+                self.get_name('Output'),
+                **{k: (step.output_type, ...) for k, step in self.steps.items()}
+            )
+        return self._output_schema
+
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Dict[str, Any]:
+        if len(self.steps) == 1:
+            return {k: step.invoke(input, config) for k, step in self.steps.items()}
+
+        if (config or {}).get('max_concurrency') is not None:
+            with get_executor_for_config(config) as executor:
+                futures = {k: executor.submit(step.invoke, input, config) for k, step in self.steps.items()}
+                return {k: future.result() for k, future in futures.items()}
+
+        # The first branch runs in the calling thread, the others in the shared pool
+        (first_key, first), *others = self.steps.items()
+        executor = get_shared_executor()
+        futures = [(k, step, executor.submit(step.invoke, input, config)) for k, step in others]
+        try:
+            results = {first_key: first.invoke(input, config)}
+            for k, step, future in futures:
+                # Branches which haven't started run here. Nested parallel steps can't exhaust the pool by waiting
+                # for branches queued behind them
+                results[k] = step.invoke(input, config) if future.cancel() else future.result()
+        except BaseException:
+            for _, _, future in futures:
+                future.cancel()
+            raise
+        return {k: results[k] for k in self.steps}
+
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Dict[str, Any]:
+        results = await asyncio.gather(*(step.ainvoke(input, config) for step in self.steps.values()))
+        return dict(zip(self.steps.keys(), results))
+
+
+class RunnableLambda(Runnable[Input, Output]):
+    """Runnable which calls a function. Coroutine functions are awaited in ainvoke and run in a new event loop in invoke"""
+
+    def __init__(self, func: Callable[[Input], Union[Output, Awaitable[Output]]], name: Optional[str] = None):
+        self.func = func
+        self.is_coroutine = inspect.iscoroutinefunction(func)
+        self.name = name or getattr(func, '__name__', None)
+
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        if self.is_coroutine:
+            return asyncio.run(self.func(input))
+        return self.func(input)
+
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Output:
+        if self.is_coroutine:
+            return await self.func(input)
+        return await super().ainvoke(input, config, **kwargs)
+
+
+RunnableLike = Union[Runnable, Callable[[Any], Any], Mapping[str, Any]]
+"""Objects which can be composed with Runnables"""
+
+
+def coerce_to_runnable(thing: RunnableLike) -> Runnable:
+    """Convert a Runnable-like object to Runnable
+    :param thing: Runnable, function or dict of Runnable-like objects
+    :returns Runnable
+    :raise TypeError: If the object can't be converted
+    """
+    if isinstance(thing, Runnable):
+        return thing
+    if isinstance(thing, Mapping):
+        return RunnableParallel(thing)
+    if callable(thing):
+        return RunnableLambda(thing)
+    raise TypeError(f'Expected a Runnable, callable or dict, got {type(thing).__name__}')
@@ -0,0 +1,76 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, TypedDict, TypeVar
+
+T = TypeVar('T')
+
+
+class RunnableConfig(TypedDict, total=False):
+    """Configuration of a Runnable call"""
+
+    run_name: str
+    """Name of the run. Use for debug and tracing"""
+
+    tags: List[str]
+    """Tags of the call and all its sub-calls"""
+
+    metadata: Dict[str, Any]
+    """Metadata of the call and all its sub-calls"""
+
+    max_concurrency: Optional[int]
+    """Maximum amount of parallel calls. Default is the executor's default"""
+
+
+def ensure_config(config: Optional[RunnableConfig] = None) -> RunnableConfig:
+    """Return a copy of config with all keys filled"""
+    ensured = RunnableConfig(tags=[], metadata={}, max_concurrency=None)
+    if config is not None:
+        ensured.update(config)
+    return ensured
+
+
+def get_config_list(config: Optional[RunnableConfig], length: int) -> List[RunnableConfig]:
+    """Get a config for every input of a batch
+    :param config: Common config of the batch
+    :param length: Amount of inputs
+    """
+    return [ensure_config(config) for _ in range(length)]
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """Thread pool which runs functions with context variables of the submitting thread,
+    e.g. the current traced call, priority and deadline of requests"""
+
+    def submit(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> 'Future[T]':
+        return super().submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def get_executor_for_config(config: Optional[RunnableConfig]) -> ThreadPoolExecutor:
+    """Create a thread pool limited by config's max_concurrency"""
+    config = config or {}
+    return ContextThreadPoolExecutor(max_workers=config.get('max_concurrency'))
+
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by calls without max_concurrency. Its threads are started once and reused,
+    so a call doesn't pay for starting and joining threads"""
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                _shared_executor = ContextThreadPoolExecutor(thread_name_prefix='sdk-runnable')
+    return _shared_executor
+
+
+async def run_in_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a sync function in the default executor of the running loop.
+    Context variables of the caller are visible inside the function"""
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, partial(ctx.run, func, *args, **kwargs))
@@ -0,0 +1,224 @@
+"""Cache of answers to near-duplicate prompts.
+
+Users phrase the same command differently: "Отмени сессию у Перовой 14.07 12:00" and
+"отмена Перова 14.07 в 12:00" must get the same answer, which an exact-match cache misses.
+`SemanticCache` embeds prompts with `HashingVectorizer`, a local vectorizer of leading
+character n-grams of words, and returns the answer of the most similar cached prompt if the cosine
+similarity is at least {threshold}.
+
+Commands which differ only in a date, a time or a ticket number are very similar as texts,
+but need different answers. So prompts match only if their key facts are equal, by default
+all numbers of the prompt. Names are alike as texts too: "Иванова Алексея" and "Иванова Александра"
+share all leading n-grams, so caches of commands add the resolved name to the key facts, see
+`api.fast_path.CommandExtractor.key_facts`.
+
+Precision and recall of the cache are measured on a labeled replay set with `evaluate`.
+"""
+import re
+import threading
+import time
+import zlib
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r'[^\W\d_]+')
+_NUMBER = re.compile(r'\d+')
+
+STOP_WORDS = frozenset((
+    'а', 'в', 'во', 'для', 'до', 'и', 'к', 'ко', 'на', 'о', 'от', 'по', 'с', 'со', 'у', 'за', 'из',
+    'пожалуйста', 'please', 'сессия', 'сессию', 'сессии', 'встреча', 'встречу', 'заявка', 'заявке',
+    'клиент', 'клиента', 'клиентка', 'клиентку',
+))
+"""Words which don't tell commands apart"""
+
+NEGATIONS = frozenset(('не', 'not'))
+"""Particles which negate the next word: "не отменяй" is the opposite of "отмени", not its paraphrase"""
+
+
+def numbers(text: str) -> Tuple[str, ...]:
+    """Numbers of the text without leading zeros, in order of appearance"""
+    return tuple(n.lstrip('0') or '0' for n in _NUMBER.findall(text))
+
+
+class HashingVectorizer:
+    """Vectors of leading character n-grams of words, hashed into {n_features} dimensions.
+
+    Leading n-grams work as stems: inflected forms "Перовой" and "Перова", "отмени" and
+    "отмена" share most of their features. A word after a negation has its own features,
+    which no word without it shares. Numbers are left to key facts of SemanticCache.
+    Stateless: vectors of a text are equal in all processes.
+    """
+
+    def __init__(self,
+                 n_features: int = 1 << 12,
+                 prefix_lengths: Tuple[int, ...] = (3, 4, 5),
+                 stop_words: FrozenSet[str] = STOP_WORDS,
+                 negations: FrozenSet[str] = NEGATIONS):
+        """
+        :param n_features: Dimension of vectors. Short commands have a few dozen features, so collisions are rare
+        :param prefix_lengths: Lengths of leading n-grams. Shorter words are a feature as a whole
+        """
+        self.n_features = n_features
+        self.prefix_lengths = prefix_lengths
+        self.stop_words = stop_words
+        self.negations = negations
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return text.lower().replace('ё', 'е')
+
+    def features(self, text: str) -> Dict[int, float]:
+        """Weights of hashed features of the text"""
+        counts: Dict[int, float] = {}
+        negated = False
+        for word in _WORD.findall(self.normalize(text)):
+            if word in self.negations:
+                negated = True
+                continue
+            if word in self.stop_words:
+                continue
+            grams = [word[:n] for n in self.prefix_lengths if len(word) >= n] or [word]
+            if negated:
+                grams = ['!' + gram for gram in grams]
+                negated = False
+            for gram in grams:
+                h = zlib.crc32(gram.encode())
+                # The sign bit halves the bias of collisions
+                index, sign = h % self.n_features, 1.0 if h & 0x80000000 else -1.0
+                counts[index] = counts.get(index, 0.0) + sign
+        return counts
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """L2-normalized float32 matrix with a row per text"""
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self.features(text)
+            if features:
+                matrix[row, list(features)] = list(features.values())
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class SemanticCache:
+    """In-memory index of prompt vectors with cosine search.
+
+    Vectors are rows of a preallocated matrix of {maxsize} rows, so a lookup is one matrix-vector
+    product. The matrix takes maxsize * n_features * 4 bytes, 16 MB by default. Above {maxsize}
+    entries the least recently used entry is evicted. The cache lives in the process, unlike
+    SQLiteCache it isn't shared by workers.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.8,
+                 maxsize: int = 1024,
+                 ttl: Optional[float] = None,
+                 vectorizer: Optional[HashingVectorizer] = None,
+                 key_facts: Optional[Callable[[str], Hashable]] = numbers):
+        """
+        :param threshold: Least cosine similarity of a prompt to a cached one to return its answer
+        :param maxsize: Amount of cached prompts
+        :param ttl: Seconds after which entries expire. Entries don't expire if it is None
+        :param key_facts: Facts of a prompt which must be equal for a match. Every prompt may match if it is None
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.key_facts = key_facts
+        self.hits = 0
+        self.misses = 0
+
+        self._matrix = np.zeros((maxsize, self.vectorizer.n_features), dtype=np.float32)
+        self._groups = np.full(maxsize, -1, dtype=np.int64)
+        """Group of every row: hash of its namespace and key facts. -1 marks free rows, it is never a hash"""
+        self._expires_at = np.full(maxsize, np.inf)
+        self._used_at = np.zeros(maxsize, dtype=np.int64)
+        self._values: List[Optional[str]] = [None] * maxsize
+        self._clock = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _group(self, prompt: str, namespace: str) -> int:
+        return hash((namespace, self.key_facts(prompt) if self.key_facts is not None else None))
+
+    def search(self, prompt: str, namespace: str = '') -> Tuple[Optional[str], float]:
+        """The value of the most similar prompt and its similarity. The value is None if nothing is cached"""
+        vector = self.vectorizer.transform([prompt])[0]
+        with self._lock:
+            group = self._group(prompt, namespace)
+            candidates = np.flatnonzero((self._groups == group) & (self._expires_at > time.monotonic()))
+            if not len(candidates):
+                return None, 0.0
+            scores = self._matrix[candidates] @ vector
+            best = int(np.argmax(scores))
+            row = int(candidates[best])
+            self._clock += 1
+            self._used_at[row] = self._clock
+            return self._values[row], float(scores[best])
+
+    def lookup(self, prompt: str, namespace: str = '') -> Optional[str]:
+        """Value of the most similar prompt if its similarity is at least the threshold
+        :param namespace: Prompts match only prompts of the same namespace, e.g. with the same system prompt
+        """
+        value, score = self.search(prompt, namespace)
+        if value is not None and score >= self.threshold:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    def update(self, prompt: str, value: str, namespace: str = '') -> None:
+        vector = self.vectorizer.transform([prompt])[0]
+        with self._lock:
+            group = self._group(prompt, namespace)
+            free = np.flatnonzero((self._groups == -1) | (self._expires_at <= time.monotonic()))
+            if len(free):
+                row = int(free[0])
+                self._size += int(self._groups[row] == -1)
+            else:
+                row = int(np.argmin(self._used_at))
+            self._matrix[row] = vector
+            self._groups[row] = group
+            self._expires_at[row] = time.monotonic() + self.ttl if self.ttl is not None else np.inf
+            self._clock += 1
+            self._used_at[row] = self._clock
+            self._values[row] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups[:] = -1
+            self._values = [None] * self.maxsize
+            self._size = 0
+
+
+def evaluate(cache: SemanticCache, replay: Iterable[Tuple[str, str]]) -> Dict[str, float]:
+    """Replay labeled prompts through the cache. Prompts with equal labels need equal answers.
+
+    Every prompt is looked up, and cached with its label on a miss. A hit with the prompt's label
+    is a true positive, a hit with another label is a false positive, a miss while a prompt with
+    the label is cached is a false negative.
+    :returns precision, recall and hit rate
+    """
+    true_positives = false_positives = false_negatives = total = 0
+    cached_labels = set()
+    for prompt, label in replay:
+        total += 1
+        value = cache.lookup(prompt)
+        if value is None:
+            false_negatives += label in cached_labels
+            cache.update(prompt, label)
+            cached_labels.add(label)
+        elif value == label:
+            true_positives += 1
+        else:
+            false_positives += 1
+    hits = true_positives + false_positives
+    return {
+        'precision': true_positives / hits if hits else 1.0,
+        'recall': true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 1.0,
+        'hit_rate': hits / total if total else 0.0,
+    }
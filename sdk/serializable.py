@@ -8,8 +8,7 @@ from typing import (
     cast,
 )
 
-from pydantic import BaseModel, model_serializer
-from pydantic_settings import SettingsConfigDict
+from pydantic import BaseModel, ConfigDict, model_serializer
 
 
 class BaseSerialized(BaseModel):
@@ -78,7 +77,7 @@ class Serializable(BaseModel, ABC):
     as part of the serialized representation.
     """
 
-    model_config = SettingsConfigDict(extra='ignore')
+    model_config = ConfigDict(extra='ignore')
 
     @classmethod
     def is_serializable(cls) -> bool:
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from sdk.deadline import remaining
+from sdk.exceptions import DeadlineExceeded
+
+T = TypeVar('T')
+
+
+class _Call(Generic[T]):
+    """In-flight call shared by all callers with the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+def _wait_timeout() -> Optional[float]:
+    """Seconds a caller may wait for the in-flight call: until its deadline, without a limit if it has none"""
+    left = remaining()
+    return max(left, 0.0) if left is not None else None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key between threads.
+
+    The first caller of a key executes the function, callers which arrive while it is running
+    wait for it and get the same result (or the same exception). Results are not cached:
+    a call after the first one has finished executes the function again.
+
+    Callers wait until their own deadline of sdk.deadline. The deadline of the first caller isn't theirs:
+    if its call raises DeadlineExceeded, a waiter calls the function again and the others wait for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call func(*args, **kwargs) or wait for the in-flight call with the same key
+        :param key: Key of the call. Calls with equal keys must have equal results
+        :returns Result of the function
+        :raises DeadlineExceeded: If the deadline of the caller passes while it waits
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                break
+
+            if not call.done.wait(_wait_timeout()):
+                raise DeadlineExceeded('Deadline passed while waiting for the in-flight call')
+            if isinstance(call.error, DeadlineExceeded):
+                # The deadline of the leader passed, not necessarily the one of this caller
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Amount of keys which are being executed now"""
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Deduplicates concurrent coroutine calls with the same key in an event loop.
+    Same as SingleFlight, but waiters await the leader's result instead of blocking a thread.
+    If the leader is cancelled or its deadline passes, one of the waiters calls the function again and the others
+    wait for it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Await func(*args, **kwargs) or the in-flight call with the same key
+        :param key: Key of the call. Calls with equal keys must have equal results
+        :returns Result of the coroutine
+        :raises DeadlineExceeded: If the deadline of the caller passes while it waits
+        """
+        loop = asyncio.get_running_loop()
+        # Futures belong to a loop, so calls are shared only within the loop
+        loop_key = (id(loop), key)
+
+        future = self._calls.get(loop_key)
+        while future is not None:
+            try:
+                # shield: a cancelled waiter must not cancel the leader's call for the others
+                return await asyncio.wait_for(asyncio.shield(future), _wait_timeout())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded('Deadline passed while waiting for the in-flight call') from None
+            except DeadlineExceeded:
+                # The deadline of the leader passed, not necessarily the one of this caller
+                pass
+            except asyncio.CancelledError:
+                # Only the leader was cancelled, e.g. its client disconnected: a waiter takes over the call
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            future = self._calls.get(loop_key)
+
+        future = self._calls[loop_key] = loop.create_future()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception as retrieved if nobody waits for it
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[loop_key]
+
+    def in_flight(self) -> int:
+        """Amount of keys which are being executed now"""
+        return len(self._calls)
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+import tenacity
+
+from api.baserow import BaserowError, BaserowReader, BaserowWriteBuffer, Link, row_type
+from api.settings import BaserowSettings
+from benchmarks.mock_server import Latency, MockServer
+
+SLOTS = 373
+
+
+@pytest.fixture
+def mock():
+    with MockServer() as mock:
+        yield mock
+
+
+def buffer(mock, **kwargs) -> BaserowWriteBuffer:
+    return BaserowWriteBuffer(BaserowSettings(baserow_url=mock.url, baserow_token='test'), **kwargs)
+
+
+def reader(mock, **kwargs) -> BaserowReader:
+    return BaserowReader(BaserowSettings(baserow_url=mock.url, baserow_token='test'), **kwargs)
+
+
+def test_burst_of_updates_is_sent_in_batches(mock):
+    with buffer(mock, max_delay=1) as writes:
+        futures = [writes.update(SLOTS, row_id, {'Статус': 'Свободен'}, idempotency_key=f'cancel:{row_id}')
+                   for row_id in range(1, 451)]
+    assert [f.result()['id'] for f in futures] == list(range(1, 451))
+    assert all(f.result()['Статус'] == 'Свободен' for f in futures)
+    assert mock.stats['baserow_batch'] == 3
+    assert mock.stats['baserow_batch_rows'] == 450
+
+
+def test_results_are_mapped_to_writes(mock):
+    with buffer(mock) as writes:
+        created = [writes.create(SLOTS, {'Время': f'{hour}:00', 'Статус': 'Свободен'}) for hour in (10, 11, 12)]
+        first = writes.update(SLOTS, 1, {'Статус': 'Занят'})
+        second = writes.update(SLOTS, 1, {'Время': '18:00'})
+        writes.flush()
+        assert len(writes) == 0
+    assert [f.result()['Время'] for f in created] == ['10:00', '11:00', '12:00']
+    assert [f.result()['id'] for f in created] == [501, 502, 503]
+    # Updates of a row are merged into one item
+    assert first.result() == second.result()
+    assert first.result()['Статус'] == 'Занят' and first.result()['Время'] == '18:00'
+    assert mock.stats['baserow_batch_rows'] == 4
+
+
+def test_writes_are_sent_after_the_delay(mock):
+    writes = buffer(mock, max_delay=0.05)
+    started = time.monotonic()
+    assert writes.update(SLOTS, 2, {'Статус': 'Занят'}).result(timeout=2)['Статус'] == 'Занят'
+    assert time.monotonic() - started < 1
+    writes.close()
+    with pytest.raises(RuntimeError):
+        writes.update(SLOTS, 2, {})
+
+
+def test_writes_with_equal_idempotency_keys_are_made_once(mock):
+    with buffer(mock) as writes:
+        first = writes.create(SLOTS, {'Время': '10:00'}, idempotency_key='ticket:17')
+        assert writes.create(SLOTS, {'Время': '10:00'}, idempotency_key='ticket:17') is first
+        writes.flush()
+        assert writes.create(SLOTS, {'Время': '10:00'}, idempotency_key='ticket:17') is first
+        writes.flush()
+    assert mock.stats['baserow_batch_rows'] == 1
+
+
+def test_failed_batch_fails_its_writes_and_forgets_their_keys(mock):
+    with buffer(mock) as writes:
+        missing = writes.update(SLOTS, 10_000, {'Статус': 'Занят'}, idempotency_key='cancel:10000')
+        with pytest.raises(BaserowError) as error:
+            missing.result(timeout=2)
+        assert error.value.status_code == 404 and error.value.error == 'ERROR_ROW_DOES_NOT_EXIST'
+        assert writes.update(SLOTS, 3, {'Статус': 'Занят'}, idempotency_key='cancel:10000') is not missing
+
+
+def test_unavailable_baserow_is_retried(mock, monkeypatch):
+    mock.baserow_error_rate = 1.0
+    monkeypatch.setattr(tenacity.nap, 'time', SimpleNamespace(sleep=lambda seconds: setattr(mock, 'baserow_error_rate', 0)))
+    with buffer(mock) as writes:
+        assert writes.update(SLOTS, 4, {'Статус': 'Занят'}).result(timeout=2)['id'] == 4
+    assert mock.stats['baserow_errors'] == 1
+    assert mock.stats['baserow_batch'] == 1
+
+
+FREE = {'filter_type': 'AND', 'filters': [{'type': 'contains', 'field': 'Статус', 'value': 'Свободен'}]}
+
+
+def test_reader_reads_all_pages_with_filters(mock):
+    rows = list(reader(mock, page_size=50).rows(SLOTS, filters=FREE))
+    assert len(rows) == sum(row['Статус'] == 'Свободен' for row in mock.tables[SLOTS])
+    assert all(row.Статус == 'Свободен' for row in rows)
+    assert [row.id for row in rows] == sorted(row.id for row in rows)
+    assert mock.stats['baserow'] == -(-len(rows) // 50)
+
+
+def test_rows_are_slotted_and_hold_included_fields(mock):
+    row = next(reader(mock).rows(SLOTS, include=['Психолог', 'Дата']))
+    assert row['Психолог'] == (Link(1, 'Перова Алёна'),)
+    assert row.as_dict().keys() == {'id', 'Психолог', 'Дата'}
+    assert row.get('Статус') is None
+    assert not hasattr(row, '__dict__')
+    with pytest.raises(AttributeError):
+        row.note = 'x'
+
+
+def test_row_type_makes_identifiers_of_field_names():
+    Slot = row_type(['Дата сессии', 'id', '1 час', 'class', 'as_dict'])
+    row = Slot.from_json({'id': 7, 'Дата сессии': '14/07', '1 час': True, 'class': 'B', 'as_dict': 0})
+    assert row.Дата_сессии == '14/07'
+    assert row['1 час'] is True and row['class'] == 'B' and row['as_dict'] == 0
+    assert Slot.field_names == ('Дата сессии', '1 час', 'class', 'as_dict')
+
+
+def test_next_page_is_prefetched(mock):
+    mock.baserow_latency = Latency('fixed:0.1')
+    for prefetch in (False, True):
+        started = time.monotonic()
+        for _ in reader(mock, page_size=100, prefetch=prefetch).pages(SLOTS):
+            time.sleep(0.1)
+        elapsed = time.monotonic() - started
+        if not prefetch:
+            sequential = elapsed
+    # 5 pages take 5 requests and 5 sleeps one after another, or overlapped
+    assert elapsed < sequential - 0.25
+
+
+def test_async_reader_reads_all_pages(mock):
+    async def read():
+        return [row async for row in reader(mock, page_size=100).arows(SLOTS, include=['Статус'], filters=FREE)]
+
+    rows = asyncio.run(read())
+    assert [row.as_dict() for row in rows] == [
+        {'id': row.id, 'Статус': row.Статус} for row in reader(mock, page_size=100).rows(SLOTS, filters=FREE)]
+
+
+def test_reader_retries_unavailable_baserow(mock, monkeypatch):
+    mock.baserow_error_rate = 1.0
+    monkeypatch.setattr(tenacity.nap, 'time', SimpleNamespace(sleep=lambda seconds: setattr(mock, 'baserow_error_rate', 0)))
+    assert len(list(reader(mock).rows(SLOTS))) == len(mock.tables[SLOTS])
+    with pytest.raises(BaserowError):
+        list(reader(mock).rows(999))
@@ -0,0 +1,87 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from api.settings import BaserowSettings
+from api.slots import SlotIndex
+from benchmarks.mock_server import MockServer
+from sdk.cache import InMemoryCache, SQLiteCache
+from sdk.llm.yandex.chat_model import YandexChatGPT
+
+
+def test_in_memory_cache_evicts_least_recently_used():
+    cache = InMemoryCache(maxsize=2)
+    cache.update('a', '1')
+    cache.update('b', '2')
+    assert cache.lookup('a') == '1'
+    cache.update('c', '3')
+    assert cache.lookup('b') is None
+    assert cache.lookup('a') == '1' and cache.lookup('c') == '3'
+
+
+def test_sqlite_cache_expiry_and_namespaces(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    completions = SQLiteCache(path, 'completions', ttl=0.05)
+    slots = SQLiteCache(path, 'slots')
+    completions.update('key', 'completion')
+    slots.update('key', 'slots')
+    assert completions.lookup('key') == 'completion'
+    assert slots.lookup('key') == 'slots'
+
+    time.sleep(0.1)
+    assert completions.lookup('key') is None
+    completions.cleanup()
+    assert len(completions) == 0 and len(slots) == 1
+
+
+def test_sqlite_cache_trims_oldest_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_entries=3, cleanup_interval=5)
+    for i in range(5):
+        cache.update(str(i), str(i))
+    assert len(cache) == 3
+    assert cache.lookup('0') is None and cache.lookup('4') == '4'
+
+
+def test_sqlite_cache_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SQLiteCache(path)
+    code = f'from sdk.cache import SQLiteCache; SQLiteCache({path!r}).update("key", "from another process")'
+    subprocess.run([sys.executable, '-c', code], check=True)
+    assert cache.lookup('key') == 'from another process'
+    cache.close()
+
+
+@pytest.fixture
+def mock():
+    with MockServer(answer='ответ') as server:
+        yield server
+
+
+def test_model_completions_are_cached(mock, tmp_path):
+    model = YandexChatGPT()
+    model.base_url = mock.completion_url
+    model.cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+
+    assert model.invoke('Привет') == 'ответ'
+    assert model.invoke('Привет') == 'ответ'
+    assert model.complete('Привет').output_tokens > 0
+    assert mock.stats['completion'] == 1
+
+    model.temperature = 0
+    model.invoke('Привет')
+    assert mock.stats['completion'] == 2
+
+
+def test_slot_index_caches_free_slots():
+    rows = [
+        {'id': i, 'Психолог': [{'id': i, 'value': name}], 'Дата': '14/07/2024', 'Время': '12:00', 'Статус': status}
+        for i, (name, status) in enumerate([('Перова Алёна', 'Свободен'), ('Иванов Пётр', 'Занят')])
+    ]
+    with MockServer(tables={373: rows}) as mock:
+        index = SlotIndex(BaserowSettings(baserow_url=mock.url, baserow_token='test'), cache=InMemoryCache(ttl=30))
+        assert index.free_psychologists('14/07/2024', '12:00') == ['Перова Алёна']
+        assert index.free_psychologists('14/07/2024', '12:00') == ['Перова Алёна']
+        assert index.free_psychologists('14/07/2024', '13:00') == []
+    assert mock.stats['baserow'] == 2
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+from api.baserow import BaserowReader
+from api.settings import BaserowSettings
+from benchmarks.mock_server import MockServer
+from sdk.cassette import Cassette, request_key
+from sdk.exceptions import CassetteError
+from sdk.llm.yandex.chat_model import YandexChatGPT
+
+SLOTS = 373
+
+
+def test_request_key_ignores_host_order_and_folder():
+    body = b'{"modelUri": "gpt://folder-a/yandexgpt-lite/latest", "messages": [], "stream": false}'
+    reordered = b'{"stream": false, "messages": [], "modelUri": "gpt://folder-b/yandexgpt-lite/latest"}'
+    assert (request_key('POST', 'http://127.0.0.1:8900/completion?b=2&a=1', body)
+            == request_key('post', 'https://llm.api.cloud.yandex.net/completion?a=1&b=2', reordered))
+    assert request_key('POST', '/completion', body) != request_key('POST', '/completion', body.replace(b'[]', b'[1]'))
+
+
+def test_recorded_completions_are_replayed_without_the_network(tmp_path):
+    path = tmp_path / 'dragon.jsonl.gz'
+    model = YandexChatGPT()
+    with MockServer(answer='Зову!') as mock:
+        model.base_url = mock.completion_url
+        with Cassette(path, mode='record').use():
+            assert model.invoke('Эй!') == 'Зову!'
+            chunks = list(model.stream('Эй!'))
+        calls = mock.stats['completion'] + mock.stats['stream']
+
+    # The mock is stopped, answers come from the cassette
+    with Cassette(path, latency='recorded').use() as cassette:
+        assert model.invoke('Эй!') == 'Зову!'
+        assert list(model.stream('Эй!')) == chunks and ''.join(chunks) == 'Зову!'
+
+        async def astream():
+            return [chunk async for chunk in model.astream('Эй!')]
+
+        assert asyncio.run(astream()) == chunks
+        assert cassette.replayed == 3 and calls == 2
+        with pytest.raises(CassetteError):
+            model.invoke('Кто здесь?')
+
+
+def test_auto_mode_records_only_new_requests(tmp_path):
+    path = tmp_path / 'baserow.jsonl'
+    with MockServer() as mock:
+        reader = BaserowReader(BaserowSettings(baserow_url=mock.url, baserow_token='test'), page_size=200, prefetch=False)
+        with Cassette(path, mode='auto').use() as cassette:
+            rows = [row.as_dict() for row in reader.rows(SLOTS)]
+        assert cassette.recorded == 3 and mock.stats['baserow'] == 3
+
+        with Cassette(path, mode='auto').use() as cassette:
+            assert [row.as_dict() for row in reader.rows(SLOTS)] == rows
+            assert list(reader.rows(SLOTS, include=['Дата']))
+        assert cassette.replayed == 3 and cassette.recorded == 3 and mock.stats['baserow'] == 6
+
+
+def test_replayed_responses_take_the_given_latency(tmp_path):
+    path = tmp_path / 'slow.jsonl'
+    model = YandexChatGPT()
+    with MockServer(answer='Ок') as mock:
+        model.base_url = mock.completion_url
+        with Cassette(path, mode='record').use():
+            model.invoke('Привет')
+
+    with Cassette(path, latency=0.2).use():
+        started = time.monotonic()
+        model.invoke('Привет')
+        assert time.monotonic() - started >= 0.2
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from sdk.messages.base import messages_to_dict
+from sdk.messages.chat import ChatMessage, ChatChunkMessage
+from sdk.messages.codec import (
+    MessageCodecError,
+    decode_messages,
+    encode_messages,
+    iter_decode_messages,
+    iter_encode_messages,
+)
+from sdk.messages.human import HumanMessage, HumanChunkMessage
+from sdk.messages.system import SystemMessage
+from sdk.messages.utils import messages_from_dict
+
+
+def make_history():
+    return [
+        SystemMessage(content='Ты помощник злого дракона'),
+        HumanMessage(content='Эй! Вызови главного по фейерверкам!'),
+        ChatMessage(content='Уже бегу', role='assistant', id='42'),
+        HumanMessage(content=[{'type': 'text', 'text': 'hi'}], example=True, name='user'),
+        HumanChunkMessage(content='chunk', response_metadata={'tokens': 3}),
+        ChatChunkMessage(content='chat chunk', role='tool', additional_kwargs={'call': {'id': 1}}),
+        HumanMessage(content='extra', custom_field=[1, 2]),
+        HumanMessage(content='empty extra', custom={}),
+    ]
+
+
+def test_round_trip_matches_json_form():
+    history = make_history()
+    decoded = decode_messages(encode_messages(history))
+    assert messages_to_dict(decoded) == messages_to_dict(history)
+    assert messages_to_dict(messages_from_dict(messages_to_dict(history))) == messages_to_dict(history)
+
+
+def test_empty_dict_fields_survive_round_trip():
+    [message] = decode_messages(encode_messages([HumanMessage(content='empty extra', custom={})]))
+    assert message.custom == {}
+    assert messages_to_dict([message]) == messages_to_dict([HumanMessage(content='empty extra', custom={})])
+
+
+def test_encoding_is_smaller_than_json():
+    history = [HumanMessage(content=f'сообщение {i}') for i in range(1000)]
+    encoded = encode_messages(history)
+    as_json = json.dumps(messages_to_dict(history), ensure_ascii=False).encode()
+    assert len(encoded) * 3 < len(as_json)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_streaming_decode_with_arbitrary_chunks(chunk_size):
+    history = make_history() * 10
+    data = b''.join(iter_encode_messages(history, block_size=3))
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    assert messages_to_dict(list(iter_decode_messages(chunks))) == messages_to_dict(history)
+
+
+def test_empty_history():
+    assert decode_messages(encode_messages([])) == []
+
+
+def test_malformed_data():
+    with pytest.raises(MessageCodecError):
+        decode_messages(b'not a history')
+    with pytest.raises(MessageCodecError):
+        decode_messages(encode_messages(make_history())[:-1])
+    with pytest.raises(MessageCodecError):
+        decode_messages(encode_messages([HumanMessage(content='hi')]).replace(b'[0]', b'[9]'))
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import tenacity
+
+from benchmarks.mock_server import MockServer
+from sdk.exceptions import ProviderError
+from sdk.llm.yandex import model as ym
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.llm.yandex.credentials import CredentialPool
+from sdk.llm.yandex.settings import YandexAuth
+from sdk.metrics import MetricsRegistry
+
+
+def auth(folder: str) -> YandexAuth:
+    return YandexAuth(yc_api_key_id=f'id-{folder}', yc_api_key=f'key-{folder}', yc_folder_id=folder)
+
+
+def pool(*folders, **kwargs) -> CredentialPool:
+    return CredentialPool([auth(f) for f in folders], registry=MetricsRegistry(), **kwargs)
+
+
+def take(pool: CredentialPool) -> str:
+    with pool.acquire() as credential:
+        return credential.yc_folder_id
+
+
+def test_weighted_round_robin_follows_weights():
+    p = pool('a', 'b', 'c', weights=[2, 1, 1], strategy='round_robin')
+    picks = [take(p) for _ in range(8)]
+    assert Counter(picks) == {'a': 4, 'b': 2, 'c': 2}
+    # Smooth: every window of the total weight follows the weights
+    assert Counter(picks[:4]) == {'a': 2, 'b': 1, 'c': 1}
+
+
+def test_least_loaded_prefers_idle_credentials():
+    p = pool('a', 'b')
+    with p.acquire() as busy:
+        assert {take(p) for _ in range(4)} == {'a', 'b'} - {busy.yc_folder_id}
+    assert {take(p) for _ in range(4)} == {'a', 'b'}
+
+
+def test_rate_limited_and_rejected_credentials_are_ejected():
+    p = pool('a', 'b', 'c', rate_limit_ejection=0.05, strategy='round_robin')
+    for status, folder in [(429, 'a'), (401, 'b')]:
+        with pytest.raises(ProviderError):
+            with p.acquire() as credential:
+                assert credential.yc_folder_id == folder
+                raise ProviderError('rejected', status_code=status)
+    assert [a.yc_folder_id for a in p.available()] == ['c']
+    assert {take(p) for _ in range(3)} == {'c'}
+    assert p._ejections.labels('b', 'auth').value == 1
+
+    time.sleep(0.06)
+    assert [a.yc_folder_id for a in p.available()] == ['a', 'c']
+
+
+def test_all_ejected_uses_the_credential_which_returns_first():
+    p = pool('a', 'b', rate_limit_ejection=10)
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            with p.acquire():
+                raise ProviderError('rejected', status_code=429, retry_after=5 if _ else 20)
+    assert p.available() == []
+    assert take(p) == 'b'
+
+
+def test_model_spreads_requests_over_folders(monkeypatch):
+    monkeypatch.setattr(tenacity.nap, 'time', SimpleNamespace(sleep=lambda seconds: time.sleep(0.02)))
+    model = YandexChatGPT()
+    model.credentials = pool('a', 'b', 'c', 'bad', rate_limit_ejection=0.05)
+
+    with MockServer(latency='fixed:0.02', capacity=2, invalid_keys=['key-bad']) as mock:
+        model.base_url = mock.completion_url
+        with ThreadPoolExecutor(6) as executor:
+            answers = list(executor.map(lambda i: model.invoke(f'Запрос {i}'), range(60)))
+    assert len(answers) == 60
+    assert set(mock.folders) == {'a', 'b', 'c'}
+    assert min(mock.folders.values()) >= 10
+    assert mock.stats['unauthorized'] == 1
+
+
+def test_operations_are_polled_with_credentials_of_their_folder():
+    model = YandexChatGPT()
+    model.credentials = pool('a', 'b')
+    with MockServer(answer='ok') as mock:
+        model.async_url = mock.async_completion_url
+        model.operations_url = mock.operations_url
+        operations = [model.submit('Запрос') for _ in range(2)]
+        assert {o.folder_id for o in operations} == {'a', 'b'}
+        poller = model.poller(min_interval=0.01)
+        for operation in operations:
+            poller.add(operation)
+        assert [o.result().text for o in asyncio.run(poller.wait())] == ['ok', 'ok']
+
+
+def test_pool_is_read_from_env(monkeypatch):
+    credentials = [{'yc_api_key_id': 'id', 'yc_api_key': 'k1', 'yc_folder_id': 'f1', 'weight': 3},
+                   {'yc_api_key_id': 'id', 'yc_api_key': 'k2', 'yc_folder_id': 'f2'}]
+    monkeypatch.setenv('YC_CREDENTIALS', json.dumps(credentials))
+    ym.default_credentials.cache_clear()
+    try:
+        model = YandexChatGPT()
+        assert model.auth.yc_folder_id == 'f1'
+        assert model._model_uri == 'gpt://f1/yandexgpt-lite/latest'
+        assert [a.yc_folder_id for a in model._pool().available()] == ['f1', 'f2']
+        model.auth = auth('own')
+        assert model._pool() is None
+    finally:
+        ym.default_credentials.cache_clear()
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from api.baserow import BaserowReader
+from api.settings import BaserowSettings
+from benchmarks.mock_server import MockServer
+from sdk.deadline import deadline, remaining, request_timeout
+from sdk.exceptions import DeadlineExceeded, OverloadedError, ProviderError
+from sdk.llm.scheduler import RequestScheduler
+from sdk.llm.yandex.chat_model import YandexChatGPT
+
+SLOTS = 373
+
+
+def test_nested_deadlines_only_shorten_the_outer_one():
+    assert remaining() is None and request_timeout(60, 10) == (10, 60)
+    with deadline(5) as outer:
+        with deadline(60) as inner:
+            assert inner == outer
+        with deadline(0.5):
+            connect, read = request_timeout(60, 10)
+            assert 0.4 < connect == read <= 0.5
+        assert 4 < remaining() <= 5
+    with deadline(0), pytest.raises(DeadlineExceeded):
+        request_timeout(60)
+
+
+def test_slow_completion_is_cut_by_the_deadline():
+    model = YandexChatGPT()
+    with MockServer(latency='fixed:1') as mock:
+        model.base_url = mock.completion_url
+        started = time.monotonic()
+        with deadline(0.3), pytest.raises(DeadlineExceeded):
+            model.invoke('Медленный ответ')
+        assert time.monotonic() - started < 0.8
+        assert mock.stats['completion'] == 1
+
+
+def test_retries_which_cannot_finish_in_time_are_skipped():
+    model = YandexChatGPT()
+    with MockServer(error_rate=1.0) as mock:
+        model.base_url = mock.completion_url
+        started = time.monotonic()
+        # The first retry would sleep at least a second
+        with deadline(0.8), pytest.raises(ProviderError):
+            model.invoke('Ошибка')
+        assert time.monotonic() - started < 0.5
+        assert mock.stats['errors'] == 1
+
+
+def test_async_stream_is_cut_by_the_deadline():
+    model = YandexChatGPT()
+
+    async def collect():
+        with deadline(0.3):
+            return [chunk async for chunk in model.astream('Медленный поток')]
+
+    with MockServer(latency='fixed:2', stream_chunks=2) as mock:
+        model.base_url = mock.completion_url
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(collect())
+
+
+def test_baserow_pages_are_cut_by_the_deadline():
+    with MockServer(baserow_latency='fixed:1') as mock:
+        reader = BaserowReader(BaserowSettings(baserow_url=mock.url, baserow_token='test'), prefetch=False)
+        with deadline(0.3), pytest.raises(DeadlineExceeded):
+            list(reader.rows(SLOTS))
+
+        async def read():
+            with deadline(0.3):
+                return [row async for row in reader.arows(SLOTS)]
+
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(read())
+
+
+def test_scheduler_rejects_requests_which_cannot_start_before_the_deadline():
+    scheduler = RequestScheduler(max_concurrency=1, reserved_interactive=0)
+    with scheduler.slot():
+        started = time.monotonic()
+        with deadline(0.1), pytest.raises(OverloadedError):
+            with scheduler.slot():
+                pass
+        assert time.monotonic() - started < 0.5
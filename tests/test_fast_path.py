@@ -0,0 +1,58 @@
+import pytest
+
+from api.fast_path import CommandExtractor
+from api.prompts import load_prompt, with_year
+
+KNOWN = {'Давиташвили': 'Давиташвили', 'Джапаридзе Николоз': 'Джапаридзе Николоз'}
+"""Canonical names of the psychologists directory"""
+
+extractor = CommandExtractor(year=2024, resolve_specialist=KNOWN.get)
+
+
+def test_cancel_with_ticket():
+    extraction = extractor.extract('Отмени сессию Давиташвили 14.07 в 12:00. Заявка #17')
+    assert extraction.confidence == 1.0
+    assert extraction.result == {
+        'action': 'cancel', 'specialist': 'Давиташвили', 'ticket_id': 17, 'date': '2024-07-14', 'time': '12:00'
+    }
+
+
+def test_change_with_one_date():
+    extraction = extractor.extract('перенеси встречу Джапаридзе Николоз 19.04 с 16:00 на 9:30')
+    assert extraction.confidence == 1.0
+    assert extraction.result == {
+        'action': 'change',
+        'specialist': 'Джапаридзе Николоз',
+        'params': {'from': {'date': '2024-04-19', 'time': '16:00'}, 'to': {'date': '2024-04-19', 'time': '09:30'}},
+    }
+
+
+def test_inflected_names_have_low_confidence():
+    extraction = extractor.extract('Запиши на сессию к Михаилу Ермишкину в 15.10 в 17:00. Заявка #119')
+    assert extraction.result['specialist'] == 'Михаилу Ермишкину'
+    assert extraction.result['ticket_id'] == 119
+    assert extraction.confidence < 0.9
+
+
+@pytest.mark.parametrize('resolve', [KNOWN.get, None])
+def test_unresolved_names_have_low_confidence(resolve):
+    # Without a preposition the case of the name isn't known either
+    extraction = CommandExtractor(year=2024, resolve_specialist=resolve).extract('Отмени сессию Перовой 14.07 12:00')
+    assert extraction.result['specialist'] == 'Перовой'
+    assert extraction.confidence < 0.9
+
+
+def test_prompts_tell_the_model_the_year_of_the_fast_path():
+    for name in ('prompt_with_date', 'prompt_with_baserow_id'):
+        assert 'Текущий год: 2031' in with_year(load_prompt(name), 2031)
+
+
+@pytest.mark.parametrize('text', [
+    'Отмени сессию у Перовой в пятницу 12:00',
+    'Отмени и перенеси сессию Перова 14.07 12:00',
+    'Перенеси сессию Перова 14.07 12:00',
+    'Отмени сессию Перова 31.02 12:00',
+    'Привет! Как дела?',
+])
+def test_unparsable_commands_fall_through(text):
+    assert extractor.extract(text).confidence == 0.0
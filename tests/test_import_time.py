@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+LAZY_MODULES = ('requests', 'tenacity', 'pydantic_settings', 'http.server', 'sdk.llm.yandex.settings', 'numpy', 'httpx')
+"""Loaded on first use, not when the SDK is imported"""
+
+IMPORT_BUDGET_SECONDS = 1.0
+"""Generous budget of the cumulative import time. The import takes about 0.3 s"""
+
+
+def import_times(statement: str):
+    """Cumulative import time in seconds of every module imported by the statement"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_sdk_import_is_lazy_and_within_budget():
+    times = import_times('import sdk.llm.yandex.chat_model, sdk.llm.yandex.router, sdk.output_parsers.json')
+    assert not [m for m in LAZY_MODULES if m in times]
+    assert times['sdk.llm.yandex.chat_model'] < IMPORT_BUDGET_SECONDS
+
+
+def test_model_creation_does_not_read_settings():
+    code = (
+        'import sys\n'
+        'from sdk.llm.yandex.chat_model import YandexChatGPT\n'
+        'YandexChatGPT().batch([])\n'
+        'assert "pydantic_settings" not in sys.modules\n'
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_prompts_are_loaded_on_demand():
+    from api import prompts
+
+    prompts.load_prompt.cache_clear()
+    assert prompts.load_prompt.cache_info().currsize == 0
+    assert 'ticket_id' in prompts.prompt_with_baserow_id
+    assert prompts.load_prompt.cache_info().currsize == 1
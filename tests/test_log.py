@@ -0,0 +1,65 @@
+import io
+import json
+import logging
+import subprocess
+import sys
+
+from sdk.log import JsonFormatter, LogSampler, enable_json_logging, get_logger
+
+
+def test_sdk_import_does_not_configure_root_logger():
+    code = 'import logging, sdk.retry, sdk.llm.yandex.chat_model; print(len(logging.root.handlers), logging.root.level)'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ['0', str(logging.WARNING)]
+
+
+def test_get_logger_puts_names_under_sdk():
+    assert get_logger('sdk.retry').name == 'sdk.retry'
+    assert get_logger('cache').name == 'sdk.cache'
+
+
+def test_sampler_emits_every_nth_message_only_when_enabled():
+    logger = logging.getLogger('sdk.tests.sampler')
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    try:
+        sampler = LogSampler(logger, every=10)
+        for i in range(25):
+            sampler.debug('call %d', i)
+        assert records == []
+
+        logger.setLevel(logging.DEBUG)
+        for i in range(25):
+            sampler.debug('call %d', i)
+        assert [r.args[0] for r in records] == [0, 10, 20]
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+
+
+def test_json_logging_writes_extra_fields():
+    stream = io.StringIO()
+    handler = enable_json_logging(logging.INFO, stream=stream, logger_name='sdk.tests.json')
+    logger = logging.getLogger('sdk.tests.json')
+    try:
+        logger.debug('hidden')
+        logger.info('done %s', 'ok', extra={'model': 'yandexgpt-lite'})
+    finally:
+        logger.removeHandler(handler)
+
+    [line] = stream.getvalue().splitlines()
+    entry = json.loads(line)
+    assert entry['message'] == 'done ok'
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'sdk.tests.json'
+    assert entry['model'] == 'yandexgpt-lite'
+
+
+def test_json_formatter_includes_exception():
+    try:
+        raise ValueError('bad')
+    except ValueError:
+        record = logging.getLogger('sdk').makeRecord('sdk', logging.ERROR, '', 0, 'failed', (), sys.exc_info())
+    assert 'ValueError: bad' in json.loads(JsonFormatter().format(record))['exception']
@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from sdk.cassette import Cassette
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.messages.human import HumanMessage
+from sdk.messages.system import SystemMessage
+
+CASSETTE = Path(__file__).parent / 'cassettes' / 'dragon.jsonl'
+"""Recorded against benchmarks.mock_server, re-record with Cassette(CASSETTE, mode='record')"""
+
+
+def test_system_and_human_messages_are_answered():
+    model = YandexChatGPT()
+    messages = [
+        SystemMessage(content="Ты помощник злого дракона"),
+        HumanMessage(content="Эй! Вызови главного по фейерверкам!")
+    ]
+    with Cassette(CASSETTE).use() as cassette:
+        assert model.invoke(messages) == 'Главный по фейерверкам уже летит, о Великий!'
+    assert cassette.replayed == 1
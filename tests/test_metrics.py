@@ -0,0 +1,117 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sdk.callbacks.base import BaseCallbackHandler
+from sdk.callbacks.manager import add_handler, remove_handler, trace_call
+from sdk.callbacks.metrics import MetricsCallbackHandler
+from sdk.exceptions import SdkException
+from sdk.metrics import Counter, Gauge, Histogram, MetricsRegistry
+from sdk.retry import retry_n_times
+
+
+class RecordingHandler(BaseCallbackHandler):
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, call):
+        self.events.append(('start', call.name))
+
+    def on_end(self, call):
+        self.events.append(('end', call.name, call.retries, call.output_tokens))
+
+    def on_error(self, call):
+        self.events.append(('error', call.name, type(call.error).__name__))
+
+    def on_retry(self, call, error, sleep):
+        self.events.append(('retry', call.name))
+
+
+@pytest.fixture
+def handler():
+    handler = RecordingHandler()
+    add_handler(handler)
+    yield handler
+    remove_handler(handler)
+
+
+def test_counters_are_summed_over_threads():
+    registry = MetricsRegistry()
+    counter = Counter('requests', 'Requests', ['status'], registry=registry)
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: counter.labels('ok').inc(), range(1000)))
+    assert counter.labels('ok').value == 1000
+    assert 'requests_total{status="ok"} 1000' in registry.render()
+
+
+def test_shards_of_finished_threads_are_folded():
+    counter = Counter('calls', 'Calls', registry=MetricsRegistry())
+    histogram = Histogram('latency', 'Latency', registry=MetricsRegistry())
+    for _ in range(500):
+        thread = threading.Thread(target=lambda: (counter.inc(), histogram.observe(0.2)))
+        thread.start()
+        thread.join()
+    counter.inc()
+    assert counter.value == 501 and histogram.count == 500
+    # Only the shard of the current thread is left
+    assert len(counter._shards) == 1 and len(histogram._shards) == 0
+
+
+def test_histogram_and_gauge_render():
+    registry = MetricsRegistry()
+    histogram = Histogram('latency_seconds', 'Latency', registry=registry, buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    gauge = Gauge('queue_depth', 'Depth', registry=registry)
+    gauge.set_function(lambda: 3)
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_count 3' in text
+    assert 'queue_depth 3' in text
+
+
+def test_trace_call_reports_retries_and_errors(handler, monkeypatch):
+    attempts = []
+
+    @retry_n_times(3)
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise SdkException()
+        return 'ok'
+
+    # Don't sleep between attempts. tenacity sleeps with time.sleep
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    with trace_call('llm', 'model') as call:
+        flaky()
+        call.output_tokens = 7
+
+    with pytest.raises(ValueError):
+        with trace_call('baserow', 'table'):
+            raise ValueError()
+
+    assert handler.events == [
+        ('start', 'model'), ('retry', 'model'), ('end', 'model', 1, 7),
+        ('start', 'table'), ('error', 'table', 'ValueError'),
+    ]
+
+
+def test_metrics_handler():
+    registry = MetricsRegistry()
+    metrics = MetricsCallbackHandler(registry)
+    add_handler(metrics)
+    try:
+        with trace_call('llm', 'model') as call:
+            call.input_tokens = 10
+    finally:
+        remove_handler(metrics)
+
+    text = registry.render()
+    assert 'sdk_calls_total{kind="llm",name="model",status="ok"} 1' in text
+    assert 'sdk_tokens_total{kind="llm",name="model",direction="input"} 10' in text
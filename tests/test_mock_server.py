@@ -0,0 +1,68 @@
+import json
+
+import pytest
+import requests
+
+from benchmarks.common import percentile, summarize
+from benchmarks.mock_server import Latency, MockServer
+from sdk.llm.yandex.chat_model import YandexChatGPT
+
+
+@pytest.fixture
+def model():
+    return YandexChatGPT()
+
+
+def test_completion_shape(model):
+    with MockServer(answer='{"action": "new"}') as mock:
+        model.base_url = mock.completion_url
+        completion = model.complete('Запиши к Перовой')
+    assert completion.text == '{"action": "new"}'
+    assert completion.input_tokens > 0 and completion.output_tokens > 0
+
+
+def test_streaming_mode(model):
+    with MockServer(answer='abcdefgh', stream_chunks=4) as mock:
+        model.base_url = mock.completion_url
+        chunks = list(model.stream('Привет'))
+    assert chunks == ['ab', 'cd', 'ef', 'gh']
+    assert mock.stats['stream'] == 1
+
+
+def test_rate_limit_injection():
+    with MockServer(rate_limit_rate=1.0) as mock:
+        response = requests.post(mock.completion_url, json={'messages': []})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert response.json()['error']['httpCode'] == 429
+    assert mock.stats['rate_limited'] == 1
+
+
+def test_baserow_rows_pagination_and_filters():
+    rows = [{'id': i, 'Статус': 'Свободен' if i % 2 else 'Занят'} for i in range(1, 8)]
+    with MockServer(tables={1: rows}) as mock:
+        url = f'{mock.url}/api/database/rows/table/1/?size=3'
+        seen = []
+        while url:
+            page = requests.get(url).json()
+            seen.extend(row['id'] for row in page['results'])
+            url = page['next']
+        filters = json.dumps({'filters': [{'type': 'contains', 'field': 'Статус', 'value': 'Свободен'}]})
+        free = requests.get(f'{mock.url}/api/database/rows/table/1/', params={'filters': filters}).json()
+    assert seen == list(range(1, 8))
+    assert [row['id'] for row in free['results']] == [1, 3, 5, 7]
+
+
+def test_latency_specs():
+    assert Latency('fixed:0.5').sample() == 0.5
+    assert all(0.1 <= Latency('uniform:0.1:0.2', seed=1).sample() <= 0.2 for _ in range(100))
+    with pytest.raises(ValueError):
+        Latency('pareto:1')
+
+
+def test_summary_percentiles():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    summary = summarize([0.001 * i for i in range(1, 101)], elapsed=2.0)
+    assert summary['count'] == 100
+    assert summary['throughput_rps'] == 50
+    assert summary['p99_ms'] == pytest.approx(99.01)
@@ -0,0 +1,65 @@
+import pytest
+
+from api.fast_path import CommandExtractor
+from api.names import NameIndex, PsychologistDirectory, stem
+from api.settings import BaserowSettings
+
+index = NameIndex([
+    (1, 'Перова Алёна'),
+    (2, 'Ермишкин Михаил'),
+    (3, 'Антонов Павел'),
+    (4, 'Давиташвили Нино'),
+    (5, 'Перов Иван'),
+])
+
+
+@pytest.mark.parametrize('word', ['Перова', 'Перовой', 'перову', 'ПЕРОВОЙ'])
+def test_stem_is_the_same_in_all_cases(word):
+    assert stem(word) == 'перов'
+
+
+@pytest.mark.parametrize('query, record_id', [
+    ('Алёны Перовой', 1),
+    ('Михаилу Ермишкину', 2),
+    ('ермишкиным михаилом', 2),
+    ('Антонова Павла', 3),
+    ('Давиташвили', 4),
+    ('Ивана Перова', 5),
+])
+def test_lookup(query, record_id):
+    assert index.lookup(query).record_id == record_id
+
+
+@pytest.mark.parametrize('query', ['Перовой', 'Сидоров', ''])
+def test_ambiguous_or_unknown_names(query):
+    assert index.lookup(query) is None
+
+
+def test_resolved_names_make_fast_path_confident():
+    def resolve(name):
+        match = index.lookup(name)
+        return match.name if match else None
+
+    extraction = CommandExtractor(year=2024, resolve_specialist=resolve).extract(
+        'Запиши на сессию к Михаилу Ермишкину в 15.10 в 17:00. Заявка #119'
+    )
+    assert extraction.confidence == 1.0
+    assert extraction.result['specialist'] == 'Ермишкин Михаил'
+
+
+def test_model_normalizes_names_without_the_psychologists_table(monkeypatch):
+    from api import main
+
+    settings = BaserowSettings(baserow_token='test', baserow_psychologists_table_id=None)
+    monkeypatch.setattr(main, 'psychologists', PsychologistDirectory(settings))
+    main.action_info_with_bid_prompt.cache_clear()
+    try:
+        assert not main.psychologists.configured
+        assert 'ИМЕНИТЕЛЬНОМ ПАДЕЖЕ' in main.action_info_with_bid_prompt().messages[0].content
+
+        monkeypatch.setattr(main, 'psychologists', PsychologistDirectory(settings.model_copy(
+            update={'baserow_psychologists_table_id': 374})))
+        main.action_info_with_bid_prompt.cache_clear()
+        assert 'ИМЕНИТЕЛЬНОМ ПАДЕЖЕ' not in main.action_info_with_bid_prompt().messages[0].content
+    finally:
+        main.action_info_with_bid_prompt.cache_clear()
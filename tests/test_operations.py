@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.mock_server import MockServer
+from sdk.exceptions import OperationError, RejectedRequestError
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.llm.yandex.operations import Operation
+
+
+@pytest.fixture
+def mock():
+    with MockServer(latency='uniform:0.05:0.15', answer=lambda messages: messages[-1]['text'].upper(), seed=0) as mock:
+        yield mock
+
+
+@pytest.fixture
+def model(mock):
+    model = YandexChatGPT()
+    model.async_url = mock.async_completion_url
+    model.operations_url = mock.operations_url
+    return model
+
+
+def test_submitted_operations_are_yielded_as_they_finish(model, mock):
+    operations = [model.submit(f'задача {i}') for i in range(50)]
+    assert not any(o.done for o in operations)
+    assert mock.stats['async_completion'] == 50 and mock.stats['completion'] == 0
+
+    poller = model.poller(min_interval=0.01, max_concurrency=4)
+    for operation in operations:
+        poller.add(operation)
+    assert len(poller) == 50
+
+    finished = asyncio.run(poller.wait())
+    assert len(poller) == 0
+    assert sorted(o.result().text for o in finished) == sorted(f'ЗАДАЧА {i}' for i in range(50))
+    assert all(o.result().output_tokens > 0 for o in finished)
+    # Intervals grow while operations aren't done, so an operation isn't polled every 10 ms
+    assert mock.stats['operation_polls'] == poller.polls < 50 * 8
+    assert 0.05 < poller.expected_duration < 1.0
+
+
+def test_first_poll_waits_for_learned_duration(model, mock):
+    poller = model.poller(min_interval=0.01)
+    poller.expected_duration = 0.2
+    poller.add(model.submit('задача'))
+    asyncio.run(poller.wait())
+    assert poller.polls == 1
+
+
+def test_operations_can_be_added_while_iterating(model):
+    async def run():
+        poller = model.poller(min_interval=0.01)
+        poller.add(await model.asubmit('первая'))
+        texts = []
+        async for operation in poller:
+            texts.append(operation.result().text)
+            if len(texts) == 1:
+                poller.add(await model.asubmit('вторая'))
+        return texts
+
+    assert asyncio.run(run()) == ['ПЕРВАЯ', 'ВТОРАЯ']
+
+
+def test_failed_operation_raises_on_result(model):
+    poller = model.poller(min_interval=0.01)
+    poller.add(Operation(id='missing'))
+    [operation] = asyncio.run(poller.wait())
+    assert operation.done and '404' in operation.error
+    with pytest.raises(OperationError) as error:
+        operation.result()
+    assert error.value.operation_id == 'missing'
+
+    with pytest.raises(OperationError):
+        Operation(id='pending').result()
+
+
+def test_rejected_submission_is_not_retried(model, mock):
+    model.async_url = mock.url + '/missing'
+    started = time.monotonic()
+    with pytest.raises(RejectedRequestError) as error:
+        model.submit('Привет')
+    assert error.value.status_code == 404
+    # A retry would sleep at least a second first
+    assert time.monotonic() - started < 0.5
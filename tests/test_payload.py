@@ -0,0 +1,47 @@
+import orjson
+
+from benchmarks.mock_server import MockServer
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.llm.yandex.payload import PayloadEncoder
+from sdk.llm.yandex.settings import YandexAuth
+from sdk.messages.human import HumanMessage
+from sdk.messages.system import SystemMessage
+
+OPTIONS = {'stream': False, 'max_tokens': 1500, 'temperature': 0.4}
+
+
+def test_body_equals_encoding_of_the_whole_request():
+    encoder = PayloadEncoder()
+    system = {'role': 'system', 'text': 'Ты помощник "центра"\n' * 100}
+    for messages in ([], [{'role': 'user', 'text': 'Привет'}], [system, {'role': 'user', 'text': 'Отмени'}],
+                     [system, {'role': 'assistant', 'text': '{}'}, {'role': 'user', 'text': 'ещё'}]):
+        body = encoder.encode('gpt://folder/yandexgpt-lite/latest', OPTIONS, messages)
+        assert body == orjson.dumps({'modelUri': 'gpt://folder/yandexgpt-lite/latest',
+                                     'completionOptions': OPTIONS, 'messages': messages})
+
+
+def test_leading_messages_are_encoded_once():
+    encoder = PayloadEncoder(maxsize=2)
+    system = 'Ты помощник администратора. ' * 1000
+    for i in range(5):
+        # Equal texts of new string objects, like formatted prompts
+        encoder.encode('uri', OPTIONS, [{'role': 'system', 'text': system[:-1] + ' '}, {'role': 'user', 'text': str(i)}])
+    assert (encoder.hits, encoder.misses) == (4, 1)
+
+    encoder.encode('uri', {**OPTIONS, 'temperature': 0.0}, [{'role': 'system', 'text': system}, {'role': 'user', 'text': '1'}])
+    encoder.encode('other', OPTIONS, [{'role': 'system', 'text': system}, {'role': 'user', 'text': '1'}])
+    assert encoder.misses == 3
+    assert len(encoder) == 2
+
+
+def test_model_sends_precompiled_bodies():
+    model = YandexChatGPT()
+    model.auth = YandexAuth(yc_api_key_id='id', yc_api_key='key', yc_folder_id='folder')
+    model.payload_encoder = PayloadEncoder()
+    with MockServer(answer='ok') as mock:
+        model.base_url = mock.completion_url
+        for text in ('Отмени сессию', 'Запиши'):
+            assert model.invoke([SystemMessage(content='Ты помощник'), HumanMessage(content=text)]) == 'ok'
+        assert ''.join(model.stream('Привет')) == 'ok'
+    assert (model.payload_encoder.hits, model.payload_encoder.misses) == (1, 2)
+    assert mock.stats['completion'] == 2 and mock.stats['stream'] == 1
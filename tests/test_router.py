@@ -0,0 +1,62 @@
+import pytest
+
+from sdk.exceptions import OutputParserException
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.llm.yandex.model import Completion, YandexGPTModel
+from sdk.llm.yandex.router import YandexModelRouter
+from sdk.output_parsers.json import JsonOutputParser
+
+
+class FakeModel(YandexChatGPT):
+    def __init__(self, model, answer):
+        super().__init__(model=model)
+        self.answer = answer
+        self.calls = 0
+
+    def complete(self, input, **kwargs):
+        self.calls += 1
+        return Completion(text=self.answer, input_tokens=100, output_tokens=10)
+
+
+def make_router(lite_answer='{"action": "new"}', pro_answer='{"action": "cancel"}', **kwargs):
+    models = {
+        YandexGPTModel.Lite: FakeModel(YandexGPTModel.Lite, lite_answer),
+        YandexGPTModel.Pro: FakeModel(YandexGPTModel.Pro, pro_answer),
+    }
+    return YandexModelRouter(parser=JsonOutputParser(), models=models, **kwargs), models
+
+
+def test_easy_prompts_go_to_lite():
+    router, models = make_router()
+    assert router.invoke('Запиши к Перовой 14.07 12:00') == {'action': 'new'}
+    assert models[YandexGPTModel.Lite].calls == 1 and models[YandexGPTModel.Pro].calls == 0
+
+
+def test_long_and_matching_prompts_go_to_pro():
+    router, models = make_router(max_lite_length=10, hard_patterns=[r'перенеси'])
+    assert router.choose_model('x' * 11) is YandexGPTModel.Pro
+    assert router.choose_model('Перенеси') is YandexGPTModel.Pro
+    assert router.choose_model('Отмени') is YandexGPTModel.Lite
+
+
+def test_escalates_to_pro_on_parse_failure():
+    router, models = make_router(lite_answer='не json')
+    assert router.invoke('Отмени') == {'action': 'cancel'}
+    assert router.stats[YandexGPTModel.Lite].failures == 1
+    assert models[YandexGPTModel.Pro].calls == 1
+
+
+def test_failing_lite_is_skipped_by_statistics():
+    router, models = make_router(lite_answer='не json')
+    for _ in range(30):
+        router.invoke('Отмени')
+    assert router.choose_model('Отмени') is YandexGPTModel.Pro
+    # Other prompt lengths are not affected
+    assert router.choose_model('Отмени' * 30) is YandexGPTModel.Lite
+
+
+def test_pro_failure_is_raised():
+    router, models = make_router(lite_answer='не json', pro_answer='тоже не json')
+    with pytest.raises(OutputParserException):
+        router.invoke('Отмени')
+    assert router.stats[YandexGPTModel.Pro].failures == 1
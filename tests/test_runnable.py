@@ -0,0 +1,233 @@
+import asyncio
+import threading
+import time
+from typing import Any, List, TypeVar
+
+import pytest
+
+from sdk.exceptions import OutputParserException
+from sdk.messages.human import HumanMessage
+from sdk.messages.system import SystemMessage
+from sdk.output_parsers.json import JsonOutputParser, PartialJsonParser
+from sdk.output_parsers.string import StrOutputParser
+from sdk.prompts.chat import ChatPromptTemplate
+from sdk.runnable.base import Runnable, RunnableLambda, RunnableParallel, RunnableSequence
+from sdk.runnable.config import get_shared_executor
+
+
+class SlowSquare(Runnable[int, int]):
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.threads = set()
+
+    def invoke(self, input, config=None, **kwargs):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        if input < 0:
+            raise ValueError(input)
+        return input * input
+
+
+def test_defaults_derive_from_invoke():
+    runnable = SlowSquare(delay=0)
+    assert runnable.invoke(3) == 9
+    assert list(runnable.stream(3)) == [9]
+    assert asyncio.run(runnable.ainvoke(3)) == 9
+    assert asyncio.run(runnable.abatch([1, 2, 3])) == [1, 4, 9]
+
+    async def collect():
+        return [chunk async for chunk in runnable.astream(4)]
+
+    assert asyncio.run(collect()) == [16]
+
+
+def test_batch_runs_in_threads():
+    runnable = SlowSquare()
+    started = time.perf_counter()
+    assert runnable.batch(list(range(8))) == [i * i for i in range(8)]
+    assert time.perf_counter() - started < 8 * runnable.delay
+    assert len(runnable.threads) > 1
+
+
+def test_batch_max_concurrency_and_exceptions():
+    runnable = SlowSquare(delay=0)
+    assert len(SlowSquare(delay=0).batch([1, 2], {'max_concurrency': 1})) == 2
+    result = runnable.batch([1, -1], return_exceptions=True)
+    assert result[0] == 1 and isinstance(result[1], ValueError)
+    with pytest.raises(ValueError):
+        runnable.batch([1, -1])
+
+
+def test_prompt_template_keeps_braces_in_static_messages():
+    template = ChatPromptTemplate([SystemMessage(content='{"action": ...}'), ('human', '{user_prompt}')])
+    messages = template.invoke({'user_prompt': 'Отмени сессию'}).to_messages()
+    assert messages[0].content == '{"action": ...}'
+    assert isinstance(messages[1], HumanMessage) and messages[1].content == 'Отмени сессию'
+
+
+def test_json_output_parser():
+    parser = JsonOutputParser()
+    assert parser.invoke("```json\n{'action': 'cancel'}\n```") == {'action': 'cancel'}
+    with pytest.raises(OutputParserException):
+        parser.invoke('Команда не распознана')
+
+
+def test_json_output_parser_yields_fields_as_they_complete():
+    parser = JsonOutputParser()
+    text = "```json\n{'action': 'move', \"specialist\": 'Перова', 'ticket_id': 17, 'slots': ['14.07', 'it\\'s']}\n```"
+    chunks = [text[i:i + 5] for i in range(0, len(text), 5)]
+    assert list(parser.transform(iter(chunks))) == [
+        {'action': 'move'},
+        {'action': 'move', 'specialist': 'Перова'},
+        {'action': 'move', 'specialist': 'Перова', 'ticket_id': 17},
+        {'action': 'move', 'specialist': 'Перова', 'ticket_id': 17, 'slots': ['14.07', "it's"]},
+    ]
+
+    async def parse_async():
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+        return [output async for output in parser.atransform(stream())]
+
+    assert asyncio.run(parse_async())[-1] == {'action': 'move', 'specialist': 'Перова', 'ticket_id': 17,
+                                              'slots': ['14.07', "it's"]}
+    with pytest.raises(OutputParserException):
+        list(parser.transform(iter(['Команда ', 'не распознана'])))
+
+
+def test_partial_json_parser_reports_completed_fields():
+    partial = PartialJsonParser()
+    assert not partial.feed('Ответ: {"action": "can')
+    assert partial.value == {}
+    assert partial.feed('cel", "date": "14.07", "time": nu')
+    assert partial.value == {'action': 'cancel', 'date': '14.07'}
+    assert partial.feed('ll}```') and partial.done
+    assert partial.value == {'action': 'cancel', 'date': '14.07', 'time': None}
+
+
+class FakeStreamingModel(Runnable[str, str]):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.produced = 0
+
+    def invoke(self, input, config=None, **kwargs):
+        return ''.join(self.stream(input))
+
+    def stream(self, input, config=None, **kwargs):
+        for chunk in self.chunks:
+            self.produced += 1
+            yield chunk
+
+
+def test_sequence_composition():
+    chain = (lambda x: x + 1) | SlowSquare(delay=0) | (lambda x: -x)
+    assert isinstance(chain, RunnableSequence) and len(chain.steps) == 3
+    assert chain.invoke(2) == -9
+    assert chain.batch([1, 2]) == [-4, -9]
+    assert asyncio.run(chain.ainvoke(2)) == -9
+
+
+def test_parallel_branches_run_concurrently():
+    chain = SlowSquare(delay=0) | {'a': SlowSquare(delay=0.1), 'b': SlowSquare(delay=0.1), 'c': lambda x: x}
+    assert isinstance(chain.last, RunnableParallel)
+    started = time.perf_counter()
+    assert chain.invoke(2) == {'a': 16, 'b': 16, 'c': 4}
+    assert time.perf_counter() - started < 0.2
+    assert asyncio.run(chain.ainvoke(2)) == {'a': 16, 'b': 16, 'c': 4}
+
+
+def test_parallel_branches_reuse_threads():
+    threads = set()
+
+    def branch(x):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+        return x
+
+    chain = RunnableParallel({'a': branch, 'b': branch, 'c': branch})
+    for _ in range(20):
+        assert chain.invoke(1) == {'a': 1, 'b': 1, 'c': 1}
+    # The calling thread and threads of the shared pool, not new threads for every call
+    assert threading.current_thread().name in threads
+    assert len(threads) <= get_shared_executor()._max_workers + 1 < 41
+
+
+def test_nested_parallel_steps_do_not_exhaust_the_pool():
+    leaf = RunnableParallel({str(i): lambda x: x for i in range(8)})
+    middle = RunnableParallel({str(i): leaf for i in range(8)})
+    chain = RunnableParallel({str(i): middle for i in range(8)})
+    result = chain.invoke(1)
+    assert result['7']['7'] == {str(i): 1 for i in range(8)}
+
+
+def test_stream_flows_through_steps():
+    model = FakeStreamingModel(['{"action"', ': "cancel"', '}'])
+    chain = (lambda x: x) | model | StrOutputParser()
+    stream = chain.stream('prompt')
+    assert next(stream) == '{"action"'
+    assert model.produced == 1
+    assert ''.join(stream) == ': "cancel"}'
+
+    chain = model | JsonOutputParser()
+    assert list(chain.stream('prompt')) == [{'action': 'cancel'}]
+
+    async def collect():
+        return [chunk async for chunk in (model | StrOutputParser()).astream('prompt')]
+
+    assert asyncio.run(collect()) == ['{"action"', ': "cancel"', '}']
+
+
+def test_streamed_json_arrays_are_collected_once():
+    model = FakeStreamingModel(['["a", ', '"b", ', '"c"]'])
+    chain = model | JsonOutputParser() | RunnableLambda(lambda x: x)
+    assert list(chain.stream('prompt')) == [['a', 'b', 'c']]
+
+    async def collect():
+        return [chunk async for chunk in chain.astream('prompt')]
+
+    assert asyncio.run(collect()) == [['a', 'b', 'c']]
+
+    model = FakeStreamingModel(['{"slots": ["a", ', '"b"], ', '"ticket_id": 17}'])
+    assert list((model | JsonOutputParser() | RunnableLambda(lambda x: x)).stream('prompt')) == [
+        {'slots': ['a', 'b'], 'ticket_id': 17}
+    ]
+
+
+T = TypeVar('T')
+
+
+class Mapper(Runnable[List[T], T]):
+    def invoke(self, input, config=None, **kwargs):
+        return input[0]
+
+
+class IntMapper(Mapper[int]):
+    pass
+
+
+class NamedIntMapper(IntMapper):
+    name = 'named'
+
+
+def test_type_introspection_resolves_generics():
+    assert SlowSquare().input_type is int and SlowSquare().output_type is int
+    assert IntMapper().input_type == List[int] and IntMapper().output_type is int
+    assert NamedIntMapper().input_type == List[int]
+    assert Mapper().output_type is Any
+    assert JsonOutputParser().output_type is Any
+    assert StrOutputParser().output_type is str
+
+    parser_chain = SlowSquare() | StrOutputParser()
+    assert parser_chain.input_type is int and parser_chain.output_type is str
+
+
+def test_schemas_are_cached():
+    schema = IntMapper().input_schema
+    assert schema is IntMapper().get_input_schema()
+    assert schema.__name__ == 'IntMapperInput'
+    assert schema.model_validate([1, 2]).root == [1, 2]
+    assert NamedIntMapper().input_schema.__name__ == 'named_input'
+
+    parallel = RunnableParallel({'a': SlowSquare(), 'b': StrOutputParser()})
+    assert parallel.output_schema is parallel.output_schema
+    assert set(parallel.output_schema.model_fields) == {'a', 'b'}
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import tenacity
+
+from benchmarks.mock_server import MockServer
+from sdk.exceptions import OverloadedError
+from sdk.llm.scheduler import AIMDLimiter, Priority, RequestScheduler, current_scheduling, scheduling
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.metrics import MetricsRegistry
+from sdk.runnable.base import RunnableLambda
+
+
+def scheduler(**kwargs) -> RequestScheduler:
+    return RequestScheduler(registry=MetricsRegistry(), **kwargs)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def hold(s: RequestScheduler, priority: Priority) -> threading.Event:
+    """Take a slot in a thread until the returned event is set"""
+    release = threading.Event()
+    taken = threading.Event()
+
+    def request():
+        with s.slot(priority):
+            taken.set()
+            release.wait(5)
+
+    threading.Thread(target=request, daemon=True).start()
+    taken.wait(5)
+    return release
+
+
+def test_waiters_are_served_by_priority():
+    s = scheduler(max_concurrency=1, reserved_interactive=0)
+    order = []
+
+    def request(priority):
+        with s.slot(priority):
+            order.append(priority)
+
+    release = hold(s, Priority.BULK)
+    threads = []
+    try:
+        for depth, priority in enumerate([Priority.BULK, Priority.DEFAULT, Priority.INTERACTIVE], 1):
+            thread = threading.Thread(target=request, args=(priority,), daemon=True)
+            thread.start()
+            threads.append(thread)
+            wait_until(lambda: s.queue_depth() == depth)
+    finally:
+        release.set()
+    for thread in threads:
+        thread.join(5)
+    assert order == [Priority.INTERACTIVE, Priority.DEFAULT, Priority.BULK]
+    wait_until(lambda: s.active == 0)
+
+
+def test_reserved_slot_is_free_for_interactive_requests_only():
+    s = scheduler(max_concurrency=2, reserved_interactive=1)
+    release = hold(s, Priority.BULK)
+    try:
+        with pytest.raises(OverloadedError):
+            with s.slot(Priority.DEFAULT, deadline=time.monotonic() + 0.05):
+                pass
+        with s.slot(Priority.INTERACTIVE):
+            assert s.active == 2
+    finally:
+        release.set()
+
+
+def test_request_which_cant_meet_its_deadline_is_rejected_without_waiting():
+    s = scheduler(max_concurrency=2, reserved_interactive=1, initial_service_time=5.0)
+    with s.slot(Priority.BULK):
+        started = time.monotonic()
+        with pytest.raises(OverloadedError) as error, scheduling(Priority.BULK, timeout=1):
+            with s.slot():
+                pass
+        assert time.monotonic() - started < 0.5
+    assert error.value.reason == 'deadline'
+    assert error.value.retry_after >= 5
+    assert s.queue_depth() == 0
+    assert s._rejected.labels('default', 'bulk', 'deadline').value == 1
+
+
+def test_waiter_is_rejected_at_its_deadline():
+    s = scheduler(max_concurrency=1, reserved_interactive=0, initial_service_time=0.01)
+    with s.slot():
+        with pytest.raises(OverloadedError) as error:
+            s.slot(deadline=time.monotonic() + 0.05).__enter__()
+    assert error.value.reason == 'timeout'
+    assert s.queue_depth() == 0
+    with s.slot():
+        assert s.active == 1
+
+
+def test_full_queue_rejects_requests():
+    s = scheduler(max_concurrency=1, reserved_interactive=0, max_queue=0)
+    with s.slot():
+        with pytest.raises(OverloadedError) as error:
+            with s.slot():
+                pass
+    assert error.value.reason == 'queue_full'
+
+
+def test_async_waiters_do_not_take_executor_threads():
+    s = scheduler(max_concurrency=1, reserved_interactive=0, initial_service_time=0.0001)
+    order = []
+
+    async def request(priority):
+        async with s.aslot(priority):
+            order.append(priority)
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        release = hold(s, Priority.BULK)
+        tasks = [asyncio.create_task(request(Priority.BULK)) for _ in range(50)]
+        tasks.append(asyncio.create_task(request(Priority.INTERACTIVE)))
+        cancelled = asyncio.create_task(request(Priority.DEFAULT))
+        while s.queue_depth() < 52:
+            await asyncio.sleep(0.001)
+        assert await asyncio.get_running_loop().run_in_executor(None, lambda: 'free') == 'free'
+
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        with pytest.raises(OverloadedError) as error:
+            async with s.aslot(deadline=time.monotonic() + 0.05):
+                pass
+        assert error.value.reason == 'timeout'
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+    asyncio.run(main())
+    assert order == [Priority.INTERACTIVE] + [Priority.BULK] * 50
+    assert s.active == 0 and s.queue_depth() == 0
+
+
+def test_scheduling_is_propagated_to_batch_threads():
+    seen = []
+    runnable = RunnableLambda(lambda x: seen.append(current_scheduling()[0]) or x)
+    with scheduling(Priority.BULK):
+        runnable.batch([1, 2, 3])
+    assert seen == [Priority.BULK] * 3
+    assert current_scheduling() == (Priority.DEFAULT, None)
+
+
+def test_limit_grows_additively_and_is_cut_once_per_burst():
+    limiter = AIMDLimiter(initial_limit=4, max_limit=6, registry=MetricsRegistry())
+    for _ in range(5):
+        limiter.on_success(time.monotonic(), 0.1, in_flight=4)
+    assert limiter.limit == 5
+
+    started_at = time.monotonic()
+    limiter.on_overload(started_at)
+    limiter.on_overload(started_at)
+    assert limiter.limit == 2
+    # A request started after the decrease reports new congestion
+    limiter.on_overload(time.monotonic())
+    assert limiter.limit == 1
+
+    for _ in range(100):
+        limiter.on_success(time.monotonic(), 0.1, in_flight=limiter.limit)
+    assert limiter.limit == 6
+
+
+def test_limit_is_cut_on_latency_spike_and_does_not_grow_unused():
+    limiter = AIMDLimiter(initial_limit=8, registry=MetricsRegistry())
+    for _ in range(20):
+        limiter.on_success(time.monotonic(), 0.1, in_flight=1)
+    assert limiter.limit == 8
+    limiter.on_success(time.monotonic(), 1.0, in_flight=1)
+    assert limiter.limit == 4
+    assert limiter._decreases.labels('default', 'latency').value == 1
+
+
+def test_scheduler_follows_the_limit():
+    limiter = AIMDLimiter(initial_limit=2, registry=MetricsRegistry())
+    s = scheduler(max_concurrency=10, reserved_interactive=1, limiter=limiter)
+    assert s.concurrency == 2 and s._limit(Priority.BULK) == 1
+    limiter.on_overload(time.monotonic())
+    assert s.concurrency == 1 and s._limit(Priority.BULK) == 1
+
+
+def test_model_finds_capacity_of_the_provider(monkeypatch):
+    # Retry after 50 ms instead of seconds
+    monkeypatch.setattr(tenacity.nap, 'time', SimpleNamespace(sleep=lambda seconds: time.sleep(0.05)))
+    limiter = AIMDLimiter(initial_limit=12, max_limit=16, registry=MetricsRegistry())
+    model = YandexChatGPT()
+    model.scheduler = scheduler(max_concurrency=16, reserved_interactive=0, limiter=limiter)
+
+    with MockServer(latency='fixed:0.02', capacity=3) as mock:
+        model.base_url = mock.completion_url
+        with ThreadPoolExecutor(16) as executor:
+            list(executor.map(lambda i: model.invoke(f'Запрос {i}'), range(200)))
+    assert mock.stats['completion'] == 200
+    assert 1 <= limiter.limit <= 6
+    assert mock.stats['rate_limited'] < 60
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from benchmarks.mock_server import MockServer
+from benchmarks.semantic_cache import REPLAY, command_cache
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.messages.human import HumanMessage
+from sdk.messages.system import SystemMessage
+from sdk.semantic_cache import HashingVectorizer, SemanticCache, evaluate, numbers
+
+
+def test_paraphrases_hit_and_other_facts_miss():
+    cache = SemanticCache()
+    cache.update('Отмени сессию у Перовой 14.07 12:00', 'cancel')
+    assert cache.lookup('отмена Перова 14.07 в 12:00') == 'cancel'
+    assert cache.lookup('Отмени сессию у Перовой 15.07 12:00') is None
+    assert cache.lookup('Запиши к Перовой 14.07 12:00') is None
+    assert cache.lookup('отмена Перова 14.07 в 12:00', namespace='other prompt') is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_vectors_are_normalized_and_stable():
+    vectors = HashingVectorizer().transform(['Перенеси сессию у Перовой', ''])
+    assert abs(float(vectors[0] @ vectors[0]) - 1) < 1e-6
+    assert not vectors[1].any()
+    assert numbers('14.07 в 09:05, заявка #017') == ('14', '7', '9', '5', '17')
+
+
+def test_least_recently_used_prompt_is_evicted():
+    cache = SemanticCache(maxsize=2)
+    cache.update('Отмени сессию у Перовой', 'perova')
+    cache.update('Отмени сессию у Иванова', 'ivanov')
+    assert cache.lookup('Отмени сессию у Перовой') == 'perova'
+    cache.update('Отмени сессию у Смирновой', 'smirnova')
+    assert len(cache) == 2
+    assert cache.lookup('Отмени сессию у Иванова') is None
+    assert cache.lookup('Отмени сессию у Перовой') == 'perova'
+
+
+def test_expired_prompts_miss():
+    cache = SemanticCache(ttl=0.01)
+    cache.update('Отмени сессию у Перовой', 'perova')
+    time.sleep(0.02)
+    assert cache.lookup('Отмени сессию у Перовой') is None
+
+
+def test_negated_commands_miss():
+    cache = SemanticCache()
+    cache.update('Отмени сессию у Перовой 14.07 12:00', 'cancel')
+    assert cache.lookup('Не отменяй сессию у Перовой 14.07 12:00') is None
+
+
+@pytest.mark.parametrize('cached, prompt', [
+    ('Отмени сессию у Иванова Алексея 16.07 10:00', 'Отмени сессию у Иванова Александра 16.07 10:00'),
+    ('Запиши к Перовой 17.07 11:00', 'Запиши к Перову 17.07 11:00'),
+    ('Отмени сессию у Петровой 18.07 15:00', 'Отмени сессию у Петровского 18.07 15:00'),
+    ('Отмени сессию у Смирновой 21.07 12:00', 'Не отменяй сессию у Смирновой 21.07 12:00'),
+])
+def test_commands_of_other_specialists_miss(cached, prompt):
+    cache = command_cache()
+    cache.update(cached, 'cached')
+    assert cache.lookup(prompt) is None
+
+
+def test_precision_and_recall_on_replay_set():
+    metrics = evaluate(command_cache(), REPLAY)
+    assert metrics['precision'] == 1.0
+    # Surnames of several psychologists, e.g. "Перовой" of Перова and Перов, are keyed as they are written
+    assert metrics['recall'] >= 0.6
+
+
+def test_model_answers_near_duplicate_prompts_from_cache():
+    model = YandexChatGPT()
+    model.single_flight = False
+    model.semantic_cache = SemanticCache()
+    with MockServer(answer=lambda messages: messages[-1]['text']) as mock:
+        model.base_url = mock.completion_url
+        first = model.invoke([SystemMessage(content='Извлеки команду'),
+                              HumanMessage(content='Отмени сессию у Перовой 14.07 12:00')])
+        second = model.invoke([SystemMessage(content='Извлеки команду'),
+                               HumanMessage(content='отмена Перова 14.07 в 12:00')])
+        other_system = model.invoke([SystemMessage(content='Другая инструкция'),
+                                     HumanMessage(content='отмена Перова 14.07 в 12:00')])
+    assert first == second == 'Отмени сессию у Перовой 14.07 12:00'
+    assert other_system == 'отмена Перова 14.07 в 12:00'
+    assert mock.stats['completion'] == 2
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+from api import main
+from api.names import NameMatch
+from api.settings import get_server_settings
+from sdk.cache import SQLiteCache
+from sdk.exceptions import OverloadedError
+
+
+def test_app_opens_shared_caches_for_the_lifespan_of_a_worker(monkeypatch, tmp_path):
+    monkeypatch.setenv('CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    # Commands with known psychologists are answered by the fast path without the model
+    monkeypatch.setattr(main.psychologists, 'lookup', lambda name: NameMatch(7, 'Давиташвили', 1.0))
+    get_server_settings.cache_clear()
+    try:
+        with TestClient(main.app) as client:
+            assert all(isinstance(m.cache, SQLiteCache) for m in main.router.models.values())
+            assert isinstance(main.slot_index().cache, SQLiteCache)
+
+            response = client.get('/action-info-with-bid',
+                                  params={'user_prompt': 'Отмени сессию у Давиташвили 14.07.2024 в 12:00. Заявка #17'})
+            assert response.json()['action'] == 'cancel'
+            assert response.json()['ticket_id'] == 17
+
+        assert all(m.cache is None for m in main.router.models.values())
+        assert main.slot_index().cache is None
+    finally:
+        get_server_settings.cache_clear()
+
+
+def test_overloaded_requests_get_503_with_retry_after(monkeypatch, tmp_path):
+    monkeypatch.setenv('CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    get_server_settings.cache_clear()
+
+    class Overloaded:
+        def invoke(self, input):
+            raise OverloadedError('rejected', retry_after=3, reason='deadline')
+
+    monkeypatch.setattr(main, 'action_info_chain', lambda: Overloaded())
+    try:
+        with TestClient(main.app) as client:
+            response = client.get('/action-info', params={'user_prompt': 'Перенеси сессию'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '3'
+    finally:
+        get_server_settings.cache_clear()
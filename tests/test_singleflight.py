@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sdk.deadline import deadline, request_timeout
+from sdk.exceptions import DeadlineExceeded
+from sdk.llm.yandex.chat_model import YandexChatGPT
+from sdk.llm.yandex.model import Completion
+from sdk.utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class CountingModel(YandexChatGPT):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _complete(self, prompts, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.1)
+        return Completion(text=prompts[-1]['text'].upper())
+
+
+def test_concurrent_duplicates_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return x * 2
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: flight.do('key', slow, 21), range(8)))
+
+    assert results == [42] * 8
+    assert calls == [21]
+    assert flight.in_flight() == 0
+    # Finished calls are not cached
+    assert flight.do('key', slow, 1) == 2
+
+
+def test_errors_are_shared():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.05)
+        raise RuntimeError('boom')
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(flight.do, 'key', fail) for _ in range(4)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+
+
+def test_async_duplicates_share_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return x * 2
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', slow, 21) for _ in range(5)), flight.do('other', slow, 1))
+
+    assert asyncio.run(main()) == [42] * 5 + [2]
+    assert sorted(calls) == [1, 21]
+
+
+def test_waiters_get_the_result_when_the_leader_is_cancelled():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return x * 2
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do('key', slow, 21))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.do('key', slow, 21)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        return leader.cancelled(), results
+
+    assert asyncio.run(main()) == (True, [42] * 3)
+    # One of the waiters called again, the others waited for it
+    assert calls == [21, 21]
+
+
+def test_waiters_keep_their_own_deadlines():
+    flight = SingleFlight()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        for _ in range(10):
+            time.sleep(0.05)
+            # Raises DeadlineExceeded of the caller's deadline
+            request_timeout(60)
+        return x * 2
+
+    def short_leader():
+        with deadline(0.3):
+            return flight.do('key', slow, 21)
+
+    def short_waiter():
+        time.sleep(0.02)
+        with deadline(0.05):
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                flight.do('key', slow, 21)
+            return time.monotonic() - started
+
+    def waiter():
+        time.sleep(0.02)
+        return flight.do('key', slow, 21)
+
+    with ThreadPoolExecutor(3) as executor:
+        leader, short, long = executor.submit(short_leader), executor.submit(short_waiter), executor.submit(waiter)
+        with pytest.raises(DeadlineExceeded):
+            leader.result()
+        assert short.result() < 0.1
+        # The leader's deadline passed, the waiter without a deadline called again
+        assert long.result() == 42
+    assert calls == [21, 21]
+
+
+def test_async_waiters_keep_their_own_deadlines():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        for _ in range(10):
+            await asyncio.sleep(0.05)
+            request_timeout(60)
+        return x * 2
+
+    async def call(timeout):
+        with deadline(timeout):
+            return await flight.do('key', slow, 21)
+
+    async def main():
+        started = time.monotonic()
+        leader = asyncio.ensure_future(call(0.3))
+        await asyncio.sleep(0.01)
+        short, long = asyncio.ensure_future(call(0.05)), asyncio.ensure_future(call(None))
+        results = await asyncio.gather(short, return_exceptions=True)
+        # The waiter with a short deadline doesn't wait for the leader
+        assert time.monotonic() - started < 0.2
+        return (*await asyncio.gather(leader, long, return_exceptions=True), *results)
+
+    started = time.monotonic()
+    leader, long, short = asyncio.run(main())
+    assert isinstance(leader, DeadlineExceeded) and isinstance(short, DeadlineExceeded)
+    assert leader is not short
+    assert long == 42 and calls == [21, 21]
+    assert time.monotonic() - started < 1.5
+
+
+def test_model_deduplicates_identical_requests():
+    model = CountingModel()
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(model.invoke, ['отмени'] * 4 + ['перенеси']))
+    assert results == ['ОТМЕНИ'] * 4 + ['ПЕРЕНЕСИ']
+    assert model.calls == 2
+
+    async def main():
+        return await asyncio.gather(*(model.ainvoke('отмени') for _ in range(4)))
+
+    assert asyncio.run(main()) == ['ОТМЕНИ'] * 4
+    assert model.calls == 3
+
+    model.single_flight = False
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(model.invoke, ['отмени'] * 2))
+    assert model.calls == 5
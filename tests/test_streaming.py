@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from api import main
+from api.names import NameMatch
+from api.settings import get_server_settings
+from benchmarks.mock_server import MockServer
+from sdk.llm.scheduler import RequestScheduler
+from sdk.llm.yandex.chat_model import YandexChatGPT
+
+LONG_ANSWER = '{"action": "cancel", "comment": "' + 'очень длинный ответ ' * 50 + '"}'
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def events(body: str):
+    parsed = []
+    for block in body.strip().split('\n\n'):
+        event, data = block.split('\n')
+        parsed.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return parsed
+
+
+def test_async_stream_yields_new_parts_and_releases_the_slot():
+    model = YandexChatGPT()
+    model.scheduler = RequestScheduler(max_concurrency=2, reserved_interactive=0)
+
+    async def collect():
+        return [chunk async for chunk in model.astream('Привет')]
+
+    with MockServer(answer='abcdefgh', stream_chunks=4) as mock:
+        model.base_url = mock.completion_url
+        assert asyncio.run(collect()) == ['ab', 'cd', 'ef', 'gh']
+    assert model.scheduler.active == 0
+
+
+def test_closing_async_stream_cancels_the_generation():
+    model = YandexChatGPT()
+
+    async def first_chunk():
+        stream = model.astream('Привет')
+        chunk = await stream.__anext__()
+        await stream.aclose()
+        return chunk
+
+    with MockServer(answer=LONG_ANSWER, latency='fixed:2', stream_chunks=40) as mock:
+        model.base_url = mock.completion_url
+        assert LONG_ANSWER.startswith(asyncio.run(first_chunk()))
+        assert wait_for(lambda: mock.stats['stream_cancelled'] == 1)
+
+
+def test_disconnected_client_cancels_the_upstream_request(monkeypatch):
+    sent = []
+    first_event = asyncio.Event()
+
+    async def send(message):
+        sent.append(message)
+        if message.get('body'):
+            first_event.set()
+
+    async def receive():
+        await first_event.wait()
+        return {'type': 'http.disconnect'}
+
+    async def serve():
+        response = main.EventStreamResponse(main.action_events(main.action_info_prompt(), 'Отмени сессию у Перовой'))
+        await response({'type': 'http'}, receive, send)
+
+    with MockServer(answer=LONG_ANSWER, latency='fixed:2', stream_chunks=40) as mock:
+        for model in main.router.models.values():
+            monkeypatch.setattr(model, 'base_url', mock.completion_url)
+        started = time.monotonic()
+        asyncio.run(serve())
+        assert time.monotonic() - started < 1
+        assert wait_for(lambda: mock.stats['stream_cancelled'] == 1)
+    assert sent[1]['body'].startswith(b'event: token')
+
+
+def test_client_disconnecting_while_events_wait_to_be_sent(monkeypatch):
+    first_event = asyncio.Event()
+
+    async def send(message):
+        if message.get('body'):
+            first_event.set()
+            # A slow client: the events are paused at a yield until the disconnect
+            await asyncio.sleep(10)
+
+    async def receive():
+        await first_event.wait()
+        return {'type': 'http.disconnect'}
+
+    async def serve():
+        response = main.EventStreamResponse(main.action_events(main.action_info_prompt(), 'Отмени сессию у Перовой'))
+        await response({'type': 'http'}, receive, send)
+
+    with MockServer(answer=LONG_ANSWER, latency='fixed:2', stream_chunks=40) as mock:
+        for model in main.router.models.values():
+            monkeypatch.setattr(model, 'base_url', mock.completion_url)
+        started = time.monotonic()
+        asyncio.run(serve())
+        assert time.monotonic() - started < 1
+        assert wait_for(lambda: mock.stats['stream_cancelled'] == 1)
+
+
+def test_action_info_stream_sends_tokens_and_parsed_result(monkeypatch, tmp_path):
+    monkeypatch.setenv('CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    get_server_settings.cache_clear()
+    try:
+        with MockServer(answer='{"action": "cancel", "specialist": null}', stream_chunks=4) as mock, \
+                TestClient(main.app) as client:
+            for model in main.router.models.values():
+                monkeypatch.setattr(model, 'base_url', mock.completion_url)
+            with client.stream('GET', '/action-info/stream', params={'user_prompt': 'Отмени сессию'}) as response:
+                assert response.headers['content-type'].startswith('text/event-stream')
+                body = response.read().decode()
+    finally:
+        get_server_settings.cache_clear()
+
+    parsed = events(body)
+    assert [event for event, _ in parsed if event != 'partial'] == ['token'] * 4 + ['result']
+    assert ''.join(data for event, data in parsed if event == 'token') == '{"action": "cancel", "specialist": null}'
+    assert [data for event, data in parsed if event == 'partial'] == [
+        {'action': 'cancel'}, {'action': 'cancel', 'specialist': None},
+    ]
+    assert parsed[-1][1] == {'action': 'cancel', 'specialist': None}
+
+
+def test_specialist_is_looked_up_while_the_answer_is_generated(monkeypatch):
+    lookups = []
+
+    class Directory:
+        configured = True
+
+        def lookup(self, name):
+            lookups.append((name, time.monotonic()))
+            return NameMatch(7, 'Перова Алёна', 1.0)
+
+    async def collect():
+        return [(event, time.monotonic()) async for event in main.action_events(
+            main.action_info_with_bid_prompt(), 'Перенеси сессию у Перовой', main.with_specialist_id,
+            prefetch=('specialist', main.psychologists.lookup),
+        )]
+
+    monkeypatch.setattr(main, 'psychologists', Directory())
+    answer = "```json\n{'action': 'move', 'specialist': 'Перовой', 'comment': '" + 'текст ' * 40 + "'}\n```"
+    with MockServer(answer=answer, latency='fixed:0.4', stream_chunks=20) as mock:
+        for model in main.router.models.values():
+            monkeypatch.setattr(model, 'base_url', mock.completion_url)
+        sent = asyncio.run(collect())
+
+    result = events(sent[-1][0])[0]
+    assert result == ('result', {'action': 'move', 'specialist': 'Перова Алёна', 'comment': 'текст ' * 40,
+                                 'specialist_id': 7})
+    # The first lookup is made before the generation finishes
+    assert lookups[0][0] == 'Перовой'
+    assert lookups[0][1] < sent[-2][1] - 0.1
+
+
+def test_fast_path_stream_sends_only_the_result(monkeypatch):
+    monkeypatch.setattr(main.psychologists, 'lookup', lambda name: NameMatch(7, 'Давиташвили', 1.0))
+    client = TestClient(main.app)
+    response = client.get('/action-info-with-bid/stream',
+                          params={'user_prompt': 'Отмени сессию у Давиташвили 14.07.2024 в 12:00. Заявка #17'})
+    [(event, data)] = events(response.text)
+    assert event == 'result'
+    assert data['action'] == 'cancel' and data['ticket_id'] == 17 and data['specialist_id'] == 7